@@ -0,0 +1,246 @@
+"""Доставка уведомлений об отсутствии объектов, не останавливающая мониторинг.
+
+Движок отдаёт уведомление диспетчеру через submit и сразу продолжает
+работу: ни поток детектора, ни поток GUI не ждут ни сети, ни диска.
+
+Поток диспетчера объединяет уведомления одной камеры, пришедшие в течение
+coalesce секунд, в одно (объекты объединяются, count - число исходных
+уведомлений), и отправляет по камере не чаще раза в min_interval секунд:
+уведомления внутри интервала не теряются, а копятся и уходят одним
+следующим. Каждый получатель (sink) работает в своём потоке со своей
+очередью, так что зависший webhook не задерживает уведомление в трее.
+Неудачная отправка повторяется retries раз с удвоением паузы; если
+получатель не успевает, из его очереди вытесняются самые старые уведомления.
+
+Получатель - объект с атрибутом name и методом send(alert), который
+бросает исключение, если доставить не удалось.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+
+
+class Alert:
+    """Объекты камеры, отсутствующие дольше порога"""
+    def __init__(self, stream, source, objects, max_absence_time, clip=None, timestamp=None):
+        self.stream = stream
+        self.source = source
+        self.objects = list(objects)
+        self.max_absence_time = max_absence_time
+        self.clip = clip
+        self.time = timestamp if timestamp is not None else time.time()
+        # Сколько уведомлений объединено в это
+        self.count = 1
+
+    @property
+    def key(self):
+        return str(self.source)
+
+    def merge(self, other):
+        self.objects += [obj for obj in other.objects if obj not in self.objects]
+        self.max_absence_time = other.max_absence_time
+        self.clip = other.clip or self.clip
+        self.count += other.count
+
+    def to_dict(self):
+        return {
+            "event": "absence",
+            "time": self.time,
+            "stream": self.stream,
+            "source": self.source,
+            "objects": self.objects,
+            "max_absence_time": self.max_absence_time,
+            "clip": self.clip,
+            "count": self.count,
+        }
+
+    def message(self):
+        objects = ", ".join(obj if len(obj) <= 30 else obj[:27] + "..." for obj in self.objects)
+        text = f"{self.stream}: следующие объекты отсутствуют более {self.max_absence_time} секунд: {objects}"
+        if self.clip:
+            text += f"\n\nЗапись до уведомления: {self.clip}"
+        return text
+
+
+class CallbackSink:
+    """Передаёт уведомление функции, например сигналу Qt для трея"""
+    def __init__(self, callback, name="callback"):
+        self.callback = callback
+        self.name = name
+
+    def send(self, alert):
+        self.callback(alert)
+
+
+class LogSink:
+    """Строка с текстом уведомления в поток вывода (по умолчанию stderr)"""
+    name = "log"
+
+    def __init__(self, output=None):
+        self.output = output
+
+    def send(self, alert):
+        output = self.output or sys.stderr
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(alert.time))
+        output.write(f"[{stamp}] {alert.message()}\n")
+        output.flush()
+
+
+class JsonLinesSink:
+    """Уведомления в формате JSON Lines: в файл по пути или в открытый поток"""
+    name = "jsonl"
+
+    def __init__(self, output, lock=None):
+        self.output = output
+        # Общая блокировка, если в тот же поток пишут и другие события
+        self.lock = lock or threading.Lock()
+
+    def send(self, alert):
+        line = json.dumps(alert.to_dict(), ensure_ascii=False) + "\n"
+        with self.lock:
+            if isinstance(self.output, str):
+                os.makedirs(os.path.dirname(self.output) or ".", exist_ok=True)
+                with open(self.output, "a", encoding="utf-8") as f:
+                    f.write(line)
+            else:
+                self.output.write(line)
+                self.output.flush()
+
+
+class WebhookSink:
+    """POST уведомления в формате JSON; ответ с ошибкой HTTP считается неудачей"""
+    name = "webhook"
+
+    def __init__(self, url, timeout=5.0, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    def send(self, alert):
+        data = json.dumps(alert.to_dict(), ensure_ascii=False).encode("utf-8")
+        request = urllib.request.Request(self.url, data=data, headers=self.headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class _SinkWorker:
+    """Очередь и поток доставки одного получателя"""
+    def __init__(self, sink, dispatcher):
+        self.sink = sink
+        self.dispatcher = dispatcher
+        self.queue = queue.Queue(dispatcher.max_queue)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def put(self, alert):
+        while True:
+            try:
+                self.queue.put_nowait(alert)
+                return
+            except queue.Full:
+                pass
+            try:
+                self.queue.get_nowait()
+                self.dispatcher.count("dropped")
+            except queue.Empty:
+                pass
+
+    def _run(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                return
+            self._deliver(alert)
+
+    def _deliver(self, alert):
+        dispatcher = self.dispatcher
+        for attempt in range(dispatcher.retries + 1):
+            try:
+                self.sink.send(alert)
+                dispatcher.count("delivered")
+                return
+            except Exception as e:
+                error = e
+            # При закрытии повторы не ждут: очередь нужно дописать за отведённое время
+            if attempt == dispatcher.retries or dispatcher.closing.wait(dispatcher.retry_delay * 2 ** attempt):
+                break
+            dispatcher.count("retried")
+        dispatcher.count("failed")
+        print(f"Не удалось доставить уведомление через {self.sink.name}: {error}", file=sys.stderr)
+
+
+class AlertDispatcher:
+    def __init__(self, sinks, coalesce=1.0, min_interval=10.0, retries=3, retry_delay=1.0, max_queue=100):
+        self.coalesce = coalesce
+        self.min_interval = min_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_queue = max_queue
+        self.stats = {"submitted": 0, "coalesced": 0, "delivered": 0, "retried": 0, "failed": 0, "dropped": 0}
+
+        # Ключ камеры -> [уведомление, момент отправки]
+        self._pending = {}
+        self._last_sent = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.closing = threading.Event()
+        self._workers = [_SinkWorker(sink, self) for sink in sinks]
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def submit(self, alert):
+        """Вызывается из любого потока и сразу возвращается"""
+        with self._lock:
+            if self.closing.is_set():
+                return
+            self.stats["submitted"] += 1
+            entry = self._pending.get(alert.key)
+            if entry is not None:
+                entry[0].merge(alert)
+                self.stats["coalesced"] += 1
+                return
+            now = time.monotonic()
+            due = max(now + self.coalesce, self._last_sent.get(alert.key, -self.min_interval) + self.min_interval)
+            self._pending[alert.key] = [alert, due]
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                closing = self.closing.is_set()
+                ready = [key for key, (_, due) in self._pending.items() if closing or due <= now]
+                alerts = [self._pending.pop(key)[0] for key in ready]
+                for key in ready:
+                    self._last_sent[key] = now
+                timeout = min((due for _, due in self._pending.values()), default=now + 1.0) - now
+            for alert in alerts:
+                for worker in self._workers:
+                    worker.put(alert)
+            if closing:
+                return
+            self._wakeup.wait(max(timeout, 0.0))
+            self._wakeup.clear()
+
+    def close(self, timeout=5.0):
+        """Отправить накопленные уведомления и дождаться получателей не дольше timeout"""
+        self.closing.set()
+        self._wakeup.set()
+        self._thread.join()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.put(None)
+        for worker in self._workers:
+            worker.thread.join(max(0.0, deadline - time.monotonic()))
@@ -1,16 +1,35 @@
+import os
 import sys
-import cv2
 import time
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit,
     QPushButton, QVBoxLayout, QHBoxLayout, QListWidget, QMessageBox,
-    QTabWidget, QProgressBar, QGridLayout, QFrame, QSpinBox,
-    QScrollArea, QSizePolicy, QSystemTrayIcon
+    QTabWidget, QGridLayout, QFrame, QSpinBox,
+    QScrollArea, QSizePolicy, QSystemTrayIcon, QComboBox, QCheckBox, QInputDialog, QProgressBar
+)
+from PyQt5.QtCore import QTimer, Qt, QSize, QObject, QThread, pyqtSignal
+from PyQt5.QtGui import QPixmap, QIcon, QFont, QPalette, QColor
+
+from alerts import AlertDispatcher, CallbackSink, JsonLinesSink, LogSink, WebhookSink
+from backends import create_backend
+from capture import parse_size
+from clips import ClipRecorder
+from embeddings import TextEmbeddingCache
+from frame_view import FrameView
+from metrics import Metrics
+from rendering import LabelSprites, draw_detections, draw_overlay, fit_frame
+from status_panel import StatusView
+from tiling import TiledBackend, parse_region
+from timeline import TimelineStore
+from tracking import Tracker
+from motion import MotionGate
+from regions import format_zones
+from scheduler import AbsenceBudgetScheduler
+from startup import load_model
+from monitor import (
+    MonitorEngine, load_cameras, save_cameras, load_profiles, save_profile, parse_source,
+    WATCHLIST_PATH, EMBEDDINGS_PATH, EXPORTS_DIR, CLIPS_DIR, TIMELINE_PATH, PROFILES_PATH, MODELS_DIR, ALERTS_PATH
 )
-from PyQt5.QtCore import QTimer, Qt, QSize
-from PyQt5.QtGui import QImage, QPixmap, QIcon, QFont, QPalette, QColor
-from ultralytics import YOLO
-import numpy as np
 
 # Цветовая палитра
 COLORS = {
@@ -21,6 +40,23 @@ COLORS = {
     "sage": "#7B9E89"
 }
 
+class EngineSignals(QObject):
+    """Переносит события движка мониторинга из рабочих потоков в поток GUI.
+
+    Кадры через сигналы не передаются: их забирает таймер отрисовки.
+    """
+    status_ready = pyqtSignal(object, object)
+    stream_stopped = pyqtSignal(object)
+    reconnecting = pyqtSignal(object, bool)
+    # Уведомление из потока доставки (см. alerts.py)
+    alert = pyqtSignal(object)
+
+    def connect_engine(self, engine):
+        engine.on_status = self.status_ready.emit
+        engine.on_stream_stopped = self.stream_stopped.emit
+        engine.on_reconnecting = self.reconnecting.emit
+
+
 class StyleableButton(QPushButton):
     def __init__(self, text="", parent=None, color=None):
         super().__init__(text, parent)
@@ -42,10 +78,11 @@ class StyleableButton(QPushButton):
         """)
 
 class ClassCard(QFrame):
-    def __init__(self, class_name, on_delete, parent=None):
+    def __init__(self, class_name, on_delete, on_zones=None, zones=None, parent=None):
         super().__init__(parent)
         self.class_name = class_name
         self.on_delete = on_delete
+        self.on_zones = on_zones
         
         self.setStyleSheet(f"""
             ClassCard {{
@@ -72,6 +109,22 @@ class ClassCard(QFrame):
         # Если текст длинный, включаем перенос строк
         if len(class_name) > 30:
             name_label.setWordWrap(True)
+
+        # Кнопка зоны: подсвечена, если объект ищется только в своих зонах
+        zone_btn = QPushButton("▢")
+        zone_btn.setFixedSize(24, 24)
+        zone_btn.setToolTip(f"Зоны: {format_zones(zones)}" if zones else "Зона: весь кадр")
+        zone_btn.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {COLORS['sage'] if zones else COLORS['light_bg']};
+                color: #3F4B3B;
+                border: none;
+                border-radius: 12px;
+                font-weight: bold;
+            }}
+        """)
+        zone_btn.clicked.connect(lambda: self.on_zones(class_name))
+        zone_btn.setVisible(on_zones is not None)
         
         # Кнопка удаления
         delete_btn = QPushButton("✕")
@@ -92,45 +145,201 @@ class ClassCard(QFrame):
         
         layout.addWidget(icon_label)
         layout.addWidget(name_label)
+        layout.addWidget(zone_btn)
         layout.addWidget(delete_btn)
         
         self.setLayout(layout)
 
-class VideoWidget(QWidget):
-    def __init__(self, model):
-        super().__init__()
-        self.model = model
-        self.selected_classes = ["__placeholder__"]
-        self.model.set_classes(self.selected_classes)
+class CameraPanel(QWidget):
+    """Видео и статус отслеживаемых объектов одной камеры"""
+    def __init__(self, stream, compact=False, parent=None):
+        super().__init__(parent)
+        self.stream = stream
 
-        # Время, когда видели объект в последний раз
-        self.last_seen = {cls: 0 for cls in self.selected_classes}
+        # Создаем горизонтальный макет для камеры и панели отслеживания
+        camera_tracking_layout = QHBoxLayout(self)
+        camera_tracking_layout.setContentsMargins(0, 0, 0, 0)
+        camera_tracking_layout.setSpacing(15)
         
-        # Максимальное время, которое может отсутствовать объект
-        self.max_absence_time = 30
+        # Левая часть - Секция камеры
+        camera_section = QWidget()
+        camera_section.setStyleSheet(f"background-color: white; border-radius: 8px; border: 1px solid {COLORS['soft_cream']};")
+        camera_layout = QVBoxLayout(camera_section)
+        camera_layout.setContentsMargins(15, 15, 15, 15)
         
-        # Статус-бары отсутствующих объектов
-        self.status_bars = {}
+        self.camera_label = QLabel(f"{stream.name}:")
+        self.camera_label.setStyleSheet("font-weight: bold;")
+        camera_layout.addWidget(self.camera_label)
         
-        # Затригеренные объекты
-        self.notified_objects = set()
+        if compact:
+            self.frame_view = FrameView(480, 360, COLORS['sage'])
+        else:
+            self.frame_view = FrameView(640, 480, COLORS['sage'])
+        camera_layout.addWidget(self.frame_view, alignment=Qt.AlignCenter)
+        
+        # Правая часть - Секция отслеживания статуса
+        status_section = QWidget()
+        status_section.setStyleSheet(f"""
+            background-color: white;
+            border-radius: 8px;
+            border: 1px solid {COLORS['soft_cream']};
+        """)
+        status_section.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
+        
+        status_layout = QVBoxLayout(status_section)
+        status_layout.setContentsMargins(15, 15, 15, 15)
+        
+        status_header = QLabel("Статус отслеживаемых объектов")
+        status_header.setStyleSheet("font-weight: bold;")
+        
+        self.empty_label = QLabel("Нет объектов для отслеживания. Добавьте их во вкладке «Управление объектами»")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.setWordWrap(True)
+        self.empty_label.setStyleSheet(f"color: {COLORS['brown_beige']}; padding: 20px; border: none;")
+
+        self.status_view = StatusView()
+        self.update_status_bars()
+        
+        status_layout.addWidget(status_header)
+        status_layout.addWidget(self.empty_label)
+        status_layout.addWidget(self.status_view)
+        
+        # Добавляем обе секции в основной горизонтальный макет
+        camera_tracking_layout.addWidget(camera_section, 7)  # 70% ширины
+        camera_tracking_layout.addWidget(status_section, 3)  # 30% ширины
+
+    def update_status_bars(self):
+        # Строки добавляются и удаляются по одной, значения остальных сохраняются
+        display_classes = self.stream.display_classes()
+        self.status_view.status_model.set_classes(display_classes, self.stream.max_absence_time)
+        self.status_view.setVisible(bool(display_classes))
+        self.empty_label.setVisible(not display_classes)
+
+    def reset_status_bars(self):
+        # Сбрасываем индикаторы прогресса на ноль
+        self.status_view.status_model.reset()
+
+    def update_absence(self, absence):
+        # Перерисовываются только строки, у которых изменилось время отсутствия
+        self.status_view.status_model.update_absence(absence)
+
+    def display_frame(self, frame, detections, sprites, overlay=None):
+        # Сначала уменьшаем кадр до размера окна, потом рисуем обнаружения уже на маленьком
+        frame, scale = fit_frame(frame, *self.frame_view.frame_size())
+        draw_detections(frame, detections, sprites, scale=scale)
+        if overlay:
+            draw_overlay(frame, overlay)
+        self.frame_view.set_frame(frame)
+
+    def show_blank(self):
+        self.frame_view.clear()
+
+
+class VideoWidget(QWidget):
+    def __init__(self, model, backend="torch", embedding_cache=None):
+        super().__init__()
+        self.model = model
+
+        # Движок мониторинга: камеры, общий детектор и таймеры отсутствия
+        if embedding_cache is None:
+            embedding_cache = TextEmbeddingCache(EMBEDDINGS_PATH)
+        self.embedding_cache = embedding_cache
+        # Детектор запускается по мере расходования бюджета отсутствия, а не на каждом кадре,
+        # и пропускается на статичных сценах
+        self.motion_gate = MotionGate()
+        # Бэкенд задаётся именем или готовым объектом, например клиентом сервера инференса
+        if isinstance(backend, str):
+            backend = create_backend(model, backend, self.embedding_cache, EXPORTS_DIR)
+        self.backend = backend
+        # TILE_SIZE: крупные кадры режутся на тайлы, TILE_ROI="x1,y1,x2,y2;..." ограничивает их областями
+        tile_size = int(os.environ.get("TILE_SIZE", 0))
+        if tile_size > 0:
+            regions = [parse_region(text) for text in os.environ.get("TILE_ROI", "").split(";") if text.strip()]
+            self.backend = TiledBackend(
+                self.backend, tile_size, float(os.environ.get("TILE_OVERLAP", 0.2)), regions=regions
+            )
+        # Замеры стадий конвейера: оверлей на кадре и, при заданном METRICS_PORT, HTTP-экспорт
+        self.metrics = Metrics()
+        self.overlay_lines = []
+        self.overlay_updated = 0.0
+        if os.environ.get("METRICS_PORT"):
+            self.metrics.serve(int(os.environ["METRICS_PORT"]))
+        # Последняя минута каждой камеры в памяти: при уведомлении она сохраняется в клип
+        clip_seconds = float(os.environ.get("CLIP_SECONDS", 60))
+        self.recorder = ClipRecorder(CLIPS_DIR, clip_seconds) if clip_seconds > 0 else None
+        # Журнал обнаружений на диске: когда объект видели и сколько его не было
+        self.timeline = TimelineStore(TIMELINE_PATH)
+        # DETECT_EVERY=K: детектор на каждом K-м кадре, между ними объекты ведёт трекер
+        detect_every = int(os.environ.get("DETECT_EVERY", 1))
+        self.tracker = Tracker(detect_every) if detect_every > 1 else None
+        # Уведомления доставляются в фоне, камеры при этом не останавливаются.
+        # ALERT_WEBHOOK - адрес для POST-запросов, ALERT_INTERVAL - не чаще одного уведомления по камере, сек
+        self.engine_signals = EngineSignals(self)
+        sinks = [CallbackSink(self.engine_signals.alert.emit, "tray"), LogSink(), JsonLinesSink(ALERTS_PATH)]
+        if os.environ.get("ALERT_WEBHOOK"):
+            sinks.append(WebhookSink(os.environ["ALERT_WEBHOOK"]))
+        self.alerts = AlertDispatcher(
+            sinks, float(os.environ.get("ALERT_COALESCE", 1.0)), float(os.environ.get("ALERT_INTERVAL", 10))
+        )
+        self.engine = MonitorEngine(
+            self.backend, AbsenceBudgetScheduler(), self.motion_gate, self.metrics, self.recorder,
+            self.timeline, self.tracker, self.alerts
+        )
+        # CAPTURE_SIZE=1280x720, CAPTURE_FOURCC=MJPG: формат камер; RECONNECT_MAX_DELAY=0 выключает переподключение
+        capture_size = os.environ.get("CAPTURE_SIZE")
+        self.engine.capture_options = {
+            "size": parse_size(capture_size) if capture_size else None,
+            "fourcc": os.environ.get("CAPTURE_FOURCC") or None,
+            "buffer_size": int(os.environ.get("CAPTURE_BUFFER", 1)),
+            "reconnect_max_delay": float(os.environ.get("RECONNECT_MAX_DELAY", 30)),
+        }
+        self.engine_signals.connect_engine(self.engine)
+        self.engine_signals.status_ready.connect(self.on_status)
+        self.engine_signals.alert.connect(self.show_notification)
+        self.engine_signals.stream_stopped.connect(self.on_stream_stopped)
+        self.engine_signals.reconnecting.connect(self.on_reconnecting)
+
+        # Восстанавливаем сохранённые камеры и их списки объектов
+        for camera in load_cameras(WATCHLIST_PATH):
+            self.engine.add_stream(**camera)
+        if not self.engine.streams:
+            self.engine.add_stream()
+        self.streams = self.engine.streams
+        # Камера, список объектов которой редактируется на первой вкладке
+        self.current_stream = self.streams[0]
+        # Словарь готовится в фоновом потоке: кодирование промптов CLIP или запрос к серверу
+        # инференса не должны задерживать окно. Детектор начнёт работу, когда словарь применится
+        self.engine.update_vocabulary()
+        # Словари сохранённых профилей готовятся в фоне, чтобы переключение было мгновенным
+        self.profiles = load_profiles(PROFILES_PATH)
+        for cameras in self.profiles.values():
+            self.engine.prefetch_profile(cameras)
+        # RESTORE_LAST_SEEN=1: таймеры отсутствия продолжаются с последних обнаружений из журнала
+        if os.environ.get("RESTORE_LAST_SEEN"):
+            for stream in self.streams:
+                self.engine.restore_last_seen(stream)
+
+        # Панели камер на вкладке мониторинга
+        self.panels = {}
+
+        # Подписи объектов рендерятся один раз на промпт
+        self.label_sprites = LabelSprites()
+
+        # Кадры выводятся не чаще обновления экрана, независимо от частоты камер и детектора
+        refresh_rate = QApplication.primaryScreen().refreshRate() or 60
+        self.present_timer = QTimer(self)
+        self.present_timer.setInterval(max(1, int(1000 / refresh_rate)))
+        self.present_timer.timeout.connect(self.present_frames)
         
         # Для уведомления
         self.setup_tray_icon()
 
-        # Таймер для видео
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_frame)
-
         # Установка стилей
         self.apply_styles()
 
         # Установка UI
         self.init_ui()
 
-        # Переменная для хранения объекта захвата камеры
-        self.cap = None
-
     def setup_tray_icon(self):
         # Создание значка в системном трее
         self.tray_icon = QSystemTrayIcon(self)
@@ -227,6 +436,57 @@ class VideoWidget(QWidget):
         header_label.setStyleSheet(f"font-size: 18px; font-weight: bold; color: {COLORS['pine_green']}; margin: 10px 0; padding: 8px;")
         header_label.setAlignment(Qt.AlignCenter)
         
+        # Секция выбора камеры: у каждой камеры свой список объектов
+        camera_setting = QWidget()
+        camera_setting.setStyleSheet(f"background-color: white; border-radius: 8px; border: 1px solid {COLORS['soft_cream']};")
+        camera_setting_layout = QHBoxLayout(camera_setting)
+        camera_setting_layout.setContentsMargins(15, 15, 15, 15)
+        
+        camera_select_label = QLabel("Камера:")
+        camera_select_label.setStyleSheet("font-weight: bold;")
+        self.camera_selector = QComboBox()
+        self.camera_selector.setMinimumHeight(30)
+        self.camera_selector.setMinimumWidth(180)
+        self.camera_selector.currentIndexChanged.connect(self.select_stream)
+        
+        self.source_input = QLineEdit()
+        self.source_input.setPlaceholderText("Индекс камеры, файл или URL")
+        self.source_input.setMinimumHeight(30)
+        
+        add_camera_button = StyleableButton("Добавить камеру", color=COLORS['sage'])
+        add_camera_button.clicked.connect(self.add_camera)
+        remove_camera_button = StyleableButton("Удалить камеру", color=COLORS['brown_beige'])
+        remove_camera_button.clicked.connect(self.remove_camera)
+        
+        camera_setting_layout.addWidget(camera_select_label)
+        camera_setting_layout.addWidget(self.camera_selector)
+        camera_setting_layout.addWidget(remove_camera_button)
+        camera_setting_layout.addSpacing(20)
+        camera_setting_layout.addWidget(self.source_input, 1)
+        camera_setting_layout.addWidget(add_camera_button)
+        
+        # Секция профилей: именованные наборы списков объектов всех камер
+        profile_setting = QWidget()
+        profile_setting.setStyleSheet(f"background-color: white; border-radius: 8px; border: 1px solid {COLORS['soft_cream']};")
+        profile_setting_layout = QHBoxLayout(profile_setting)
+        profile_setting_layout.setContentsMargins(15, 15, 15, 15)
+        
+        profile_label = QLabel("Профиль:")
+        profile_label.setStyleSheet("font-weight: bold;")
+        self.profile_selector = QComboBox()
+        self.profile_selector.setMinimumHeight(30)
+        self.profile_selector.setMinimumWidth(180)
+        self.refresh_profile_selector()
+        self.profile_selector.activated.connect(self.apply_profile)
+        
+        save_profile_button = StyleableButton("Сохранить профиль", color=COLORS['sage'])
+        save_profile_button.clicked.connect(self.save_profile)
+        
+        profile_setting_layout.addWidget(profile_label)
+        profile_setting_layout.addWidget(self.profile_selector)
+        profile_setting_layout.addWidget(save_profile_button)
+        profile_setting_layout.addStretch()
+        
         # Секция ввода с описанием
         input_section = QWidget()
         input_section.setStyleSheet(f"background-color: white; border-radius: 8px; border: 1px solid {COLORS['soft_cream']};")
@@ -266,7 +526,7 @@ class VideoWidget(QWidget):
         time_label.setStyleSheet("font-weight: bold;")
         self.max_time_spinner = QSpinBox()
         self.max_time_spinner.setRange(5, 300)
-        self.max_time_spinner.setValue(self.max_absence_time)
+        self.max_time_spinner.setValue(self.current_stream.max_absence_time)
         self.max_time_spinner.valueChanged.connect(self.update_max_time)
         self.max_time_spinner.setMinimumHeight(30)
         self.max_time_spinner.setFixedWidth(80)
@@ -305,6 +565,7 @@ class VideoWidget(QWidget):
         
         class_container_layout.addWidget(scroll_area)
         
+        self.refresh_camera_selector()
         self.update_class_cards()
         
         # Добавить разделительный элемент
@@ -318,6 +579,10 @@ class VideoWidget(QWidget):
         
         layout1 = QVBoxLayout()
         layout1.addWidget(header_label)
+        layout1.addWidget(camera_setting)
+        layout1.addSpacing(10)
+        layout1.addWidget(profile_setting)
+        layout1.addSpacing(10)
         layout1.addWidget(input_section)
         layout1.addWidget(spacer1)
         layout1.addWidget(time_setting)
@@ -334,77 +599,50 @@ class VideoWidget(QWidget):
         video_header.setAlignment(Qt.AlignCenter)
         video_header.setStyleSheet(f"font-size: 18px; font-weight: bold; color: {COLORS['pine_green']}; margin: 10px 0; padding: 8px;")
         
-        # Создаем горизонтальный макет для камеры и панели отслеживания
-        camera_tracking_layout = QHBoxLayout()
-        camera_tracking_layout.setSpacing(15)
+        # Панели камер: по одной на каждый поток
+        panels_container = QWidget()
+        self.panels_grid = QGridLayout(panels_container)
+        self.panels_grid.setSpacing(15)
+        self.panels_grid.setContentsMargins(0, 0, 0, 0)
+        self.rebuild_panels()
         
-        # Левая часть - Секция камеры
-        camera_section = QWidget()
-        camera_section.setStyleSheet(f"background-color: white; border-radius: 8px; border: 1px solid {COLORS['soft_cream']};")
-        camera_layout = QVBoxLayout(camera_section)
-        camera_layout.setContentsMargins(15, 15, 15, 15)
-        
-        camera_label = QLabel("Видеокамера:")
-        camera_label.setStyleSheet("font-weight: bold;")
-        camera_layout.addWidget(camera_label)
-        
-        self.image_label = QLabel()
-        self.image_label.setFixedSize(640, 480)
-        self.image_label.setStyleSheet(f"border: 2px solid {COLORS['sage']}; border-radius: 8px; background-color: black;")
-        self.image_label.setAlignment(Qt.AlignCenter)
+        panels_scroll = QScrollArea()
+        panels_scroll.setWidgetResizable(True)
+        panels_scroll.setWidget(panels_container)
         
         camera_controls = QWidget()
         camera_controls_layout = QHBoxLayout(camera_controls)
         camera_controls_layout.setContentsMargins(0, 0, 0, 0)
         
-        self.start_button = StyleableButton("Запустить камеру", color=COLORS['sage'])
+        self.start_button = StyleableButton("Запустить камеры", color=COLORS['sage'])
         self.start_button.setMinimumWidth(150)
         self.start_button.clicked.connect(self.start_camera)
         
-        self.stop_button = StyleableButton("Остановить камеру", color=COLORS['brown_beige'])
+        self.stop_button = StyleableButton("Остановить камеры", color=COLORS['brown_beige'])
         self.stop_button.setMinimumWidth(150)
         self.stop_button.clicked.connect(self.stop_camera)
         
+        # Доля кадров, на которых детектор не запускался из-за статичной сцены
+        self.motion_label = QLabel()
+        self.motion_label.setStyleSheet("font-size: 12px; color: #777;")
+        self.update_motion_label()
+
+        self.metrics_checkbox = QCheckBox("Метрики на кадре")
+        self.metrics_checkbox.setStyleSheet("font-size: 12px; color: #777;")
+        
         camera_controls_layout.addStretch()
         camera_controls_layout.addWidget(self.start_button)
         camera_controls_layout.addSpacing(10)
         camera_controls_layout.addWidget(self.stop_button)
         camera_controls_layout.addStretch()
-        
-        camera_layout.addWidget(self.image_label, alignment=Qt.AlignCenter)
-        camera_layout.addWidget(camera_controls)
-        
-        # Правая часть - Секция отслеживания статуса
-        status_section = QWidget()
-        status_section.setStyleSheet(f"""
-            background-color: white;
-            border-radius: 8px;
-            border: 1px solid {COLORS['soft_cream']};
-        """)
-        status_section.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Expanding)
-        
-        status_layout = QVBoxLayout(status_section)
-        status_layout.setContentsMargins(15, 15, 15, 15)
-        
-        status_header = QLabel("Статус отслеживаемых объектов")
-        status_header.setStyleSheet("font-weight: bold;")
-        
-        self.status_grid = QGridLayout()
-        self.status_grid.setColumnStretch(1, 1)
-        self.status_grid.setSpacing(10)
-        self.update_status_bars()
-        
-        status_layout.addWidget(status_header)
-        status_layout.addLayout(self.status_grid)
-        status_layout.addStretch()
-        
-        # Добавляем обе секции в основной горизонтальный макет
-        camera_tracking_layout.addWidget(camera_section, 7)  # 70% ширины
-        camera_tracking_layout.addWidget(status_section, 3)  # 30% ширины
+        camera_controls_layout.addWidget(self.motion_label)
+        camera_controls_layout.addSpacing(10)
+        camera_controls_layout.addWidget(self.metrics_checkbox)
         
         layout2 = QVBoxLayout()
         layout2.addWidget(video_header)
-        layout2.addLayout(camera_tracking_layout, 1)  # Даем коэффициент растяжения
+        layout2.addWidget(panels_scroll, 1)  # Даем коэффициент растяжения
+        layout2.addWidget(camera_controls)
         layout2.setContentsMargins(20, 20, 20, 20)
         tab2.setLayout(layout2)
 
@@ -419,11 +657,110 @@ class VideoWidget(QWidget):
         # Устанавливаем разумный размер
         self.setMinimumSize(1080, 720)
     
+    def save_state(self):
+        save_cameras(WATCHLIST_PATH, self.streams)
+
+    def refresh_camera_selector(self):
+        self.camera_selector.blockSignals(True)
+        self.camera_selector.clear()
+        for stream in self.streams:
+            self.camera_selector.addItem(stream.name)
+        self.camera_selector.setCurrentIndex(self.streams.index(self.current_stream))
+        self.camera_selector.blockSignals(False)
+
+    def select_stream(self, index):
+        if not 0 <= index < len(self.streams):
+            return
+        self.current_stream = self.streams[index]
+        self.max_time_spinner.blockSignals(True)
+        self.max_time_spinner.setValue(self.current_stream.max_absence_time)
+        self.max_time_spinner.blockSignals(False)
+        self.update_class_cards()
+
+    def add_camera(self):
+        text = self.source_input.text().strip()
+        if not text:
+            QMessageBox.warning(self, "Внимание", "Введите индекс камеры, путь к видеофайлу или URL потока.")
+            return
+        source = parse_source(text)
+        if any(stream.source == source for stream in self.streams):
+            QMessageBox.warning(self, "Внимание", "Эта камера уже добавлена.")
+            return
+
+        stream = self.engine.add_stream(source)
+        self.current_stream = stream
+        self.source_input.clear()
+        self.refresh_camera_selector()
+        self.select_stream(len(self.streams) - 1)
+        self.rebuild_panels()
+        self.save_state()
+
+    def remove_camera(self):
+        if len(self.streams) == 1:
+            QMessageBox.warning(self, "Внимание", "Нельзя удалить единственную камеру.")
+            return
+        stream = self.current_stream
+        self.stop_stream(stream)
+        self.engine.remove_stream(stream)
+        self.current_stream = self.streams[0]
+        self.refresh_camera_selector()
+        self.select_stream(0)
+        self.rebuild_panels()
+        self.save_state()
+
+    def refresh_profile_selector(self, current=None):
+        self.profile_selector.blockSignals(True)
+        self.profile_selector.clear()
+        self.profile_selector.addItem("—")
+        self.profile_selector.addItems(sorted(self.profiles))
+        if current in self.profiles:
+            self.profile_selector.setCurrentText(current)
+        self.profile_selector.blockSignals(False)
+
+    def save_profile(self):
+        name, ok = QInputDialog.getText(
+            self, "Сохранить профиль", "Название профиля (списки объектов и зоны всех камер):",
+            text=self.profile_selector.currentText() if self.profile_selector.currentIndex() > 0 else "",
+        )
+        name = name.strip()
+        if not ok or not name:
+            return
+        save_profile(PROFILES_PATH, name, self.streams)
+        self.profiles = load_profiles(PROFILES_PATH)
+        self.refresh_profile_selector(name)
+
+    def apply_profile(self, index):
+        """Переключение профиля: детектор работает со старым словарём, пока готовится новый"""
+        cameras = self.profiles.get(self.profile_selector.itemText(index))
+        if cameras is None:
+            return
+        self.engine.apply_profile(cameras)
+        self.select_stream(self.streams.index(self.current_stream))
+        for panel in self.panels.values():
+            panel.update_status_bars()
+        self.save_state()
+
+    def rebuild_panels(self):
+        while self.panels_grid.count():
+            item = self.panels_grid.takeAt(0)
+            widget = item.widget()
+            if widget:
+                widget.deleteLater()
+
+        # Несколько камер выводим компактно в две колонки
+        compact = len(self.streams) > 1
+        columns = 2 if compact else 1
+        self.panels = {}
+        for i, stream in enumerate(self.streams):
+            panel = CameraPanel(stream, compact)
+            self.panels[stream] = panel
+            self.panels_grid.addWidget(panel, i // columns, i % columns)
+    
     def update_max_time(self, value):
-        self.max_absence_time = value
-        self.update_status_bars()
-        # Сбрасываем состояние уведомлений при изменении максимального времени
-        self.notified_objects = set()
+        stream = self.current_stream
+        self.engine.set_max_absence_time(stream, value)
+        self.panels[stream].update_status_bars()
+        self.save_state()
 
     def update_class_cards(self):
         # Очищаем существующие карточки
@@ -434,7 +771,7 @@ class VideoWidget(QWidget):
                 widget.deleteLater()
         
         # Добавляем новые карточки
-        display_classes = [cls for cls in self.selected_classes if cls != "__placeholder__"]
+        display_classes = self.current_stream.display_classes()
         
         if not display_classes:
             empty_label = QLabel("Список пуст. Добавьте объекты для отслеживания.")
@@ -443,338 +780,270 @@ class VideoWidget(QWidget):
             self.class_layout.addWidget(empty_label)
         else:
             for cls in display_classes:
-                card = ClassCard(cls, self.remove_class_by_name)
+                card = ClassCard(cls, self.remove_class_by_name, self.edit_zones, self.current_stream.zones.get(cls))
                 self.class_layout.addWidget(card)
             
             # Добавляем растяжку в конце
             self.class_layout.addStretch()
     
+    def edit_zones(self, class_name):
+        """Зоны объекта в долях кадра; пустая строка - искать по всему кадру"""
+        stream = self.current_stream
+        text, ok = QInputDialog.getText(
+            self, "Зоны объекта",
+            f"Зоны «{class_name}» в долях кадра x1,y1,x2,y2 через «;»\n"
+            "(например 0,0.5,0.5,1 - левая нижняя четверть). Пусто - весь кадр:",
+            text=format_zones(stream.zones.get(class_name, [])),
+        )
+        if not ok:
+            return
+        try:
+            zones = [parse_region(part) for part in text.split(";") if part.strip()]
+        except ValueError as e:
+            QMessageBox.warning(self, "Внимание", str(e))
+            return
+        self.engine.set_zones(stream, class_name, zones)
+        self.save_state()
+        self.update_class_cards()
+
     def remove_class_by_name(self, class_name):
-        if class_name in self.selected_classes:
-            self.selected_classes.remove(class_name)
-            self.last_seen.pop(class_name, None)
-            
-            # Добавляем заполнитель, если пользователь удалил все классы
-            # чтобы предотвратить сбой YOLO с пустым массивом
-            if not self.selected_classes:
-                # Используем специальный заполнитель, который пользователи не увидят в интерфейсе
-                self.selected_classes = ["__placeholder__"]
-                self.last_seen["__placeholder__"] = 0
-                
-            self.model.set_classes(self.selected_classes)
+        stream = self.current_stream
+        if class_name in stream.selected_classes:
+            self.engine.remove_class(stream, class_name)
+            self.save_state()
             self.update_class_cards()
-            self.update_status_bars()
-
-    def update_status_bars(self):
-        # Очищаем существующую сетку
-        while self.status_grid.count():
-            item = self.status_grid.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        
-        # Создаем индикаторы статуса для каждого класса
-        self.status_bars = {}
-        
-        # Фильтруем заполнители классов для отображения в интерфейсе
-        display_classes = [cls for cls in self.selected_classes if cls != "__placeholder__"]
-        
-        if not display_classes:
-            empty_label = QLabel("Нет объектов для отслеживания. Добавьте их во вкладке «Управление объектами»")
-            empty_label.setAlignment(Qt.AlignCenter)
-            empty_label.setStyleSheet(f"color: {COLORS['brown_beige']}; padding: 20px;")
-            self.status_grid.addWidget(empty_label, 0, 0, 1, 2)
-            return
-        
-        for i, cls in enumerate(display_classes):
-            # Метка имени класса с иконкой
-            name_container = QWidget()
-            name_container.setStyleSheet(f"background-color: white;")
-            name_layout = QHBoxLayout(name_container)
-            name_layout.setContentsMargins(0, 0, 0, 0)
-            
-            icon_label = QLabel()
-            icon_label.setFixedSize(16, 16)
-            icon_label.setStyleSheet(f"background-color: {COLORS['sage']}; border-radius: 8px;")
-            
-            # Сокращаем длинные имена/описания для отображения в статусной панели
-            display_name = cls
-            if len(display_name) > 30:
-                display_name = display_name[:27] + "..."
-                
-            class_label = QLabel(display_name)
-            class_label.setStyleSheet("font-weight: bold;")
-            class_label.setToolTip(cls)  # Полный текст при наведении
-            
-            name_layout.addWidget(icon_label)
-            name_layout.addWidget(class_label)
-            name_layout.addStretch()
-            
-            # Индикатор прогресса для времени отсутствия
-            progress_bar = QProgressBar()
-            progress_bar.setRange(0, self.max_absence_time)
-            progress_bar.setValue(0)
-            progress_bar.setFormat("%v сек / %m сек")
-            progress_bar.setStyleSheet(f"""
-                QProgressBar {{
-                    border: 1px solid {COLORS['soft_cream']};
-                    border-radius: 4px;
-                    text-align: center;
-                    height: 20px;
-                    margin: 2px;
-                }}
-                QProgressBar::chunk {{ 
-                    background-color: {COLORS['sage']};
-                    border-radius: 4px;
-                }}
-            """)
-            self.status_bars[cls] = progress_bar
-            
-            # Добавляем в сетку
-            self.status_grid.addWidget(name_container, i*2, 0)
-            self.status_grid.addWidget(progress_bar, i*2, 1)
-            
-            # Добавляем разделитель, если это не последний элемент
-            if i < len(display_classes) - 1:
-                line = QFrame()
-                line.setObjectName("separatorLine")
-                line.setFrameShape(QFrame.HLine)
-                line.setFrameShadow(QFrame.Sunken)
-                self.status_grid.addWidget(line, i*2+1, 0, 1, 2)
+            self.panels[stream].update_status_bars()
 
     def start_camera(self):
         # Проверяем, есть ли какие-либо реальные классы для отслеживания (исключая заполнитель)
-        display_classes = [cls for cls in self.selected_classes if cls != "__placeholder__"]
-        if not display_classes:
+        streams = [stream for stream in self.streams if stream.display_classes()]
+        if not streams:
             QMessageBox.warning(self, "Внимание", "Нет объектов для отслеживания. Добавьте хотя бы один объект.")
             return
-            
-        if self.cap is None or not self.cap.isOpened():
-            self.cap = cv2.VideoCapture(0)
-            if not self.cap.isOpened():
-                self.cap = cv2.VideoCapture(1)
-        if not self.cap.isOpened():
-            QMessageBox.critical(self, "Ошибка", "Не удалось получить доступ к веб-камере.")
-            return
-            
-        # Сбрасываем состояние уведомлений при запуске камеры
-        self.notified_objects = set()
-        self.timer.start(30)
+
+        failed = []
+        for stream in streams:
+            if not self.engine.start_stream(stream):
+                failed.append(stream.name)
+
+        if self.engine.running_streams():
+            self.present_timer.start()
+        if failed:
+            QMessageBox.critical(self, "Ошибка", f"Не удалось получить доступ к камерам: {', '.join(failed)}.")
+
+    def stop_stream(self, stream):
+        """Остановка одной камеры и сброс её индикаторов"""
+        self.engine.stop_stream(stream)
+        self.on_stream_stopped(stream)
+
+    def on_stream_stopped(self, stream):
+        if not self.engine.running_streams():
+            self.present_timer.stop()
+        panel = self.panels.get(stream)
+        if panel is not None:
+            panel.reset_status_bars()
+            panel.show_blank()
+
+    def on_reconnecting(self, stream, connected):
+        """Камера потеряла сигнал: вместо застывшего кадра сообщение, пока она переподключается"""
+        panel = self.panels.get(stream)
+        if panel is not None and not connected and stream.running:
+            panel.frame_view.show_message("Нет сигнала, переподключение...")
 
     def stop_camera(self):
-        """Остановка камеры и сброс состояния отслеживания"""
-        self.timer.stop()
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
-            self.cap = None
-            
-        # Сбрасываем индикаторы прогресса на ноль
-        for cls, progress_bar in self.status_bars.items():
-            progress_bar.setValue(0)
-            progress_bar.setStyleSheet(f"""
-                QProgressBar {{
-                    border: 1px solid {COLORS['soft_cream']};
-                    border-radius: 4px;
-                    text-align: center;
-                    height: 20px;
-                    margin: 2px;
-                }}
-                QProgressBar::chunk {{ 
-                    background-color: {COLORS['sage']};
-                    border-radius: 4px;
-                }}
-            """)
-            
-        blank = 255 * np.ones((480, 640, 3), dtype=np.uint8)
-        self.display_frame(blank)
+        """Остановка всех камер и сброс состояния отслеживания"""
+        for stream in self.streams:
+            self.stop_stream(stream)
 
-    def update_frame(self):
-        ret, frame = self.cap.read()
-        if not ret:
-            self.stop_camera()  # Правильно останавливаем камеру, если не можем получить кадр
-            return
+    def present_frames(self):
+        """Отрисовка свежих кадров камер с последними известными обнаружениями.
+
+        Вызывается таймером с частотой обновления экрана: кадры, пришедшие
+        между тиками, не рисуются вовсе, сколько бы их ни отдала камера.
+        """
+        for stream in self.streams:
+            panel = self.panels.get(stream)
+            item = stream.display_slot.take()
+            if item is None:
+                continue
+            try:
+                self.present_frame(stream, panel, item[0])
+            finally:
+                # fit_frame копирует кадр, так что буфер можно вернуть в пул захвата
+                stream.frame_pool.release(item[0])
 
+    def present_frame(self, stream, panel, frame):
+        if panel is None:
+            return
         # Проверяем, есть ли какие-либо реальные классы для отслеживания (исключая заполнитель)
-        display_classes = [cls for cls in self.selected_classes if cls != "__placeholder__"]
-        if not display_classes:
-            # Отображаем сообщение на кадре
-            blank = 255 * np.ones((480, 640, 3), dtype=np.uint8)
-            cv2.putText(blank, "Нет объектов для отслеживания", (120, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
-            self.display_frame(blank)
+        if not stream.display_classes():
+            panel.frame_view.show_message("Нет объектов для отслеживания")
             return
 
-        now = time.time()
-        results = self.model(frame)[0]
-
-        # Обновляем время обнаружения
-        detected = set()
-        for box in results.boxes:
-            cls_idx = int(box.cls[0])
-            if cls_idx < len(self.selected_classes):
-                detected.add(self.selected_classes[cls_idx])
-
-        for cls in detected:
-            self.last_seen[cls] = now
-
-        # Отображаем обнаружения
-        for box in results.boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cls_idx = int(box.cls[0])
-            conf = float(box.conf[0])
-            class_name = self.selected_classes[cls_idx] if cls_idx < len(self.selected_classes) else str(cls_idx)
-            
-            # Пропускаем отображение класса-заполнителя
-            if class_name == "__placeholder__":
-                continue
-            
-            # Для отображения на экране используем сокращенное имя, если текст слишком длинный
-            display_name = class_name
-            if len(display_name) > 20:  # На видео нужно совсем короткое название
-                display_name = display_name[:17] + "..."
-                
-            # Убираем отображение процентов, оставляем только название объекта
-            label = display_name
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-
-        # Проверяем объекты, отсутствующие максимальное время
-        max_time_exceeded = False
-        missing_objects = []
-        
-        # Обновляем индикаторы статуса - только для реальных классов, не заполнителей
-        for cls in display_classes:
-            if cls in self.status_bars:
-                absence_time = int(now - self.last_seen.get(cls, 0)) if self.last_seen.get(cls, 0) > 0 else 0
-                # Ограничиваем максимальным значением
-                absence_time = min(absence_time, self.max_absence_time)
-                self.status_bars[cls].setValue(absence_time)
-                
-                # Проверяем, отсутствует ли объект максимальное время
-                if absence_time >= self.max_absence_time and cls not in self.notified_objects:
-                    missing_objects.append(cls)
-                    self.notified_objects.add(cls)
-                    max_time_exceeded = True
-                
-                # Обновляем цвет в зависимости от времени отсутствия
-                if absence_time > self.max_absence_time * 0.75:
-                    self.status_bars[cls].setStyleSheet("""
-                        QProgressBar {
-                            border: 1px solid #DCD0C0;
-                            border-radius: 4px;
-                            text-align: center;
-                            height: 20px;
-                        }
-                        QProgressBar::chunk { 
-                            background-color: #D9534F;
-                            border-radius: 4px;
-                        }
-                    """)
-                elif absence_time > self.max_absence_time * 0.5:
-                    self.status_bars[cls].setStyleSheet("""
-                        QProgressBar {
-                            border: 1px solid #DCD0C0;
-                            border-radius: 4px;
-                            text-align: center;
-                            height: 20px;
-                        }
-                        QProgressBar::chunk { 
-                            background-color: #F0AD4E;
-                            border-radius: 4px;
-                        }
-                    """)
-                else:
-                    self.status_bars[cls].setStyleSheet(f"""
-                        QProgressBar {{
-                            border: 1px solid #DCD0C0;
-                            border-radius: 4px;
-                            text-align: center;
-                            height: 20px;
-                        }}
-                        QProgressBar::chunk {{ 
-                            background-color: {COLORS['sage']};
-                            border-radius: 4px;
-                        }}
-                    """)
-        
-        # Показываем уведомление, если превышено максимальное время
-        if max_time_exceeded:
-            self.show_notification(missing_objects)
-            # Останавливаем камеру после уведомления
-            self.stop_camera()
-            return
+        started = time.perf_counter()
+        panel.display_frame(frame, stream.last_detections, self.label_sprites, self.current_overlay())
+        self.metrics.observe("display", time.perf_counter() - started)
 
-        self.display_frame(frame)
+    def current_overlay(self):
+        """Строки оверлея метрик; перцентили пересчитываются не чаще двух раз в секунду"""
+        if not self.metrics_checkbox.isChecked():
+            return None
+        now = time.monotonic()
+        if now - self.overlay_updated > 0.5:
+            self.overlay_lines = self.metrics.overlay_lines()
+            self.overlay_updated = now
+        return self.overlay_lines
 
-    def display_frame(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        qt_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-        self.image_label.setPixmap(QPixmap.fromImage(qt_img))
+    def on_status(self, stream, absence):
+        """Обновление индикаторов по таймерам отсутствия из движка"""
+        panel = self.panels.get(stream)
+        if stream.running and panel is not None:
+            started = time.perf_counter()
+            panel.update_absence(absence)
+            self.metrics.observe("status_update", time.perf_counter() - started)
+        self.update_motion_label()
+
+    def update_motion_label(self):
+        self.motion_label.setText(f"Статичных кадров без детектора: {self.motion_gate.skip_ratio:.0%}")
 
     def add_class(self):
+        stream = self.current_stream
         new_cls = self.input_line.text().strip()
         if not new_cls:
             QMessageBox.warning(self, "Внимание", "Введите название или описание объекта для отслеживания.")
             return
-        if new_cls in self.selected_classes:
+        if new_cls in stream.selected_classes:
             QMessageBox.warning(self, "Внимание", "Этот объект уже добавлен.")
             return
             
-        # Если у нас был только класс-заполнитель, полностью заменяем его
-        if len(self.selected_classes) == 1 and self.selected_classes[0] == "__placeholder__":
-            self.selected_classes = [new_cls]
-        else:
-            self.selected_classes.append(new_cls)
-            
-        self.model.set_classes(self.selected_classes)
+        self.engine.add_class(stream, new_cls)
+        self.save_state()
         
-        # Новый класс пока не обнаружен -> считаем отсутствующим
-        self.last_seen[new_cls] = 0
         self.update_class_cards()
-        self.update_status_bars()
+        self.panels[stream].update_status_bars()
         self.input_line.clear()
 
-    def show_notification(self, missing_objects):
-        """Показать уведомление об отсутствующих объектах"""
-        if not missing_objects:
-            return
-            
-        # Для уведомления также используем короткие имена
-        shortened_objects = []
-        for obj in missing_objects:
-            if len(obj) > 30:
-                shortened_objects.append(obj[:27] + "...")
-            else:
-                shortened_objects.append(obj)
-                
-        object_list = ", ".join(shortened_objects)
+    def show_notification(self, alert):
+        """Уведомление об отсутствующих объектах; камера продолжает работать"""
         title = "Внимание! Объекты отсутствуют"
-        message = f"Следующие объекты отсутствуют более {self.max_absence_time} секунд: {object_list}"
-        
-        # Показываем уведомление в системном трее
-        self.tray_icon.showMessage(title, message, QSystemTrayIcon.Warning, 5000)
-        
-        # Также показываем диалоговое окно для большей заметности
-        QMessageBox.warning(self, title, message)
-        
-        # Сбрасываем время последнего обнаружения для всех объектов, чтобы разрешить перезапуск камеры
-        for obj in self.selected_classes:
-            self.last_seen[obj] = 0
-        
-        # Сбрасываем состояние уведомлений, чтобы разрешить новые уведомления
-        self.notified_objects = set()
+        self.tray_icon.showMessage(title, alert.message(), QSystemTrayIcon.Warning, 5000)
+        # Вместо модального окна - подсветка окна на панели задач
+        QApplication.alert(self)
+
+    def closeEvent(self, event):
+        self.engine.stop()
+        event.accept()
+
+class ModelLoader(QThread):
+    """Загрузка и прогрев модели в фоне, пока на экране окно загрузки"""
+    progress = pyqtSignal(str, int)
+    loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, model_path, parent=None):
+        super().__init__(parent)
+        self.model_path = model_path
+
+    def run(self):
+        try:
+            embedding_cache = TextEmbeddingCache(EMBEDDINGS_PATH)
+            # Словарь сохранённых камер ставится до прогрева, чтобы CLIP не запускался в потоке GUI
+            classes = MonitorEngine.vocabulary_for(camera["classes"] for camera in load_cameras(WATCHLIST_PATH))
+            model = load_model(
+                self.model_path, MODELS_DIR, classes, embedding_cache,
+                progress=lambda stage, fraction: self.progress.emit(stage, int(fraction * 100))
+            )
+        except Exception as e:
+            self.failed.emit(f"{type(e).__name__}: {e}")
+            return
+        self.loaded.emit(model, embedding_cache)
+
+
+class StartupWindow(QWidget):
+    """Окно загрузки: показывается сразу, главное окно открывается, когда модель готова"""
+    def __init__(self, model_path, backend="torch"):
+        super().__init__()
+        self.model_path = model_path
+        self.backend = backend
+        self.window = None
+        self.setWindowTitle('Мониторинг объектов')
+        self.setFixedSize(380, 150)
+        self.setStyleSheet(f"""
+            QWidget {{
+                background-color: {COLORS['light_bg']};
+                color: {COLORS['pine_green']};
+            }}
+            QProgressBar {{
+                border: 1px solid {COLORS['soft_cream']};
+                border-radius: 4px;
+                text-align: center;
+                height: 20px;
+            }}
+            QProgressBar::chunk {{
+                background-color: {COLORS['sage']};
+                border-radius: 4px;
+            }}
+        """)
+
+        layout = QVBoxLayout(self)
+        title = QLabel("Мониторинг объектов")
+        title.setFont(QFont("Arial", 14, QFont.Bold))
+        title.setAlignment(Qt.AlignCenter)
+        self.stage_label = QLabel("Запуск")
+        self.stage_label.setAlignment(Qt.AlignCenter)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        layout.addWidget(title)
+        layout.addWidget(self.stage_label)
+        layout.addWidget(self.progress_bar)
+
+        self.loader = ModelLoader(model_path, self)
+        self.loader.progress.connect(self.on_progress)
+        self.loader.loaded.connect(self.on_loaded)
+        self.loader.failed.connect(self.on_failed)
+
+    def load(self):
+        self.loader.start()
+
+    def on_progress(self, stage, percent):
+        self.stage_label.setText(stage)
+        self.progress_bar.setValue(percent)
+
+    def on_loaded(self, model, embedding_cache):
+        self.window = VideoWidget(model, self.backend, embedding_cache)
+        self.window.setWindowTitle('Мониторинг объектов')
+        self.window.show()
+        self.close()
+
+    def on_failed(self, message):
+        QMessageBox.critical(self, "Ошибка", f"Не удалось загрузить модель {self.model_path}:\n{message}")
+        self.close()
 
     def closeEvent(self, event):
-        if self.cap and self.cap.isOpened():
-            self.cap.release()
+        if self.window is None and self.loader.isRunning():
+            # Загрузку не прервать: дожидаемся потока, чтобы приложение не упало при выходе
+            self.loader.loaded.disconnect()
+            self.loader.wait()
         event.accept()
 
+
 if __name__ == '__main__':
-    model = YOLO('/Users/pavelstarostin/Source/course_work/LVIS.pt')
     app = QApplication(sys.argv)
     # Установка шрифта для всего приложения для улучшения четкости
     app.setFont(QFont("Arial", 10))
-    window = VideoWidget(model)
-    window.setWindowTitle('Мониторинг объектов')
-    window.show()
+    if os.environ.get("INFERENCE_SERVER"):
+        # Тонкий клиент: модель загружена на сервере инференса (см. inference_server.py),
+        # FRAME_TRANSPORT - как передавать кадры: jpeg, raw или shm
+        from inference_server import RemoteBackend
+
+        remote = RemoteBackend(os.environ["INFERENCE_SERVER"], os.environ.get("FRAME_TRANSPORT", "jpeg"))
+        window = VideoWidget(None, remote, TextEmbeddingCache())
+        window.setWindowTitle('Мониторинг объектов')
+        window.show()
+    else:
+        # Окно загрузки появляется сразу, а тяжёлые импорты, загрузка и прогрев модели идут в фоне.
+        # MODEL_PATH - веса YOLO-World, DETECTOR_BACKEND - бэкенд инференса: torch, onnx, openvino или onnx-int8
+        startup = StartupWindow(os.environ.get("MODEL_PATH", "LVIS.pt"), os.environ.get("DETECTOR_BACKEND", "torch"))
+        startup.show()
+        startup.load()
     sys.exit(app.exec_())
@@ -0,0 +1,226 @@
+"""Бэкенды инференса для детектора.
+
+TorchBackend - исходный режим: модель YOLO-World на PyTorch.
+ExportedBackend - после фиксации списка объектов экспортирует модель с
+зашитыми текстовыми эмбеддингами в ONNX или OpenVINO и дальше прогоняет
+кадры через экспортированный граф. Артефакты кэшируются на диске по хэшу
+словаря, так что повторное появление того же списка объектов не требует
+экспорта. При изменении списка детектор сразу продолжает работу на PyTorch,
+а экспорт нового артефакта идёт в фоне.
+Формат onnx-int8 - ONNX, квантованный в INT8 по кадрам калибровки из
+записей камер (см. quantize.py).
+
+Смена словаря разделена на две части: prepare(vocabulary) - медленная
+(текстовый энкодер, загрузка экспортированной модели) и может идти в
+фоновом потоке, пока детектор работает со старым словарём; apply(prepared)
+- только присваивания, её детектор выполняет между пакетами кадров.
+"""
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+
+from embeddings import apply_text_features, set_classes_cached, text_features
+
+BACKENDS = ("torch", "onnx", "openvino", "onnx-int8")
+
+
+class PreparedVocabulary:
+    """Всё, что нужно для мгновенной смены словаря модели"""
+    def __init__(self, vocabulary, txt_feats=None):
+        self.vocabulary = vocabulary
+        # Эмбеддинги промптов (None - модель без текстового энкодера, например заглушка)
+        self.txt_feats = txt_feats
+        # Для ExportedBackend: ключ словаря и уже загруженная экспортированная модель
+        self.key = None
+        self.runner = None
+
+
+def apply_vocabulary(model, prepared):
+    if prepared.txt_feats is None:
+        model.set_classes(list(prepared.vocabulary))
+    else:
+        apply_text_features(model, prepared.vocabulary, prepared.txt_feats)
+
+
+class TorchBackend:
+    name = "torch"
+    # Сколько пакетов бэкенд может обрабатывать одновременно
+    concurrency = 1
+
+    def __init__(self, model, embedding_cache=None):
+        self.model = model
+        self.embedding_cache = embedding_cache
+
+    def set_classes(self, classes):
+        self.apply(self.prepare(classes))
+
+    def prepare(self, vocabulary):
+        if not hasattr(getattr(self.model, "model", None), "get_text_pe"):
+            # Старые версии ultralytics кодируют промпты только через set_classes,
+            # меняя саму модель, - такой словарь кодируется в apply, между пакетами
+            return PreparedVocabulary(vocabulary)
+        # Через текстовый энкодер проходят только промпты, которых нет в кэше
+        return PreparedVocabulary(vocabulary, text_features(self.model, vocabulary, self.embedding_cache))
+
+    def apply(self, prepared):
+        net = getattr(self.model, "model", None)
+        if prepared.txt_feats is None and self.embedding_cache is not None and hasattr(net, "txt_feats"):
+            set_classes_cached(self.model, list(prepared.vocabulary), self.embedding_cache)
+        else:
+            apply_vocabulary(self.model, prepared)
+
+    def __call__(self, frames, **kwargs):
+        return self.model(frames, **kwargs)
+
+    def close(self):
+        pass
+
+
+class ExportedBackend(TorchBackend):
+    def __init__(self, model, export_format, cache_dir, embedding_cache=None, imgsz=640):
+        super().__init__(model, embedding_cache)
+        self.name = export_format
+        self.export_format = export_format
+        self.cache_dir = cache_dir
+        self.imgsz = imgsz
+
+        self._lock = threading.Condition()
+        # Ключ текущего словаря и экспортированная модель для него (None - пока работает PyTorch)
+        self._key = None
+        self._runner = None
+        # Последний запрос на экспорт: более старые вытесняются, как кадры в FrameSlot
+        self._pending = None
+        # Ключ словаря, экспорт которого не удался, и причина
+        self._failed = None
+        self.error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._export_loop, daemon=True)
+        self._thread.start()
+
+    def vocabulary_key(self, classes):
+        weights = getattr(self.model, "ckpt_path", None) or ""
+        stat = os.stat(weights) if weights and os.path.exists(weights) else None
+        payload = {
+            "weights": os.path.abspath(weights) if weights else "",
+            "size": stat.st_size if stat else 0,
+            "mtime": int(stat.st_mtime) if stat else 0,
+            "classes": list(classes),
+            "format": self.export_format,
+            "imgsz": self.imgsz,
+        }
+        data = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        return hashlib.sha1(data).hexdigest()[:16]
+
+    def artifact_path(self, key):
+        if self.export_format == "openvino":
+            return os.path.join(self.cache_dir, f"{key}_openvino_model")
+        if self.export_format == "onnx-int8":
+            return os.path.join(self.cache_dir, f"{key}.int8.onnx")
+        return os.path.join(self.cache_dir, f"{key}.{self.export_format}")
+
+    def prepare(self, vocabulary):
+        prepared = super().prepare(vocabulary)
+        prepared.key = self.vocabulary_key(vocabulary)
+        path = self.artifact_path(prepared.key)
+        if os.path.exists(path):
+            # Готовый артефакт загружается заранее, чтобы смена словаря была мгновенной
+            from ultralytics import YOLO
+
+            prepared.runner = YOLO(path, task="detect")
+        return prepared
+
+    def apply(self, prepared):
+        # PyTorch-модель получает новый словарь сразу, чтобы детектор не простаивал
+        super().apply(prepared)
+        with self._lock:
+            self._key = prepared.key
+            self._runner = prepared.runner
+            if prepared.runner is not None:
+                self._pending = None
+                self._lock.notify_all()
+            else:
+                # Копию модели под новый словарь делает поток экспорта, а не детектор
+                self._pending = (prepared.key, prepared)
+                self._lock.notify()
+
+    def wait_ready(self, timeout=None):
+        """Ожидание готовности экспортированной модели для текущего словаря; False - экспорт не удался"""
+        with self._lock:
+            self._lock.wait_for(
+                lambda: self._runner is not None or self._closed or (self._key is not None and self._failed == self._key),
+                timeout,
+            )
+            return self._runner is not None
+
+    def __call__(self, frames, **kwargs):
+        runner = self._runner
+        if runner is None:
+            return self.model(frames, **kwargs)
+        return runner(frames, **kwargs)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+
+    def _load(self, key, path):
+        from ultralytics import YOLO
+
+        runner = YOLO(path, task="detect")
+        with self._lock:
+            # Пока грузили, словарь мог смениться ещё раз
+            if key == self._key:
+                self._runner = runner
+                self._lock.notify_all()
+
+    def _export_loop(self):
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._pending is not None or self._closed)
+                if self._closed:
+                    return
+                key, prepared = self._pending
+                self._pending = None
+
+            path = self.artifact_path(key)
+            try:
+                if not os.path.exists(path):
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    if self.export_format == "onnx-int8":
+                        from quantize import calibration_dir, export_int8, load_calibration
+
+                        frames = load_calibration(calibration_dir(self.cache_dir))
+                        if not frames:
+                            raise RuntimeError("нет кадров калибровки, запустите quantize.py")
+                        export_int8(self.model, prepared, path, frames, self.imgsz)
+                    else:
+                        shutil.move(export_model(self.model, prepared, self.export_format, self.imgsz), path)
+                self._load(key, path)
+            except Exception as e:
+                print(f"Не удалось экспортировать модель в {self.export_format}, остаётся PyTorch: {e}", file=sys.stderr)
+                with self._lock:
+                    self._failed = key
+                    self.error = str(e)
+                    self._lock.notify_all()
+
+
+def export_model(model, prepared, export_format, imgsz=640):
+    """Экспорт копии модели с зашитым словарём prepared; возвращает путь к артефакту"""
+    # Копия фиксирует словарь; кэшированный CLIP и предиктор не копируем
+    net = model.model
+    memo = {id(getattr(net, "clip_model", None)): None, id(model.predictor): None}
+    model = copy.deepcopy(model, memo)
+    apply_vocabulary(model, prepared)
+    return str(model.export(format=export_format, imgsz=imgsz, dynamic=True))
+
+
+def create_backend(model, kind="torch", embedding_cache=None, cache_dir=None, imgsz=640):
+    if kind == "torch":
+        return TorchBackend(model, embedding_cache)
+    if kind in ("onnx", "openvino", "onnx-int8"):
+        return ExportedBackend(model, kind, cache_dir, embedding_cache, imgsz)
+    raise ValueError(f"Неизвестный бэкенд: {kind}")
@@ -0,0 +1,192 @@
+"""Доставка уведомлений и частота детектора.
+
+Движок мониторинга работает с синтетическими камерами и детектором-заглушкой,
+у которой каждый объект периодически пропадает на --period кадров, так что
+при пороге отсутствия --max-absence уведомления идут постоянно. Получатели:
+файл JSON Lines и webhook - локальный HTTP-сервер, который отвечает с
+задержкой --webhook-latency и с вероятностью --webhook-failure возвращает 500.
+Режимы:
+
+    inline      - как раньше: уведомление доставляется в обработчике
+                  on_absence, то есть в потоке детектора, с повторами;
+    dispatcher  - AlertDispatcher: обработчик только ставит уведомление в
+                  очередь, доставка, объединение и повторы идут в фоне.
+
+Для каждого режима выводятся частота результатов детектора, максимальный
+промежуток между ними и счётчики доставки.
+
+Пример:
+    python benchmarks/alert_dispatch_bench.py --cameras 4 --webhook-latency 0.5 --webhook-failure 0.3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import monitor  # noqa: E402
+from alerts import Alert, AlertDispatcher, JsonLinesSink, WebhookSink  # noqa: E402
+from backends import create_backend  # noqa: E402
+from monitor import MonitorEngine  # noqa: E402
+from replay import StubModel, SyntheticCapture  # noqa: E402
+
+MODES = ("inline", "dispatcher")
+
+
+class Capture(SyntheticCapture):
+    """Синтетическая камера, отдающая кадры с частотой fps"""
+    fps = 30
+
+    def __init__(self, *args):
+        super().__init__(640, 480)
+        self.next_frame = time.perf_counter()
+
+    def read(self):
+        delay = self.next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame, time.perf_counter() - 1 / self.fps) + 1 / self.fps
+        return super().read()
+
+    def set(self, *args):
+        return True
+
+    def get(self, *args):
+        return self.fps
+
+
+def webhook_server(latency, failure):
+    """Локальная замена внешнего сервиса уведомлений"""
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            if random.random() < failure:
+                self.send_response(500)
+            else:
+                received.append(time.time())
+                self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+
+def deliver_inline(sinks, alert, retries, retry_delay):
+    """Доставка в вызывающем потоке с теми же повторами, что у диспетчера"""
+    delivered = 0
+    for sink in sinks:
+        for attempt in range(retries + 1):
+            try:
+                sink.send(alert)
+                delivered += 1
+                break
+            except Exception:
+                if attempt < retries:
+                    time.sleep(retry_delay * 2 ** attempt)
+    return delivered
+
+
+def run_mode(mode, args):
+    server, received = webhook_server(args.webhook_latency, args.webhook_failure)
+    log_path = os.path.join(tempfile.mkdtemp(prefix="alerts_"), "alerts.jsonl")
+    url = f"http://127.0.0.1:{server.server_address[1]}/alerts"
+    sinks = [JsonLinesSink(log_path), WebhookSink(url)]
+
+    dispatcher = None
+    if mode == "dispatcher":
+        dispatcher = AlertDispatcher(sinks, args.coalesce, args.min_interval, args.retries, args.retry_delay)
+    model = StubModel(args.latency, args.per_frame, period=args.period, cycle=2)
+    engine = MonitorEngine(create_backend(model, "torch"), alerts=dispatcher)
+    for i in range(args.cameras):
+        engine.add_stream(f"camera{i}.mp4", args.prompts, args.max_absence)
+    engine.update_vocabulary(wait=True)
+
+    results = []
+    lock = threading.Lock()
+    handle_results = engine.detector.on_results
+    inline = {"alerts": 0, "delivered": 0}
+
+    def on_results(stream, detections, timestamp):
+        with lock:
+            results.append(time.perf_counter())
+        handle_results(stream, detections, timestamp)
+
+    def on_absence(stream, missing_objects):
+        alert = Alert(stream.name, stream.source, missing_objects, stream.max_absence_time, stream.last_clip)
+        inline["alerts"] += 1
+        inline["delivered"] += deliver_inline(sinks, alert, args.retries, args.retry_delay)
+
+    engine.detector.on_results = on_results
+    if mode == "inline":
+        engine.on_absence = on_absence
+    for stream in engine.streams:
+        engine.start_stream(stream)
+        # Объекты видны с запуска: отсчёт отсутствия идёт с момента пропадания
+        with engine.lock:
+            for cls in stream.selected_classes:
+                stream.last_seen[cls] = time.time()
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    with lock:
+        window = [started] + [moment for moment in results if moment >= started]
+    elapsed = time.perf_counter() - started
+    engine.stop()
+    server.shutdown()
+
+    row = {
+        "mode": mode,
+        "results_per_s": round((len(window) - 1) / elapsed, 1),
+        "max_result_gap_ms": round(float(np.max(np.diff(window))) * 1000, 1) if len(window) > 1 else None,
+        "webhook_received": len(received),
+    }
+    if dispatcher is not None:
+        row.update(dispatcher.stats)
+    else:
+        row.update(submitted=inline["alerts"], delivered=inline["delivered"])
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "laptop"])
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--max-absence", type=int, default=1, help="порог отсутствия, сек")
+    parser.add_argument("--period", type=int, default=120, help="кадров, на которые пропадает объект заглушки")
+    parser.add_argument("--latency", type=float, default=0.02, help="задержка заглушки на пакет, сек")
+    parser.add_argument("--per-frame", type=float, default=0.002, help="задержка заглушки на кадр пакета, сек")
+    parser.add_argument("--webhook-latency", type=float, default=0.5, help="задержка ответа webhook, сек")
+    parser.add_argument("--webhook-failure", type=float, default=0.3, help="доля ответов 500")
+    parser.add_argument("--coalesce", type=float, default=1.0)
+    parser.add_argument("--min-interval", type=float, default=10.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    Capture.fps = args.fps
+    monitor.cv2.VideoCapture = Capture
+    random.seed(0)
+    report = {"config": vars(args), "modes": [run_mode(mode, args) for mode in args.modes]}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
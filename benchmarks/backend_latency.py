@@ -0,0 +1,82 @@
+"""Сравнение задержки инференса на кадр для разных бэкендов.
+
+Для каждого бэкенда словарь фиксируется через set_classes, бенчмарк ждёт
+готовности экспортированной модели (экспорт кэшируется, поэтому повторный
+запуск быстрый), а затем замеряет время вызова детектора на кадрах из
+видеофайла или на синтетических кадрах.
+
+Пример:
+    python benchmarks/backend_latency.py --model LVIS.pt --video shelf.mp4 --backends torch onnx openvino
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from backends import BACKENDS, create_backend  # noqa: E402
+from monitor import EXPORTS_DIR  # noqa: E402
+
+
+def load_frames(video, count):
+    if not video:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(count)]
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--video", help="видеофайл с кадрами (по умолчанию синтетические кадры)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "laptop", "backpack"])
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--cache-dir", default=EXPORTS_DIR)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    frames = load_frames(args.video, args.frames + args.warmup)
+    print(f"{'бэкенд':>10} {'p50, мс':>9} {'p95, мс':>9} {'среднее, мс':>12} {'FPS':>7}")
+    for kind in args.backends:
+        backend = create_backend(YOLO(args.model), kind, cache_dir=args.cache_dir)
+        backend.set_classes(args.prompts)
+        if kind != "torch" and not backend.wait_ready():
+            print(f"{kind:>10} экспорт не удался")
+            continue
+
+        latencies = []
+        for i, frame in enumerate(frames):
+            start = time.perf_counter()
+            backend([frame], verbose=False)
+            if i >= args.warmup:
+                latencies.append((time.perf_counter() - start) * 1000)
+        backend.close()
+
+        mean = statistics.mean(latencies)
+        print(f"{kind:>10} {percentile(latencies, 50):>9.1f} {percentile(latencies, 95):>9.1f} "
+              f"{mean:>12.1f} {1000 / mean:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Задержка захвата: возраст кадра на входе детектора, выделения памяти и переподключение.
+
+Камера имитируется: отдельный поток с частотой --fps кладёт кадры в
+очередь «драйвера» глубиной --driver-queue (как буферы V4L2; когда очередь
+полна, новые кадры теряются, а старые ждут), grab забирает самый старый
+кадр, retrieve переводит его из YUYV в BGR и ещё --decode-ms ждёт, как
+распаковка MJPEG большого разрешения на слабом процессоре. В первые байты кадра
+записывается момент съёмки, и заглушка детектора считает возраст кадра.
+Детектор занимает процессор на --detector-ms за кадр, как модель на CPU.
+Режимы захвата:
+
+    default      - как раньше: очередь драйвера не меняется, каждый кадр
+                   читается в новый массив;
+    drain        - бэкенд не поддерживает CAP_PROP_BUFFERSIZE: кадры,
+                   ждавшие в очереди, пропускаются без декодирования;
+    low-latency  - очередь в один кадр, пропуск устаревших кадров и пул
+                   буферов (настройки по умолчанию capture.py).
+
+Для каждого режима выводятся p50/p95 возраста кадра, частоты захвата и
+детектора и доля кадров, прочитанных в новый массив. С --outage камера
+«отключается» на --outage-seconds в середине замера: выводится, продолжила
+ли камера работу и через сколько после возвращения сигнала детектор
+получил новый кадр.
+
+Пример:
+    python benchmarks/capture_latency_bench.py --fps 30 --detector-ms 80 --outage
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import monitor  # noqa: E402
+from backends import create_backend  # noqa: E402
+from monitor import MonitorEngine  # noqa: E402
+from replay import StubModel  # noqa: E402
+
+MODES = {
+    "default": {"buffer_size": 0, "max_drain": 0, "pool_size": 0, "reconnect_max_delay": 0},
+    "drain": {"buffer_size": 0},
+    "low-latency": {},
+}
+
+
+class FakeCamera:
+    """Камера с очередью драйвера; интерфейс cv2.VideoCapture"""
+    fps = 30
+    size = (1280, 720)
+    driver_queue = 4
+    decode = 0.0
+    # Интервал [начало, конец) по часам, когда камера недоступна
+    outage = (float("inf"), float("inf"))
+    # Кадры, переведённые в BGR, по всем экземплярам
+    retrieved = 0
+
+    def __init__(self, *args):
+        self.opened = not self.offline()
+        self.depth = self.driver_queue
+        width, height = self.size
+        self.yuyv = np.random.default_rng(0).integers(0, 255, (height, width, 2), np.uint8)
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.current = None
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        if self.opened:
+            self.thread.start()
+
+    @classmethod
+    def offline(cls):
+        return cls.outage[0] <= time.time() < cls.outage[1]
+
+    def _produce(self):
+        next_frame = time.perf_counter()
+        while self.opened:
+            next_frame += 1 / self.fps
+            time.sleep(max(0.0, next_frame - time.perf_counter()))
+            with self.cond:
+                if len(self.queue) < self.depth:
+                    self.queue.append(time.time())
+                self.cond.notify()
+
+    def isOpened(self):
+        return self.opened
+
+    def grab(self):
+        with self.cond:
+            while self.opened and not self.queue and not self.offline():
+                self.cond.wait(0.1)
+            if not self.opened or self.offline():
+                return False
+            self.current = self.queue.popleft()
+        return True
+
+    def retrieve(self, image=None):
+        FakeCamera.retrieved += 1
+        time.sleep(self.decode)
+        frame = cv2.cvtColor(self.yuyv, cv2.COLOR_YUV2BGR_YUYV, dst=image)
+        frame[0].reshape(-1)[:8].view(np.float64)[0] = self.current
+        return True, frame
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_BUFFERSIZE:
+            self.depth = int(value)
+            return True
+        return False
+
+    def get(self, prop):
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0
+
+    def release(self):
+        self.opened = False
+
+
+class AgeModel(StubModel):
+    """Заглушка детектора, которая занимает процессор и замеряет возраст кадров"""
+    def __init__(self, busy):
+        super().__init__(0, 0)
+        self.busy = busy
+        self.ages = []
+
+    def predict(self, frame, index):
+        self.ages.append((time.time(), time.time() - frame[0].reshape(-1)[:8].view(np.float64)[0]))
+        deadline = time.perf_counter() + self.busy
+        while time.perf_counter() < deadline:
+            pass
+        return super().predict(frame, index)
+
+
+def run_mode(mode, args):
+    FakeCamera.outage = (float("inf"), float("inf"))
+    model = AgeModel(args.detector_ms / 1000)
+    engine = MonitorEngine(create_backend(model, "torch"))
+    engine.capture_options = dict(MODES[mode])
+    stream = engine.add_stream(0, ["cup"], 30)
+    engine.update_vocabulary(wait=True)
+    engine.start_stream(stream)
+    time.sleep(args.warmup)
+    started = time.time()
+    allocated = stream.frame_pool.allocated
+    retrieved = FakeCamera.retrieved
+    if args.outage:
+        outage_start = started + args.seconds / 2
+        FakeCamera.outage = (outage_start, outage_start + args.outage_seconds)
+    time.sleep(args.seconds)
+    elapsed = time.time() - started
+    running = stream.running
+    engine.stop()
+
+    ages = np.array([age for moment, age in model.ages if moment >= started and moment < started + elapsed])
+    row = {
+        "mode": mode,
+        "age_p50_ms": round(float(np.percentile(ages, 50)) * 1000, 1) if len(ages) else None,
+        "age_p95_ms": round(float(np.percentile(ages, 95)) * 1000, 1) if len(ages) else None,
+        "detector_fps": round(len(ages) / elapsed, 1),
+        "frames_drained": stream.capture_stats["drained"],
+    }
+    retrieved = FakeCamera.retrieved - retrieved
+    row["capture_fps"] = round(retrieved / elapsed, 1)
+    row["new_arrays_ratio"] = round((stream.frame_pool.allocated - allocated) / retrieved, 3) if retrieved else None
+    if args.outage:
+        after = [moment for moment, _ in model.ages if moment >= FakeCamera.outage[1]]
+        row["running_after_outage"] = running
+        row["reconnects"] = stream.capture_stats["reconnects"]
+        row["recovery_s"] = round(after[0] - FakeCamera.outage[1], 2) if after else None
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--driver-queue", type=int, default=4, help="кадров в очереди драйвера по умолчанию")
+    parser.add_argument("--decode-ms", type=float, default=40, help="время распаковки кадра в retrieve, мс")
+    parser.add_argument("--detector-ms", type=float, default=80, help="процессорное время детектора на кадр, мс")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--outage", action="store_true", help="отключить камеру в середине замера")
+    parser.add_argument("--outage-seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    FakeCamera.fps = args.fps
+    FakeCamera.size = tuple(map(int, args.size.lower().split("x")))
+    FakeCamera.driver_queue = args.driver_queue
+    FakeCamera.decode = args.decode_ms / 1000
+    monitor.cv2.VideoCapture = FakeCamera
+    report = {"config": vars(args), "modes": [run_mode(mode, args) for mode in args.modes]}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
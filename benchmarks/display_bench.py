@@ -0,0 +1,95 @@
+"""Стоимость вывода одного кадра в окно 640x480 в зависимости от разрешения камеры.
+
+Прежний путь: копия кадра, отрисовка обнаружений в полном разрешении,
+cvtColor BGR->RGB, QImage, QPixmap.fromImage и масштабирование в QLabel.
+Новый: fit_frame уменьшает кадр до размера окна, обнаружения рисуются на
+уменьшенном кадре, FrameView рисует его как QImage BGR888 без копий.
+Время включает обработку событий Qt, то есть и саму перерисовку.
+
+Пример:
+    QT_QPA_PLATFORM=offscreen python benchmarks/display_bench.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication, QLabel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detections import Detections  # noqa: E402
+from frame_view import FrameView  # noqa: E402
+from rendering import LabelSprites, draw_detections, fit_frame  # noqa: E402
+
+RESOLUTIONS = {"480p": (640, 480), "720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+CLASSES = ["cup", "keys", "phone"]
+
+
+def make_detections(width, height, count, rng):
+    x1 = rng.uniform(0, width * 0.8, count)
+    y1 = rng.uniform(40, height * 0.8, count)
+    xyxy = np.stack([x1, y1, x1 + width * 0.1, y1 + height * 0.1], axis=1).astype(np.int32)
+    cls = rng.integers(0, len(CLASSES), count)
+    return Detections(CLASSES, cls, xyxy, np.ones(count, np.float32))
+
+
+def legacy(app, label, frame, detections, sprites):
+    frame = frame.copy()
+    draw_detections(frame, detections, sprites)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    h, w, ch = rgb.shape
+    pixmap = QPixmap.fromImage(QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888))
+    if (w, h) != (label.width(), label.height()):
+        pixmap = pixmap.scaled(label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    label.setPixmap(pixmap)
+    app.processEvents()
+
+
+def presented(app, view, frame, detections, sprites):
+    small, scale = fit_frame(frame, *view.frame_size())
+    draw_detections(small, detections, sprites, scale=scale)
+    view.set_frame(small)
+    app.processEvents()
+
+
+def measure(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--boxes", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    rng = np.random.default_rng(0)
+    sprites = LabelSprites()
+    label = QLabel()
+    label.setFixedSize(640, 480)
+    label.show()
+    view = FrameView(640, 480)
+    view.show()
+
+    print(f"{'кадр':>6} {'прежний, мс':>12} {'новый, мс':>10} {'ускорение':>10}")
+    for name in args.resolutions:
+        width, height = RESOLUTIONS[name]
+        frame = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        detections = make_detections(width, height, args.boxes, rng)
+        old = measure(lambda: legacy(app, label, frame, detections, sprites), args.repeats)
+        new = measure(lambda: presented(app, view, frame, detections, sprites), args.repeats)
+        print(f"{name:>6} {old:>12.2f} {new:>10.2f} {old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Нагрузочный тест сервера инференса: пропускная способность и хвост задержки.
+
+Сервер (inference_server.py) запускается отдельным процессом, клиенты -
+потоки этого процесса, каждый со своим RemoteBackend, как у тонкого
+клиента. Каждый клиент отправляет по кадру с частотой --fps (как камера)
+и замеряет время от отправки до ответа. Для каждого числа клиентов из
+--clients и каждого режима сервера выводятся обработанные кадры в
+секунду, p50/p95/p99 задержки и средний размер пакета модели:
+
+    batched    - динамическое пакетирование: до --max-batch кадров,
+                 ожидание кадров других клиентов до --max-wait-ms;
+    unbatched  - каждый кадр отдельным вызовом модели (--max-batch 1).
+
+По умолчанию модель на сервере - заглушка с задержкой --latency на вызов и
+--per-frame на кадр пакета; с --model - настоящие веса YOLO-World.
+
+Пример:
+    python benchmarks/inference_server_load.py --clients 1 2 4 8 16 --fps 5
+    python benchmarks/inference_server_load.py --model LVIS.pt --clients 1 2 4 8 --transport shm
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from inference_server import TRANSPORTS, InferenceServer, RemoteBackend  # noqa: E402
+from replay import StubModel, SyntheticCapture  # noqa: E402
+
+MODES = ("batched", "unbatched")
+
+
+def serve(args):
+    """Процесс сервера: заглушка или настоящая модель"""
+    from backends import create_backend
+
+    if args.model:
+        from startup import load_model
+
+        model = load_model(args.model)
+    else:
+        model = StubModel(args.latency, args.per_frame)
+    server = InferenceServer(create_backend(model, "torch"), args.max_batch, args.max_wait_ms / 1000)
+    server.serve(args.port)
+
+
+def start_server(args, max_batch):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port),
+        "--max-batch", str(max_batch), "--max-wait-ms", str(args.max_wait_ms),
+        "--latency", str(args.latency), "--per-frame", str(args.per_frame),
+    ]
+    if args.model:
+        command += ["--model", args.model]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        try:
+            stats(url)
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Сервер инференса не запустился")
+
+
+def stats(url):
+    with urllib.request.urlopen(url + "/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def client(url, args, frame, stop, latencies, errors):
+    backend = RemoteBackend(url, args.transport, concurrency=1)
+    backend.set_classes(args.prompts)
+    interval = 1 / args.fps
+    next_frame = time.perf_counter()
+    try:
+        while not stop.is_set():
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Камера не ждёт: если ответ задержался, следующий кадр уходит сразу
+            next_frame = max(next_frame + interval, time.perf_counter())
+            started = time.perf_counter()
+            try:
+                backend([frame])
+            except Exception:
+                errors.append(1)
+                continue
+            latencies.append((started, time.perf_counter() - started))
+    finally:
+        backend.close()
+
+
+def run(args, mode, clients, frame):
+    process, url = start_server(args, args.max_batch if mode == "batched" else 1)
+    try:
+        stop = threading.Event()
+        latencies, errors = [], []
+        threads = [
+            threading.Thread(target=client, args=(url, args, frame, stop, latencies, errors), daemon=True)
+            for _ in range(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.warmup)
+        before = stats(url)
+        started = time.perf_counter()
+        time.sleep(args.seconds)
+        elapsed = time.perf_counter() - started
+        after = stats(url)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        process.terminate()
+        process.wait()
+
+    measured = np.array([latency for moment, latency in latencies if started <= moment < started + elapsed])
+    frames = after["frames"] - before["frames"]
+    batches = after["batches"] - before["batches"]
+    row = {"mode": mode, "clients": clients, "fps": round(frames / elapsed, 1), "errors": len(errors)}
+    for q in (50, 95, 99):
+        row[f"p{q}_ms"] = round(float(np.percentile(measured, q)) * 1000, 1) if len(measured) else None
+    row["mean_batch"] = round(frames / batches, 2) if batches else None
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="веса YOLO-World вместо заглушки")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--fps", type=float, default=5, help="кадров в секунду от каждого клиента")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="jpeg")
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "laptop", "backpack"])
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.03, help="задержка заглушки на вызов, сек")
+    parser.add_argument("--per-frame", type=float, default=0.004, help="задержка заглушки на кадр пакета, сек")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--port", type=int, default=8795)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+    width, height = map(int, args.size.lower().split("x"))
+    _, frame = SyntheticCapture(width, height).read()
+    report = {"config": vars(args), "runs": []}
+    for mode in args.modes:
+        for clients in args.clients:
+            report["runs"].append(run(args, mode, clients, frame))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
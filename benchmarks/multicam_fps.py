@@ -0,0 +1,78 @@
+"""Бенчмарк пакетного инференса по нескольким камерам.
+
+Видеофайлы выступают в роли камер: для N потоков кадры читаются из N
+захватов (файлы используются по кругу) и прогоняются через общую модель
+одним пакетным вызовом. Для сравнения замеряется и последовательный режим
+с N отдельными вызовами модели.
+
+Пример:
+    python benchmarks/multicam_fps.py --model LVIS.pt --video shelf.mp4 desk.mp4 --streams 1 2 4 8
+"""
+import argparse
+import time
+
+import cv2
+from ultralytics import YOLO
+
+
+def open_streams(videos, count):
+    return [cv2.VideoCapture(videos[i % len(videos)]) for i in range(count)]
+
+
+def read_frame(cap):
+    ret, frame = cap.read()
+    if not ret:
+        # Файл закончился - начинаем сначала, как бесконечная камера
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        ret, frame = cap.read()
+    if not ret:
+        raise RuntimeError("Не удалось прочитать кадр из видеофайла")
+    return frame
+
+
+def run(model, videos, count, iterations, batched):
+    caps = open_streams(videos, count)
+    try:
+        # Прогрев: первый вызов модели инициализирует предиктор
+        model([read_frame(cap) for cap in caps], verbose=False)
+
+        infer_time = 0.0
+        start = time.perf_counter()
+        for _ in range(iterations):
+            frames = [read_frame(cap) for cap in caps]
+            t0 = time.perf_counter()
+            if batched:
+                model(frames, verbose=False)
+            else:
+                for frame in frames:
+                    model(frame, verbose=False)
+            infer_time += time.perf_counter() - t0
+        elapsed = time.perf_counter() - start
+    finally:
+        for cap in caps:
+            cap.release()
+    return count * iterations / elapsed, count * iterations / infer_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="путь к весам YOLO-World")
+    parser.add_argument("--video", nargs="+", required=True, help="видеофайлы, заменяющие камеры")
+    parser.add_argument("--streams", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--iterations", type=int, default=50, help="пакетов на каждое число потоков")
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "laptop", "backpack"])
+    args = parser.parse_args()
+
+    model = YOLO(args.model)
+    model.set_classes(args.prompts)
+
+    print(f"{'потоков':>8} {'режим':>16} {'FPS (всего)':>12} {'FPS модели':>12} {'FPS/поток':>10}")
+    for count in args.streams:
+        for batched in (False, True):
+            fps, model_fps = run(model, args.video, count, args.iterations, batched)
+            mode = "пакетный" if batched else "последовательный"
+            print(f"{count:>8} {mode:>16} {fps:>12.1f} {model_fps:>12.1f} {fps / count:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Скорость офлайн-анализа записи в кратностях реального времени.
+
+Бенчмарк пишет синтетическое видео (--seconds секунд, --size, --fps) и
+разбирает его детектором-заглушкой с задержкой --latency на вызов и
+--per-frame на кадр пакета. Режимы:
+
+    sequential  - цикл как при воспроизведении: read каждого кадра с
+                  переводом в BGR, детектор на каждом stride-м кадре по
+                  одному, всё в одном потоке, но без паузы между кадрами;
+    offline     - OfflineAnalyzer (offline.py): декодирование в своём
+                  потоке, пропущенные кадры только распаковываются,
+                  кадры идут детектору пакетами по --batch.
+
+Воспроизведение в реальном времени (monitor.py с видеофайлом) по
+определению даёт x1. Для каждого шага --strides выводятся кратность
+реального времени и частота декодирования.
+
+Пример:
+    python benchmarks/offline_bench.py --seconds 120 --strides 1 5 15 30
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from backends import create_backend  # noqa: E402
+from offline import OfflineAnalyzer, open_video  # noqa: E402
+from replay import StubModel, SyntheticCapture  # noqa: E402
+
+MODES = ("sequential", "offline")
+
+
+def write_video(path, seconds, width, height, fps):
+    capture = SyntheticCapture(width, height)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _ in range(int(seconds * fps)):
+        _, frame = capture.read()
+        writer.write(frame)
+    writer.release()
+
+
+def run_sequential(path, model, stride):
+    cap = open_video(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    started = time.perf_counter()
+    index = 0
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        if index % stride == 0:
+            model([frame])
+        index += 1
+    elapsed = time.perf_counter() - started
+    cap.release()
+    return {"realtime_factor": round(index / fps / elapsed, 2), "decode_fps": round(index / elapsed, 1)}
+
+
+def run_offline(path, model, stride, batch):
+    analyzer = OfflineAnalyzer(create_backend(model, "torch"), ["cup", "keys"], batch_size=batch)
+    report = analyzer.analyze(path, stride)
+    return {"realtime_factor": report["realtime_factor"], "decode_fps": report["decode_fps"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 5, 15, 30])
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.03, help="задержка заглушки на вызов, сек")
+    parser.add_argument("--per-frame", type=float, default=0.01, help="задержка заглушки на кадр пакета, сек")
+    parser.add_argument("--video", help="готовый видеофайл вместо синтетического")
+    args = parser.parse_args()
+
+    path = args.video
+    if path is None:
+        width, height = map(int, args.size.lower().split("x"))
+        path = os.path.join(tempfile.mkdtemp(prefix="offline_bench_"), "synthetic.mp4")
+        write_video(path, args.seconds, width, height, args.fps)
+    report = {"config": vars(args), "runs": []}
+    for stride in args.strides:
+        for mode in args.modes:
+            model = StubModel(args.latency, args.per_frame)
+            if mode == "sequential":
+                row = run_sequential(path, model, stride)
+            else:
+                row = run_offline(path, model, stride, args.batch)
+            report["runs"].append({"mode": mode, "stride": stride, **row})
+    if args.video is None:
+        os.remove(path)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Сквозной бенчмарк конвейера мониторинга без камеры.
+
+Кадры берутся из записанных видео (--video) или генерируются
+(--synthetic) и проходят те же стадии, что и в MonitorEngine:
+захват, инференс одним пакетом по всем потокам, постобработка
+(Detections.from_result), обновление таймеров отсутствия и отрисовка
+кадра для окна 640x480 (fit_frame и draw_detections). Вместо модели можно
+подставить детерминированную заглушку (--stub). Стадии выполняются
+последовательно в одном потоке, поэтому их задержки не смешиваются.
+
+Результат - JSON: p50/p95/p99 и среднее по каждой стадии в миллисекундах,
+сквозная частота кадров и пиковое потребление памяти процессом.
+
+Примеры:
+    python benchmarks/pipeline_bench.py --stub --synthetic 1920x1080 --frames 300
+    python benchmarks/pipeline_bench.py --model LVIS.pt --video shelf.mp4 desk.mp4 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from backends import BACKENDS, create_backend  # noqa: E402
+from detections import Detections  # noqa: E402
+from monitor import EXPORTS_DIR, CameraStream  # noqa: E402
+from rendering import LabelSprites, draw_detections, fit_frame  # noqa: E402
+from replay import ReplayCapture, StubModel, SyntheticCapture  # noqa: E402
+
+STAGES = ("capture", "inference", "postprocess", "absence", "render")
+
+
+def percentiles(samples):
+    values = np.asarray(samples) * 1000
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def open_captures(args):
+    count = args.streams
+    total = args.frames + args.warmup
+    if args.synthetic:
+        width, height = map(int, args.synthetic.lower().split("x"))
+        return [SyntheticCapture(width, height, total, seed=i) for i in range(count)]
+    return [ReplayCapture(args.video[i % len(args.video)], total) for i in range(count)]
+
+
+def load_model(args):
+    if args.stub:
+        return StubModel(args.stub_latency / 1000, args.stub_per_frame / 1000, args.stub_boxes)
+    from ultralytics import YOLO
+    return YOLO(args.model)
+
+
+def run(args):
+    model = load_model(args)
+    backend = create_backend(model, args.backend, None, EXPORTS_DIR)
+    backend.set_classes(args.prompts)
+    streams = []
+    for cap in open_captures(args):
+        stream = CameraStream(0, args.prompts, args.max_absence)
+        stream.cap = cap
+        streams.append(stream)
+    sprites = LabelSprites()
+
+    samples = {stage: [] for stage in STAGES}
+    frame_times = []
+    alerts = 0
+    processed = 0
+    index = 0
+    start = None
+    while True:
+        if index == args.warmup:
+            # Прогрев (инициализация предиктора, первые аллокации) в статистику не входит
+            samples = {stage: [] for stage in STAGES}
+            frame_times = []
+            processed = 0
+            start = time.perf_counter()
+        warm = index >= args.warmup
+        t0 = time.perf_counter()
+
+        batch = []
+        for stream in streams:
+            ret, frame = stream.cap.read()
+            if ret:
+                batch.append((stream, frame))
+        if not batch:
+            break
+        t1 = time.perf_counter()
+
+        results = backend([frame for _, frame in batch], verbose=False)
+        t2 = time.perf_counter()
+
+        detections = [
+            Detections.from_result(result, args.prompts, set(stream.selected_classes))
+            for (stream, _), result in zip(batch, results)
+        ]
+        t3 = time.perf_counter()
+
+        # Время кадра в записи, а не на часах: события отсутствия воспроизводимы
+        timestamp = (index + 1) / args.fps
+        for (stream, _), found in zip(batch, detections):
+            _, missing = stream.update_absence(found, timestamp, timestamp)
+            alerts += len(missing)
+        t4 = time.perf_counter()
+
+        for (stream, frame), found in zip(batch, detections):
+            small, scale = fit_frame(frame, 640, 480)
+            draw_detections(small, found, sprites, scale=scale)
+        t5 = time.perf_counter()
+
+        if warm:
+            for stage, duration in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+                samples[stage].append(duration)
+            frame_times.append(t5 - t0)
+            processed += len(batch)
+        index += 1
+
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+    backend.close()
+    if not frame_times:
+        raise SystemExit("Кадров не хватило даже на прогрев")
+    return {
+        "config": {
+            "model": "stub" if args.stub else args.model,
+            "backend": args.backend,
+            "source": f"synthetic:{args.synthetic}" if args.synthetic else args.video,
+            "streams": args.streams,
+            "prompts": args.prompts,
+            "frames": args.frames,
+            "warmup": args.warmup,
+        },
+        "host": {"python": platform.python_version(), "machine": platform.machine()},
+        "iterations": len(frame_times),
+        "frames": processed,
+        "fps": round(processed / elapsed, 2) if elapsed else None,
+        "stages": {stage: percentiles(samples[stage]) for stage in STAGES},
+        "end_to_end": percentiles(frame_times),
+        "alerts": alerts,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    model = parser.add_mutually_exclusive_group(required=True)
+    model.add_argument("--model", help="путь к весам YOLO-World")
+    model.add_argument("--stub", action="store_true", help="детерминированная заглушка вместо модели")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--video", nargs="+", help="видеофайлы, по кругу на каждый поток")
+    source.add_argument("--synthetic", metavar="WxH", help="синтетические кадры заданного размера")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--streams", type=int, default=1)
+    parser.add_argument("--frames", type=int, default=300, help="итераций конвейера в замере")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=30.0, help="частота записи для таймеров отсутствия")
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "phone"])
+    parser.add_argument("--max-absence", type=int, default=2)
+    parser.add_argument("--stub-latency", type=float, default=20.0, help="мс на вызов заглушки")
+    parser.add_argument("--stub-per-frame", type=float, default=5.0, help="мс на кадр пакета")
+    parser.add_argument("--stub-boxes", type=int, default=1, help="боксов на видимый класс")
+    parser.add_argument("--output", help="файл для JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Масштабирование пула процессов инференса по числу процессов.
+
+Движок мониторинга работает с синтетическими камерами, отдающими кадры
+без ограничения частоты, без планировщика и фильтра движения, так что
+детектор занят всё время. Для каждого числа процессов из --workers
+замеряется, сколько кадров в секунду проходит через детектор:
+
+    single - одна камера: процессы пула обрабатывают её кадры параллельно,
+             по пакету в работе на процесс;
+    multi  - --streams камер: пакет кадров всех камер делится между процессами.
+
+Строка workers=1 - обычный бэкенд torch в одном процессе, где PyTorch
+сам распараллеливает операции на все ядра; с ней сравнивается пул.
+Нужны веса YOLO-World: заглушка не нагружает процессор и масштабировалась
+бы без всякого пула.
+
+Пример:
+    python benchmarks/pool_scaling_bench.py --model yolov8s-worldv2.pt --workers 1 2 4 8 16 --streams 8
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import monitor  # noqa: E402
+from backends import create_backend  # noqa: E402
+from monitor import MonitorEngine  # noqa: E402
+from process_pool import ProcessPoolBackend  # noqa: E402
+from replay import SyntheticCapture  # noqa: E402
+
+
+class Capture(SyntheticCapture):
+    size = (1280, 720)
+
+    def __init__(self, *args):
+        super().__init__(*self.size)
+
+    def set(self, *args):
+        return True
+
+    def get(self, *args):
+        return 0
+
+
+def run(args, workers, streams):
+    from ultralytics import YOLO
+
+    # Модель загружается заново: процессы пула создаются до первого инференса
+    model = YOLO(args.model)
+    if workers > 1:
+        backend = ProcessPoolBackend(model, workers, threads=args.threads)
+    else:
+        backend = create_backend(model, "torch")
+    engine = MonitorEngine(backend)
+    for i in range(streams):
+        engine.add_stream(f"camera{i}.mp4", args.prompts)
+    engine.update_vocabulary(wait=True)
+
+    counted = [0]
+    counting = threading.Event()
+    lock = threading.Lock()
+    handle_results = engine.detector.on_results
+
+    def on_results(stream, detections, timestamp):
+        if counting.is_set():
+            with lock:
+                counted[0] += 1
+        handle_results(stream, detections, timestamp)
+
+    engine.detector.on_results = on_results
+    for stream in engine.streams:
+        engine.start_stream(stream)
+    # Прогрев: первый вызов в каждом процессе создаёт предиктор
+    time.sleep(args.warmup)
+    counting.set()
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    counting.clear()
+    elapsed = time.perf_counter() - started
+    copied = getattr(backend, "copied", 0)
+    engine.stop()
+    return {
+        "workers": workers,
+        "streams": streams,
+        "fps": round(counted[0] / elapsed, 2),
+        "frames_copied": copied,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="веса YOLO-World")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--streams", type=int, default=8, help="камер в многопоточной нагрузке")
+    parser.add_argument("--threads", type=int, help="потоков PyTorch на процесс пула")
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "laptop", "backpack"])
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=15)
+    args = parser.parse_args()
+
+    Capture.size = tuple(map(int, args.size.lower().split("x")))
+    monitor.cv2.VideoCapture = Capture
+    report = {"config": vars(args), "cpu_count": os.cpu_count(), "single": [], "multi": []}
+    for workers in args.workers:
+        report["single"].append(run(args, workers, 1))
+        report["multi"].append(run(args, workers, args.streams))
+    for rows in (report["single"], report["multi"]):
+        base = rows[0]["fps"] or 1
+        for row in rows:
+            row["speedup"] = round(row["fps"] / base, 2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Микробенчмарк постобработки и отрисовки обнаружений.
+
+Сравниваются прежний поэлементный путь (обход results.boxes с int(box.cls[0]),
+map(int, box.xyxy[0]) и cv2.putText с сокращением имени на каждом кадре)
+и колоночный: Detections.from_result, векторное множество классов и
+заранее отрендеренные подписи. Боксы генерируются случайно, модель не нужна.
+
+Пример:
+    python benchmarks/postprocess_bench.py --boxes 10 100 300
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Boxes
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detections import Detections  # noqa: E402
+from rendering import LabelSprites, draw_detections  # noqa: E402
+
+
+class Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_result(count, classes, shape, rng):
+    h, w = shape
+    x1 = rng.uniform(0, w - 50, count)
+    y1 = rng.uniform(30, h - 50, count)
+    data = np.stack([
+        x1, y1, x1 + rng.uniform(10, 50, count), y1 + rng.uniform(10, 50, count),
+        rng.uniform(0.25, 1.0, count), rng.integers(0, len(classes), count),
+    ], axis=1)
+    return Result(Boxes(torch.tensor(data, dtype=torch.float32), shape))
+
+
+def legacy(frame, result, classes, stream_classes):
+    # Путь до колоночного представления
+    detections = []
+    for box in result.boxes:
+        cls_idx = int(box.cls[0])
+        class_name = classes[cls_idx] if cls_idx < len(classes) else str(cls_idx)
+        if class_name not in stream_classes:
+            continue
+        x1, y1, x2, y2 = map(int, box.xyxy[0])
+        detections.append((class_name, (x1, y1, x2, y2), float(box.conf[0])))
+    detected = {class_name for class_name, _, _ in detections}
+
+    for class_name, (x1, y1, x2, y2), conf in detections:
+        display_name = class_name
+        if len(display_name) > 20:
+            display_name = display_name[:17] + "..."
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(frame, display_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+    return detected
+
+
+def columnar(frame, result, classes, stream_classes, sprites):
+    detections = Detections.from_result(result, classes, stream_classes)
+    detected = detections.names()
+    draw_detections(frame, detections, sprites)
+    return detected
+
+
+def measure(fn, frame, repeats):
+    times = []
+    for _ in range(repeats):
+        canvas = frame.copy()
+        start = time.perf_counter()
+        fn(canvas)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", nargs="+", type=int, default=[10, 100, 300])
+    parser.add_argument("--classes", type=int, default=50, help="размер словаря")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    classes = [f"object number {i} on the shelf" for i in range(args.classes)]
+    stream_classes = set(classes)
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+    sprites = LabelSprites()
+
+    print(f"{'боксов':>7} {'поэлементно, мс':>16} {'колоночно, мс':>14} {'ускорение':>10}")
+    for count in args.boxes:
+        result = make_result(count, classes, frame.shape[:2], rng)
+        assert legacy(frame.copy(), result, classes, stream_classes) == \
+            columnar(frame.copy(), result, classes, stream_classes, sprites)
+        old = measure(lambda f: legacy(f, result, classes, stream_classes), frame, args.repeats)
+        new = measure(lambda f: columnar(f, result, classes, stream_classes, sprites), frame, args.repeats)
+        print(f"{count:>7} {old:>16.2f} {new:>14.2f} {old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
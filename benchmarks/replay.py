@@ -0,0 +1,218 @@
+"""Источники кадров и детектор-заглушка для бенчмарков.
+
+ReplayCapture и SyntheticCapture повторяют интерфейс cv2.VideoCapture,
+как ImageFolderCapture в capture.py, поэтому подставляются в CameraStream
+вместо камеры. StubModel повторяет интерфейс модели YOLO (set_classes и
+вызов на списке кадров) и возвращает детерминированные обнаружения с
+заданной задержкой, так что бенчмарк можно запустить без весов и GPU.
+SceneCapture и ColorModel - статичная сцена, где объекты пропадают по
+расписанию, и заглушка, которая находит их по цвету: обнаружения зависят
+от содержимого кадра, а не от номера вызова, поэтому годятся для проверок
+с пропуском кадров (фильтр движения).
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class ReplayCapture:
+    """Видеофайл, прокручиваемый по кругу frames кадров подряд"""
+    def __init__(self, path, frames=None):
+        self.cap = cv2.VideoCapture(path)
+        self.remaining = frames
+
+    def isOpened(self):
+        return self.cap.isOpened() and self.remaining != 0
+
+    def read(self):
+        if self.remaining == 0:
+            return False, None
+        ret, frame = self.cap.read()
+        if not ret:
+            # Файл закончился - начинаем сначала, как бесконечная камера
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if ret and self.remaining is not None:
+            self.remaining -= 1
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class SyntheticCapture:
+    """Детерминированные кадры: шумный фон и движущийся прямоугольник"""
+    def __init__(self, width=1280, height=720, frames=None, seed=0):
+        rng = np.random.default_rng(seed)
+        self.background = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        self.remaining = frames
+        self.index = 0
+
+    def isOpened(self):
+        return self.remaining != 0
+
+    def read(self):
+        if self.remaining == 0:
+            return False, None
+        if self.remaining is not None:
+            self.remaining -= 1
+        frame = self.background.copy()
+        h, w = frame.shape[:2]
+        x = (self.index * 8) % max(1, w - 100)
+        cv2.rectangle(frame, (x, h // 3), (x + 100, h // 3 + 100), (0, 0, 255), -1)
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        self.remaining = 0
+
+
+class SceneCapture:
+    """Статичная сцена с шумом матрицы; объект i - квадрат своего цвета.
+
+    Объект i пропадает на absent секунд каждые cycle секунд, начиная со
+    сдвига offset + i * stagger, так что при пороге меньше absent по
+    каждому объекту приходят уведомления.
+    """
+    def __init__(self, classes, width=320, height=240, fps=10, seconds=120, cycle=40, absent=15,
+                 offset=5, stagger=20, noise=3, seed=0):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.background = rng.integers(60, 120, (height, width, 3), dtype=np.uint8)
+        self.classes = list(classes)
+        self.colors = ColorModel.palette(len(self.classes))
+        self.fps = fps
+        self.remaining = int(seconds * fps)
+        self.cycle = cycle
+        self.absent = absent
+        self.offset = offset
+        self.stagger = stagger
+        self.noise = noise
+        self.index = 0
+
+    def isOpened(self):
+        return self.remaining != 0
+
+    def get(self, prop):
+        return self.fps if prop == cv2.CAP_PROP_FPS else 0
+
+    def visible(self, i, timestamp):
+        return (timestamp - self.offset - i * self.stagger) % self.cycle >= self.absent
+
+    def read(self):
+        if self.remaining == 0:
+            return False, None
+        self.remaining -= 1
+        timestamp = self.index / self.fps
+        self.index += 1
+        frame = self.background.copy()
+        h, w = frame.shape[:2]
+        size = max(8, min(w, h) // 6)
+        for i, color in enumerate(self.colors):
+            if self.visible(i, timestamp):
+                x = 10 + (i * (size + 10)) % max(1, w - size - 10)
+                cv2.rectangle(frame, (x, h // 3), (x + size, h // 3 + size), color, -1)
+        # Шум ниже порога фильтра движения: сцена остаётся статичной
+        noise = self.rng.integers(-self.noise, self.noise + 1, frame.shape, dtype=np.int16)
+        return True, np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    def release(self):
+        self.remaining = 0
+
+
+class ColorModel:
+    """Заглушка YOLO: класс i обнаружен, если в кадре есть квадрат цвета i (см. SceneCapture)"""
+    def __init__(self, tolerance=20, min_pixels=16):
+        self.tolerance = tolerance
+        self.min_pixels = min_pixels
+        self.classes = []
+        self.calls = 0
+
+    @staticmethod
+    def palette(count):
+        """Насыщенные цвета BGR, которых нет в сером фоне SceneCapture"""
+        hues = np.linspace(0, 180, count, endpoint=False).astype(np.uint8)
+        hsv = np.stack([hues, np.full(count, 255, np.uint8), np.full(count, 255, np.uint8)], axis=1)
+        return [tuple(int(c) for c in bgr) for bgr in cv2.cvtColor(hsv[None], cv2.COLOR_HSV2BGR)[0]]
+
+    def set_classes(self, classes):
+        self.classes = list(classes)
+
+    def __call__(self, frames, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        self.calls += 1
+        colors = self.palette(len(self.classes))
+        results = []
+        for frame in frames:
+            cls, xyxy = [], []
+            for i, color in enumerate(colors):
+                mask = np.all(np.abs(frame.astype(np.int16) - color) <= self.tolerance, axis=2)
+                if np.count_nonzero(mask) >= self.min_pixels:
+                    ys, xs = np.nonzero(mask)
+                    cls.append(i)
+                    xyxy.append([xs.min(), ys.min(), xs.max() + 1, ys.max() + 1])
+            results.append(StubResult(StubBoxes(
+                np.array(cls, np.float32), np.array(xyxy, np.float32).reshape(-1, 4), np.full(len(cls), 0.9, np.float32),
+            )))
+        return results
+
+
+class StubBoxes:
+    def __init__(self, cls, xyxy, conf):
+        self.cls = cls
+        self.xyxy = xyxy
+        self.conf = conf
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class StubResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubModel:
+    """Заглушка YOLO-World: задержка latency + per_frame * размер пакета.
+
+    Класс i виден на кадре n, если (n // period + i) % cycle != 0, то есть
+    каждый объект периодически пропадает на period кадров; на каждый
+    видимый класс приходится boxes боксов.
+    """
+    def __init__(self, latency=0.02, per_frame=0.005, boxes=1, period=90, cycle=4):
+        self.latency = latency
+        self.per_frame = per_frame
+        self.boxes = boxes
+        self.period = period
+        self.cycle = cycle
+        self.classes = []
+        self.frames = 0
+        self.calls = 0
+
+    def set_classes(self, classes):
+        self.classes = list(classes)
+
+    def __call__(self, frames, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        self.calls += 1
+        time.sleep(self.latency + self.per_frame * len(frames))
+        results = []
+        for frame in frames:
+            results.append(self.predict(frame, self.frames))
+            self.frames += 1
+        return results
+
+    def predict(self, frame, index):
+        h, w = frame.shape[:2]
+        visible = [i for i in range(len(self.classes)) if (index // self.period + i) % self.cycle != 0]
+        cls = np.repeat(np.array(visible, np.float32), self.boxes)
+        n = len(cls)
+        # Боксы раскладываются по кадру сеткой, чтобы подписи не слипались
+        k = np.arange(n)
+        x1 = (k * 97) % max(1, w - 60)
+        y1 = 30 + (k * 61) % max(1, h - 90)
+        xyxy = np.stack([x1, y1, x1 + 50, y1 + 50], axis=1).astype(np.float32)
+        return StubResult(StubBoxes(cls, xyxy, np.full(n, 0.9, np.float32)))
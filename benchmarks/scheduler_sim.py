@@ -0,0 +1,91 @@
+"""Моделирование планировщика детектора на синтетической сцене.
+
+Камера отдаёт кадры с частотой --camera-fps, детектор занят --inference-time
+секунд на каждый запуск и находит присутствующий объект с вероятностью
+--recall. Объект лежит на месте --present секунд, затем исчезает. Сравниваются
+запуск детектора на каждом кадре и AbsenceBudgetScheduler: число запусков,
+доля времени, занятая детектором, и задержка уведомления относительно
+момента, когда порог отсутствия действительно истёк.
+
+Пример:
+    python benchmarks/scheduler_sim.py --max-absence 30 --inference-time 0.25
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np  # noqa: E402
+
+from detections import Detections  # noqa: E402
+from monitor import CameraStream  # noqa: E402
+from scheduler import AbsenceBudgetScheduler  # noqa: E402
+
+
+CLASSES = ["object"]
+
+
+def simulate(args, scheduler):
+    rng = random.Random(args.seed)
+    stream = CameraStream(0, CLASSES, args.max_absence)
+    frame_period = 1.0 / args.camera_fps
+    duration = args.present + args.max_absence + 10
+
+    runs = 0
+    busy_until = 0.0
+    last_true_seen = None
+    alert_time = None
+    t = 0.0
+    while t < duration and alert_time is None:
+        # Детектор берёт самый свежий кадр, когда освободился и когда подошёл срок
+        if t >= busy_until and (scheduler is None or scheduler.due(stream, t)):
+            present = t < args.present
+            detections = Detections.empty(CLASSES)
+            if present and rng.random() < args.recall:
+                detections = Detections(CLASSES, np.zeros(1, np.int64), np.array([[0, 0, 1, 1]], np.int32), np.ones(1, np.float32))
+            if len(detections):
+                last_true_seen = t
+            done = t + args.inference_time
+            _, missing = stream.update_absence(detections, t, done)
+            if scheduler is not None:
+                scheduler.schedule(stream, done)
+            runs += 1
+            busy_until = done
+            if missing:
+                alert_time = done
+        t += frame_period
+
+    deadline = last_true_seen + args.max_absence
+    elapsed = alert_time if alert_time is not None else duration
+    return {
+        "runs": runs,
+        "runs_per_sec": runs / elapsed,
+        "busy": runs * args.inference_time / elapsed,
+        "latency": None if alert_time is None else alert_time - deadline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-absence", type=int, default=30)
+    parser.add_argument("--present", type=float, default=300.0, help="сколько секунд объект на месте")
+    parser.add_argument("--camera-fps", type=float, default=30.0)
+    parser.add_argument("--inference-time", type=float, default=0.05, help="длительность одного запуска детектора, сек")
+    parser.add_argument("--recall", type=float, default=0.9, help="вероятность найти присутствующий объект")
+    parser.add_argument("--idle-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'режим':>14} {'запусков':>9} {'запусков/с':>11} {'загрузка':>9} {'задержка, с':>12}")
+    for name, scheduler in (("каждый кадр", None),
+                            ("планировщик", AbsenceBudgetScheduler(args.idle_interval))):
+        result = simulate(args, scheduler)
+        latency = "нет" if result["latency"] is None else f"{result['latency']:.2f}"
+        print(f"{name:>14} {result['runs']:>9} {result['runs_per_sec']:>11.2f} "
+              f"{result['busy']:>8.0%} {latency:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Время запуска приложения: до появления окна и до первого кадра с обнаружениями.
+
+Каждый запуск - отдельный процесс с чистым интерпретатором, время
+отсчитывается от запуска процесса. Режимы:
+
+    eager       - как до фоновой загрузки: ultralytics импортируется и
+                  модель загружается до создания QApplication, окно
+                  появляется только после этого, предиктор собирается
+                  на первом кадре камеры;
+    cold        - окно загрузки сразу, модель загружается и прогревается
+                  в фоне, слитой модели в кэше ещё нет (первый запуск);
+    background  - то же, слитая модель уже в кэше (обычный запуск).
+
+Замеряются: появление первого окна (window_s), готовность главного окна
+(ready_s) и первый результат детектора после запуска камер (first_result_s),
+которые стартуют сразу, как только главное окно готово. Камера - синтетическая,
+данные приложения (список объектов, кэши) - во временном каталоге HOME.
+Перед замерами эмбеддинги промптов кладутся в кэш, чтобы ни один режим
+не загружал CLIP.
+
+Пример:
+    python benchmarks/startup_bench.py --model LVIS.pt --runs 5
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+MODES = ("eager", "cold", "background")
+
+
+def child(args):
+    """Один запуск приложения в текущем процессе; результат - строка JSON"""
+    started = float(os.environ["STARTUP_BENCH_T0"])
+    moments = {}
+
+    def mark(name):
+        moments.setdefault(name, round(time.time() - started, 3))
+
+    import app
+    import monitor
+    from replay import SyntheticCapture
+
+    class Capture(SyntheticCapture):
+        def __init__(self, *args):
+            super().__init__(1280, 720)
+
+        def set(self, *args):
+            return True
+
+        def get(self, *args):
+            return 30
+
+    monitor.cv2.VideoCapture = Capture
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    if args.child == "prepare":
+        # Эмбеддинги промптов в кэш: замеры не должны включать CLIP
+        from ultralytics import YOLO
+
+        from embeddings import TextEmbeddingCache, text_features
+
+        model = YOLO(args.model)
+        vocabulary = monitor.MonitorEngine.vocabulary_for([args.prompts])
+        text_features(model, vocabulary, TextEmbeddingCache(monitor.EMBEDDINGS_PATH))
+        return {}
+
+    first_result = threading.Event()
+
+    def start(window):
+        mark("ready_s")
+        handle_results = window.engine.detector.on_results
+
+        def on_results(*result):
+            mark("first_result_s")
+            first_result.set()
+            handle_results(*result)
+
+        window.engine.detector.on_results = on_results
+        window.start_camera()
+
+    if args.child == "eager":
+        from ultralytics import YOLO
+
+        model = YOLO(args.model)
+        qapp = QApplication([])
+        window = app.VideoWidget(model)
+        window.show()
+        QTimer.singleShot(0, lambda: (mark("window_s"), start(window)))
+    else:
+        qapp = QApplication([])
+        startup = app.StartupWindow(args.model)
+        startup.show()
+        QTimer.singleShot(0, lambda: mark("window_s"))
+        startup.loader.loaded.connect(lambda *loaded: start(startup.window))
+        startup.load()
+        window = None
+
+    # Результат детектора приходит в рабочем потоке: цикл событий останавливается по таймеру
+    poll = QTimer()
+    poll.timeout.connect(lambda: first_result.is_set() and qapp.quit())
+    poll.start(10)
+    QTimer.singleShot(int(args.timeout * 1000), qapp.quit)
+    qapp.exec_()
+    window = window or startup.window
+    if window is not None:
+        window.stop_camera()
+    return moments
+
+
+def run(args, mode, home):
+    env = dict(os.environ, HOME=home, QT_QPA_PLATFORM="offscreen", STARTUP_BENCH_T0=repr(time.time()))
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--model", args.model,
+               "--timeout", str(args.timeout), "--prompts", *args.prompts]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="веса YOLO-World (.pt)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--runs", type=int, default=3, help="запусков на режим, выводится медиана")
+    parser.add_argument("--prompts", nargs="+", default=["cup", "keys", "laptop", "backpack"])
+    parser.add_argument("--timeout", type=float, default=120, help="предел одного запуска, сек")
+    parser.add_argument("--home", help="каталог HOME для данных приложения (по умолчанию временный)")
+    parser.add_argument("--child", choices=("prepare",) + MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.model = os.path.abspath(args.model)
+
+    if args.child:
+        print(json.dumps(child(args)))
+        return
+
+    home = args.home or tempfile.mkdtemp(prefix="startup_bench_")
+    data_dir = os.path.join(home, ".course_work")
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, "watchlist.json"), "w", encoding="utf-8") as f:
+        json.dump({"cameras": [{"source": 0, "classes": args.prompts}]}, f)
+    run(args, "prepare", home)
+
+    report = {"config": vars(args), "modes": []}
+    for mode in args.modes:
+        runs = []
+        for _ in range(args.runs):
+            if mode == "cold":
+                shutil.rmtree(os.path.join(data_dir, "models"), ignore_errors=True)
+            runs.append(run(args, mode, home))
+        row = {"mode": mode}
+        for key in ("window_s", "ready_s", "first_result_s"):
+            values = [moments[key] for moments in runs if key in moments]
+            row[key] = round(statistics.median(values), 2) if values else None
+        report["modes"].append(row)
+    if not args.home:
+        shutil.rmtree(home, ignore_errors=True)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
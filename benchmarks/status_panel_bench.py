@@ -0,0 +1,125 @@
+"""Стоимость обновления панели статуса в зависимости от числа объектов.
+
+Прежняя панель - сетка QProgressBar, где на каждом обновлении каждой
+полосе заново задаётся таблица стилей, а добавление объекта пересобирает
+все виджеты. Новая - StatusView (модель/представление с делегатом).
+Обновления приходят --rate раз в секунду, таймеры растут на секунду за
+--rate обновлений, как при работе детектора на каждом кадре. Время
+обновления включает обработку событий Qt, то есть и перерисовку.
+
+Пример:
+    QT_QPA_PLATFORM=offscreen python benchmarks/status_panel_bench.py --objects 10 100 300
+"""
+import argparse
+import os
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication, QGridLayout, QProgressBar, QScrollArea, QVBoxLayout, QWidget
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from status_panel import StatusView, severity  # noqa: E402
+
+BAR_STYLE = """
+    QProgressBar {{
+        border: 1px solid #DCD0C0;
+        border-radius: 4px;
+        text-align: center;
+        height: 20px;
+    }}
+    QProgressBar::chunk {{
+        background-color: {color};
+        border-radius: 4px;
+    }}
+"""
+COLORS = ("#7B9E89", "#F0AD4E", "#D9534F")
+
+
+class LegacyPanel(QScrollArea):
+    """Панель статуса в прежнем виде"""
+    def __init__(self):
+        super().__init__()
+        self.setWidgetResizable(True)
+        container = QWidget()
+        self.grid = QGridLayout(container)
+        self.setWidget(container)
+        self.bars = {}
+
+    def set_classes(self, classes, max_absence_time):
+        while self.grid.count():
+            widget = self.grid.takeAt(0).widget()
+            if widget:
+                widget.deleteLater()
+        self.bars = {}
+        for i, cls in enumerate(classes):
+            bar = QProgressBar()
+            bar.setRange(0, max_absence_time)
+            bar.setFormat("%v сек / %m сек")
+            bar.setStyleSheet(BAR_STYLE.format(color=COLORS[0]))
+            self.bars[cls] = bar
+            self.grid.addWidget(bar, i, 0)
+
+    def update_absence(self, absence, max_absence_time):
+        for cls, absence_time in absence.items():
+            bar = self.bars[cls]
+            bar.setValue(absence_time)
+            bar.setStyleSheet(BAR_STYLE.format(color=COLORS[severity(absence_time, max_absence_time)]))
+
+
+class ModelPanel(StatusView):
+    def set_classes(self, classes, max_absence_time):
+        self.status_model.set_classes(classes, max_absence_time)
+
+    def update_absence(self, absence, max_absence_time):
+        self.status_model.update_absence(absence)
+
+
+def measure(app, panel, count, args):
+    classes = [f"object {i}" for i in range(count)]
+    window = QWidget()
+    window.resize(480, 640)
+    QVBoxLayout(window).addWidget(panel)
+    panel.set_classes(classes, args.max_absence)
+    window.show()
+    app.processEvents()
+
+    updates = args.seconds * args.rate
+    start = time.perf_counter()
+    for i in range(updates):
+        # Объекты сдвинуты по фазе, чтобы в каждый момент были все уровни тревоги
+        absence = {cls: (j + i // args.rate) % (args.max_absence + 1) for j, cls in enumerate(classes)}
+        panel.update_absence(absence, args.max_absence)
+        app.processEvents()
+    update_ms = (time.perf_counter() - start) * 1000 / updates
+
+    # Добавление одного объекта к уже заполненной панели
+    start = time.perf_counter()
+    panel.set_classes(classes + ["new object"], args.max_absence)
+    app.processEvents()
+    add_ms = (time.perf_counter() - start) * 1000
+
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return update_ms, add_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", nargs="+", type=int, default=[10, 100, 300])
+    parser.add_argument("--rate", type=int, default=30, help="обновлений в секунду")
+    parser.add_argument("--seconds", type=int, default=3, help="секунд моделируемой работы")
+    parser.add_argument("--max-absence", type=int, default=30)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"{'объектов':>9} {'прежняя, мс/обн':>16} {'модель, мс/обн':>15} {'добавление: прежняя / модель, мс':>34}")
+    for count in args.objects:
+        old_update, old_add = measure(app, LegacyPanel(), count, args)
+        new_update, new_add = measure(app, ModelPanel(), count, args)
+        print(f"{count:>9} {old_update:>16.2f} {new_update:>15.2f} {old_add:>21.1f} / {new_add:.1f}")
+
+
+if __name__ == "__main__":
+    main()
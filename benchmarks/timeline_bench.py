@@ -0,0 +1,99 @@
+"""Запросы к журналу обнаружений на многомесячных данных.
+
+Журнал заполняется синтетическими строками напрямую (как их записал бы
+TimelineStore с разрешением --resolution секунд): каждый объект виден
+почти всё время и пропадает несколько раз в день. Затем замеряются
+«когда объект видели в последний раз» и «минуты отсутствия по дням».
+
+Пример:
+    python benchmarks/timeline_bench.py --days 90 --prompts 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from timeline import TimelineStore, connect  # noqa: E402
+
+
+def fill(path, days, prompts, cameras, resolution, gaps_per_day, seed=0):
+    rng = np.random.default_rng(seed)
+    end = time.time()
+    start = end - days * 86400
+    connection = connect(path)
+    rows = 0
+    for camera in cameras:
+        for prompt in prompts:
+            # Интервалы отсутствия: gaps_per_day в день по 1-30 минут
+            count = days * gaps_per_day
+            gap_starts = np.sort(rng.uniform(start, end, count))
+            gap_ends = gap_starts + rng.uniform(60, 1800, count)
+            times = np.arange(start, end, resolution)
+            hidden = np.zeros(len(times), bool)
+            for a, b in zip(gap_starts, gap_ends):
+                hidden[np.searchsorted(times, a):np.searchsorted(times, b)] = True
+            with connection:
+                connection.executemany(
+                    "INSERT INTO sightings VALUES (?, ?, ?)",
+                    ((camera, prompt, float(ts)) for ts in times[~hidden]),
+                )
+                connection.executemany(
+                    "INSERT INTO absences VALUES (?, ?, ?, ?)",
+                    ((camera, prompt, float(a), float(b)) for a, b in zip(gap_starts, gap_ends)),
+                )
+            rows += int((~hidden).sum()) + count
+    connection.close()
+    return rows
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+    values = np.asarray(samples) * 1000
+    return {"p50": round(float(np.percentile(values, 50)), 3), "max": round(float(values.max()), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--prompts", type=int, default=10)
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--resolution", type=float, default=10.0, help="секунд между записями обнаружений")
+    parser.add_argument("--gaps-per-day", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--path", help="файл журнала (по умолчанию временный)")
+    args = parser.parse_args()
+
+    prompts = [f"object{i}" for i in range(args.prompts)]
+    cameras = [f"camera{i}" for i in range(args.cameras)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "timeline.sqlite3")
+        store = TimelineStore(path)
+        t0 = time.perf_counter()
+        rows = fill(path, args.days, prompts, cameras, args.resolution, args.gaps_per_day)
+        fill_time = time.perf_counter() - t0
+        since = time.time() - 30 * 86400
+        report = {
+            "days": args.days,
+            "rows": rows,
+            "size_mb": round(os.path.getsize(path) / 1024 / 1024, 1),
+            "fill_s": round(fill_time, 1),
+            "last_seen_ms": timed(lambda: store.last_seen(prompts[0]), args.repeat),
+            "last_seen_camera_ms": timed(lambda: store.last_seen(prompts[0], cameras[0]), args.repeat),
+            "absence_per_day_30d_ms": timed(lambda: store.absence_minutes_per_day(prompts[0], since), args.repeat),
+        }
+        store.close()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Детектор на каждом кадре против детектора раз в K кадров с трекером.
+
+Синтетическая сцена с известной разметкой: текстурные объекты медленно
+движутся по текстурному фону и время от времени убираются из кадра -
+часть перерывов короче порога отсутствия (уведомления быть не должно),
+часть длиннее (уведомление должно прийти через порог после ухода).
+Детектор-заглушка берёт боксы из разметки с дрожанием и пропускает
+объекты сериями по несколько кадров, как настоящая модель на неудачных
+ракурсах. Его стоимость задаётся --detector-ms: время трекера и
+остальных стадий измеряется, а время детектора добавляется из расчёта
+на каждый вызов, так что результат не зависит от загрузки машины.
+
+Для каждого режима выводятся: число вызовов детектора, процессорное
+время на кадр и соответствующая ему частота кадров на одном ядре,
+точность уведомлений (найденные, ложные, задержка относительно
+разметки) и доля кадров, где присутствие объекта определено неверно.
+
+Пример:
+    python benchmarks/tracking_bench.py --every 1 3 5 10 --seconds 300
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from detections import Detections  # noqa: E402
+from monitor import CameraStream  # noqa: E402
+from tracking import Tracker  # noqa: E402
+
+
+def texture(rng, h, w, blur):
+    noise = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), blur)
+
+
+class Scene:
+    """Объекты с траекториями и расписанием присутствия; кадр n строится детерминированно"""
+    def __init__(self, width, height, objects, frames, fps, max_absence, seed=0):
+        rng = np.random.default_rng(seed)
+        self.width, self.height = width, height
+        self.background = texture(rng, height, width, 2)
+        self.size = 120
+        self.patches = [texture(rng, self.size, self.size, 1) for _ in range(objects)]
+        self.paths = [
+            (rng.uniform(0.2, 0.8, 2), rng.uniform(0.1, 0.3, 2), rng.uniform(0.005, 0.02, 2), rng.uniform(0, 6, 2))
+            for _ in range(objects)
+        ]
+        # Присутствие: 10-40 с на месте, затем перерыв короче или длиннее порога
+        self.present = np.ones((objects, frames), bool)
+        for i in range(objects):
+            n = int(rng.uniform(5, 20) * fps)
+            while n < frames:
+                if rng.random() < 0.5:
+                    gap = rng.uniform(0.2, 0.7) * max_absence
+                else:
+                    gap = rng.uniform(1.5, 3.0) * max_absence
+                gap = int(gap * fps)
+                self.present[i, n:n + gap] = False
+                n += gap + int(rng.uniform(10, 40) * fps)
+
+    def box(self, i, n):
+        (cx, cy), (ax, ay), (wx, wy), (px, py) = self.paths[i]
+        x = (cx + ax * np.sin(wx * n + px)) * (self.width - self.size)
+        y = (cy + ay * np.sin(wy * n + py)) * (self.height - self.size)
+        x = int(np.clip(x, 0, self.width - self.size))
+        y = int(np.clip(y, 0, self.height - self.size))
+        return x, y, x + self.size, y + self.size
+
+    def frame(self, n):
+        frame = self.background.copy()
+        for i, patch in enumerate(self.patches):
+            if self.present[i, n]:
+                x1, y1, x2, y2 = self.box(i, n)
+                frame[y1:y2, x1:x2] = patch
+        return frame
+
+
+class NoisyDetector:
+    """Боксы из разметки с дрожанием и сериями пропусков"""
+    def __init__(self, scene, classes, miss_rate=0.03, burst=(1, 8), jitter=4, seed=1):
+        self.scene = scene
+        self.classes = classes
+        self.miss_rate = miss_rate
+        self.burst = burst
+        self.jitter = jitter
+        self.rng = np.random.default_rng(seed)
+        self.missing_until = np.zeros(len(classes), int)
+        self.calls = 0
+
+    def __call__(self, n):
+        self.calls += 1
+        cls, boxes, conf = [], [], []
+        for i in range(len(self.classes)):
+            if not self.scene.present[i, n]:
+                continue
+            if n < self.missing_until[i]:
+                continue
+            if self.rng.random() < self.miss_rate:
+                self.missing_until[i] = n + self.rng.integers(self.burst[0], self.burst[1] + 1)
+                continue
+            box = np.array(self.scene.box(i, n)) + self.rng.integers(-self.jitter, self.jitter + 1, 4)
+            cls.append(i)
+            boxes.append(box)
+            conf.append(self.rng.uniform(0.3, 0.95))
+        if not cls:
+            return Detections.empty(self.classes)
+        return Detections(
+            self.classes, np.array(cls, np.int64), np.array(boxes, np.int32), np.array(conf, np.float32)
+        )
+
+
+def run_mode(scene, args, every):
+    classes = [f"object{i}" for i in range(len(scene.patches))]
+    detector = NoisyDetector(scene, classes, args.miss_rate)
+    tracker = Tracker(every, args.max_misses) if every > 1 else None
+    stream = CameraStream(0, classes, args.max_absence)
+    frames = scene.present.shape[1]
+    alerts = []
+    wrong = 0
+    overhead = 0.0
+    for n in range(frames):
+        frame = scene.frame(n)
+        timestamp = n / args.fps
+        started = time.process_time()
+        found = tracker.propagate(stream, frame, timestamp) if tracker is not None else None
+        if found is None:
+            found = detector(n)
+            if tracker is not None:
+                found = tracker.update(stream, frame, found)
+        _, missing = stream.update_absence(found, timestamp, timestamp)
+        overhead += time.process_time() - started
+        seen = found.names()
+        wrong += sum((name in seen) != scene.present[i, n] for i, name in enumerate(classes))
+        for name in missing:
+            alerts.append((classes.index(name), timestamp))
+        if missing:
+            stream.reset_absence()
+
+    cpu_ms = (overhead + detector.calls * args.detector_ms / 1000) / frames * 1000
+    return {
+        "every": every,
+        "detector_calls": detector.calls,
+        "overhead_ms_per_frame": round(overhead / frames * 1000, 3),
+        "cpu_ms_per_frame": round(cpu_ms, 2),
+        "fps_one_core": round(1000 / cpu_ms, 1),
+        "presence_error": round(wrong / (frames * len(classes)), 4),
+        **score_alerts(scene, args, alerts),
+    }
+
+
+def score_alerts(scene, args, alerts):
+    """Уведомления против разметки: перерывы не короче порога должны дать уведомление"""
+    expected = []
+    for i, present in enumerate(scene.present):
+        changes = np.flatnonzero(np.diff(present.astype(np.int8)))
+        starts = [c + 1 for c in changes if present[c] and not present[c + 1]]
+        for start in starts:
+            end = start + np.argmax(present[start:]) if present[start:].any() else len(present)
+            if (end - start) / args.fps >= args.max_absence:
+                expected.append((i, start / args.fps + args.max_absence, end / args.fps))
+    matched, delays, used = 0, [], set()
+    for obj, due, end in expected:
+        for k, (alert_obj, when) in enumerate(alerts):
+            if k not in used and alert_obj == obj and due - 0.5 <= when <= end + args.max_absence:
+                used.add(k)
+                matched += 1
+                delays.append(when - due)
+                break
+    return {
+        "alerts_expected": len(expected),
+        "alerts_matched": matched,
+        "alerts_false": len(alerts) - len(used),
+        "alert_delay_s": round(float(np.mean(delays)), 3) if delays else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--every", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--seconds", type=float, default=300)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--size", default="1280x720")
+    parser.add_argument("--objects", type=int, default=3)
+    parser.add_argument("--max-absence", type=float, default=3.0)
+    parser.add_argument("--max-misses", type=int, default=2)
+    parser.add_argument("--miss-rate", type=float, default=0.03, help="вероятность начала серии пропусков на кадре")
+    parser.add_argument("--detector-ms", type=float, default=120.0, help="процессорное время одного вызова детектора")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    width, height = map(int, args.size.lower().split("x"))
+    scene = Scene(width, height, args.objects, int(args.seconds * args.fps), args.fps, args.max_absence, args.seed)
+    report = {"config": vars(args), "modes": [run_mode(scene, args, every) for every in args.every]}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
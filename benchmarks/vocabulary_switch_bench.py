@@ -0,0 +1,225 @@
+"""Смена словаря модели на лету: простой видеопотока при переключении профилей.
+
+Движок мониторинга работает с синтетическими камерами, и во время работы
+список объектов всех камер несколько раз переключается между двумя
+профилями по --prompts промптов. Режимы:
+
+    blocking    - как до фоновой подготовки словарей: промпты кодируются
+                  в вызывающем потоке под блокировкой детектора;
+    background  - MonitorEngine.apply_profile: словарь готовится в фоне,
+                  детектор работает со старым и переключается между пакетами;
+    prefetched  - то же, но словари профилей подготовлены заранее
+                  (prefetch_profile), как для сохранённых профилей в GUI.
+
+Для каждого режима выводятся: сколько вызывающий поток (поток GUI) был
+заблокирован переключением, максимальный промежуток между результатами
+детектора, время до первого результата с новым словарём и число кадров,
+вытесненных из слота детектора (не попавших в детектор) за время
+переключения.
+
+По умолчанию модель - заглушка, текстовый энкодер которой тратит
+--encode-ms на промпт (порядок CPU-времени CLIP на промпт); с --model
+используются настоящие веса YOLO-World.
+
+Пример:
+    python benchmarks/vocabulary_switch_bench.py --prompts 200 --switches 4
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import monitor  # noqa: E402
+from backends import create_backend  # noqa: E402
+from monitor import MonitorEngine  # noqa: E402
+from replay import StubModel, SyntheticCapture  # noqa: E402
+from vocabulary import Vocabulary  # noqa: E402
+
+MODES = ("blocking", "background", "prefetched")
+
+
+class StubHead:
+    nc = 0
+
+
+class StubWorldNet:
+    """Сеть-заглушка с текстовым энкодером, как у WorldModel в ultralytics"""
+    def __init__(self, encode_ms):
+        self.encode_ms = encode_ms
+        self.txt_feats = torch.zeros(1, 0, 512)
+        self.names = []
+        self.model = [StubHead()]
+
+    def get_text_pe(self, prompts, cache_clip_model=False):
+        time.sleep(self.encode_ms / 1000 * len(prompts))
+        return torch.zeros(1, len(prompts), 512)
+
+    def set_classes(self, prompts):
+        self.txt_feats = self.get_text_pe(prompts)
+        self.model[-1].nc = len(prompts)
+        self.names = list(prompts)
+
+
+class StubWorldModel(StubModel):
+    """Заглушка YOLO-World, словарь которой задаётся эмбеддингами сети"""
+    def __init__(self, encode_ms, latency, per_frame):
+        super().__init__(latency, per_frame)
+        self.model = StubWorldNet(encode_ms)
+
+    @property
+    def classes(self):
+        return self.model.names
+
+    @classes.setter
+    def classes(self, value):
+        pass
+
+    def set_classes(self, classes):
+        self.model.set_classes(classes)
+
+
+class Capture(SyntheticCapture):
+    """Синтетическая камера, отдающая кадры с частотой fps"""
+    fps = 30
+
+    def __init__(self, *args):
+        super().__init__(1280, 720)
+        self.next_frame = time.perf_counter()
+
+    def read(self):
+        delay = self.next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame, time.perf_counter() - 1 / self.fps) + 1 / self.fps
+        return super().read()
+
+    def set(self, *args):
+        return True
+
+    def get(self, *args):
+        return 30
+
+
+def profiles(count, cameras):
+    """Два профиля с непересекающимися списками объектов"""
+    return [
+        [
+            {"source": f"camera{c}.mp4", "classes": [f"{name} object {c}-{i}" for i in range(count // cameras)]}
+            for c in range(cameras)
+        ]
+        for name in ("red", "blue")
+    ]
+
+
+def blocking_switch(engine, cameras):
+    """Переключение, как было раньше: энкодер работает под блокировкой детектора"""
+    profile = {str(camera["source"]): camera for camera in cameras}
+    with engine.lock:
+        for stream in engine.streams:
+            stream.set_classes(profile[str(stream.source)]["classes"])
+    vocabulary = engine.vocabulary_for(stream.selected_classes for stream in engine.streams)
+    detector = engine.detector
+    with detector.lock:
+        engine.backend.set_classes(vocabulary)
+        detector.classes = Vocabulary(vocabulary, detector.classes.version + 1)
+
+
+def run_mode(mode, args, model):
+    backend = create_backend(model, "torch")
+    engine = MonitorEngine(backend)
+    first, second = profiles(args.prompts, args.cameras)
+    for camera in first:
+        engine.add_stream(camera["source"], camera["classes"])
+    engine.update_vocabulary(wait=True)
+    if mode == "prefetched":
+        engine.prefetch_profile(second)
+        engine.vocabulary.wait_idle()
+
+    # Моменты результатов детектора и версия словаря, с которой они получены
+    results = []
+    results_lock = threading.Lock()
+    handle_results = engine.detector.on_results
+
+    def on_results(stream, detections, timestamp):
+        with results_lock:
+            results.append((time.perf_counter(), detections.classes.version))
+        handle_results(stream, detections, timestamp)
+
+    engine.detector.on_results = on_results
+    for stream in engine.streams:
+        engine.start_stream(stream)
+    time.sleep(args.settle)
+
+    blocked, gaps, latencies, dropped = [], [], [], []
+    for n in range(args.switches):
+        cameras = (second, first)[n % 2]
+        version = engine.detector.classes.version
+        drops = sum(stream.inference_slot.dropped for stream in engine.streams)
+        with results_lock:
+            start_index = len(results)
+        started = time.perf_counter()
+        if mode == "blocking":
+            blocking_switch(engine, cameras)
+        else:
+            engine.apply_profile(cameras)
+        blocked.append(time.perf_counter() - started)
+        time.sleep(args.interval)
+
+        with results_lock:
+            window = [started] + [moment for moment, _ in results[start_index:]]
+            switched = [moment for moment, seen in results[start_index:] if seen != version]
+        gaps.append(max(np.diff(window)) if len(window) > 1 else args.interval)
+        latencies.append(switched[0] - started if switched else None)
+        dropped.append(sum(stream.inference_slot.dropped for stream in engine.streams) - drops)
+    engine.stop()
+
+    done = [latency for latency in latencies if latency is not None]
+    return {
+        "mode": mode,
+        "caller_blocked_ms": round(max(blocked) * 1000, 1),
+        "max_result_gap_ms": round(max(gaps) * 1000, 1),
+        "switch_latency_ms": round(max(done) * 1000, 1) if done else None,
+        "switches_applied": len(done),
+        "frames_dropped_per_switch": round(float(np.mean(dropped)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="веса YOLO-World вместо заглушки")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--prompts", type=int, default=200, help="промптов в профиле")
+    parser.add_argument("--cameras", type=int, default=2)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--switches", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=5.0, help="пауза после каждого переключения, сек")
+    parser.add_argument("--settle", type=float, default=1.0, help="работа до первого переключения, сек")
+    parser.add_argument("--encode-ms", type=float, default=8.0, help="время энкодера заглушки на промпт, мс")
+    parser.add_argument("--latency", type=float, default=0.03, help="задержка заглушки на пакет, сек")
+    parser.add_argument("--per-frame", type=float, default=0.005, help="задержка заглушки на кадр пакета, сек")
+    args = parser.parse_args()
+
+    Capture.fps = args.fps
+    monitor.cv2.VideoCapture = Capture
+    report = {"config": vars(args), "modes": []}
+    for mode in args.modes:
+        if args.model:
+            from ultralytics import YOLO
+
+            model = YOLO(args.model)
+        else:
+            model = StubWorldModel(args.encode_ms, args.latency, args.per_frame)
+        report["modes"].append(run_mode(mode, args, model))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
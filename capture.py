@@ -0,0 +1,234 @@
+"""Захват кадров с малой задержкой.
+
+CaptureSource повторяет интерфейс cv2.VideoCapture (isOpened, read, get,
+set, release) для камер (индекс или /dev/videoN - V4L2 в Linux),
+видеофайлов, каталогов изображений и сетевых потоков (rtsp://, http://).
+
+У живых источников - камер и сетевых потоков:
+- FOURCC (USB-камеры в MJPG отдают большие разрешения с полной
+  частотой), разрешение и частота задаются до первого кадра, а очередь
+  драйвера сокращается до buffer_size кадров (CAP_PROP_BUFFERSIZE, если
+  бэкенд его поддерживает);
+- read сначала только забирает кадр (grab); если grab вернулся почти
+  сразу, кадр ждал в очереди, пока поток был занят, - такие кадры
+  пропускаются без декодирования, пока grab не начнёт ждать свежий кадр,
+  так что детектор получает новейший кадр, а не кадр сотни миллисекунд
+  назад;
+- при обрыве reconnect переоткрывает источник с удвоением паузы, а
+  поток захвата (см. CaptureWorker в monitor.py) не останавливает камеру.
+
+Кадры читаются в буферы FramePool через read(image=...) и retrieve(image=...),
+поэтому поток захвата не выделяет новый массив на каждый кадр. Кто
+получил кадр (слоты кадров, детектор, буфер клипа), отмечает это через
+retain и отпускает через release; буфер используется заново, когда его
+не держит никто. Без retain кадр действителен до следующего read.
+"""
+import os
+import threading
+import time
+
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# Предел ожидания открытия и чтения сетевого потока, мс: зависший поток считается оборвавшимся
+NETWORK_TIMEOUT_MS = 5000
+
+
+def is_live(source):
+    """Камера или сетевой поток, а не файл или каталог"""
+    if isinstance(source, int):
+        return True
+    return source.startswith("/dev/video") or "://" in source
+
+
+def parse_size(text):
+    """Разрешение "1280x720" -> (1280, 720)"""
+    width, sep, height = text.lower().partition("x")
+    if not sep:
+        raise ValueError(f"Разрешение задаётся как ШИРИНАxВЫСОТА: {text}")
+    return int(width), int(height)
+
+
+class ImageFolderCapture:
+    """Каталог изображений с интерфейсом cv2.VideoCapture"""
+    def __init__(self, path):
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.position = 0
+
+    def isOpened(self):
+        return self.position < len(self.files)
+
+    def read(self):
+        while self.position < len(self.files):
+            frame = cv2.imread(self.files[self.position])
+            self.position += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        self.position = len(self.files)
+
+
+class FramePool:
+    """Буферы кадров одного размера, которые переиспользуются, когда кадр больше никому не нужен.
+
+    Буферы выдаёт только поток захвата, а retain и release вызываются из
+    потоков-потребителей, поэтому счётчики защищены блокировкой. Кадры не
+    из пула (например, буферы прежнего разрешения) счётчики не меняют.
+    """
+    def __init__(self, size=6):
+        self.size = size
+        self._buffers = []
+        # id буфера -> сколько потребителей держат кадр
+        self._users = {}
+        self._lock = threading.Lock()
+        # Сколько раз кадр пришлось читать в новый массив
+        self.allocated = 0
+
+    def acquire(self):
+        """Свободный буфер или None - тогда кадр читается в новый массив"""
+        with self._lock:
+            for buffer in self._buffers:
+                if not self._users[id(buffer)]:
+                    return buffer
+        return None
+
+    def retain(self, frame):
+        """Кадр передан потребителю: буфер не используется заново до release"""
+        with self._lock:
+            if id(frame) in self._users:
+                self._users[id(frame)] += 1
+
+    def release(self, frame):
+        """Потребитель больше не обращается к кадру"""
+        with self._lock:
+            if self._users.get(id(frame)):
+                self._users[id(frame)] -= 1
+
+    def fill(self, read):
+        """read(image) -> (ok, frame): кадр в свободный буфер пула"""
+        buffer = self.acquire()
+        ok, frame = read(buffer)
+        if ok and frame is not buffer:
+            self.allocated += 1
+            with self._lock:
+                # Сменилось разрешение: буферы старого размера больше не подойдут
+                self._buffers = [b for b in self._buffers if b.shape == frame.shape and b.dtype == frame.dtype]
+                if len(self._buffers) < self.size:
+                    self._buffers.append(frame)
+                self._users = {id(b): self._users.get(id(b), 0) for b in self._buffers}
+        return ok, frame
+
+
+class CaptureSource:
+    # Доля интервала между кадрами: grab быстрее этого отдал кадр из очереди
+    stale_fraction = 0.25
+
+    def __init__(self, source, fps=None, size=None, fourcc=None, buffer_size=1, max_drain=4,
+                 reconnect_delay=0.5, reconnect_max_delay=30.0, pool=None, stats=None):
+        self.source = source
+        self.fps = fps
+        self.size = size
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.max_drain = max_drain
+        self.reconnect_delay = reconnect_delay
+        # 0 - не переподключаться: обрыв останавливает камеру
+        self.reconnect_max_delay = reconnect_max_delay
+        self.pool = pool if pool is not None else FramePool()
+        self.stats = stats if stats is not None else {"drained": 0, "reconnects": 0}
+        self.live = is_live(source)
+        self.cap = None
+        # Пауза между кадрами при воспроизведении файлов и каталогов (0 - не ждать)
+        self.frame_interval = 0
+        self._stale_grab = 0.0
+
+    def open(self):
+        source = self.source
+        if isinstance(source, str) and os.path.isdir(source):
+            self.cap = ImageFolderCapture(source)
+            self.frame_interval = 1.0 / (self.fps or 1)
+            return self.cap.isOpened()
+        if isinstance(source, str) and "://" in source:
+            self.cap = cv2.VideoCapture(source, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, NETWORK_TIMEOUT_MS, cv2.CAP_PROP_READ_TIMEOUT_MSEC, NETWORK_TIMEOUT_MS,
+            ])
+        else:
+            self.cap = cv2.VideoCapture(source)
+            # Для камеры по умолчанию пробуем и следующий индекс
+            if not self.cap.isOpened() and source == 0:
+                self.cap = cv2.VideoCapture(1)
+        if not self.cap.isOpened():
+            return False
+        if self.live:
+            self._configure()
+        elif os.path.isfile(source):
+            # Видеофайл воспроизводим в реальном времени, иначе таймеры отсутствия теряют смысл
+            fps = self.fps or self.cap.get(cv2.CAP_PROP_FPS) or 25
+            self.frame_interval = 1.0 / fps
+        return True
+
+    def _configure(self):
+        cap = self.cap
+        # FOURCC ставится до разрешения: от формата зависит, какие разрешения доступны
+        if self.fourcc:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        if self.size:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+        if self.fps:
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if self.buffer_size:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self._stale_grab = self.stale_fraction / (fps if fps and fps > 0 else 30)
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def read(self):
+        cap = self.cap
+        if not hasattr(cap, "retrieve"):
+            # Каталог изображений и подменённые источники читают кадр целиком
+            return cap.read()
+        if not self.live:
+            return self.pool.fill(lambda buffer: cap.read(image=buffer))
+        started = time.perf_counter()
+        if not cap.grab():
+            return False, None
+        drained = 0
+        # Кадр отдан сразу - он ждал в очереди; берём следующий, пока grab не начнёт ждать камеру
+        while drained < self.max_drain and time.perf_counter() - started < self._stale_grab:
+            started = time.perf_counter()
+            if not cap.grab():
+                return False, None
+            drained += 1
+        self.stats["drained"] += drained
+        return self.pool.fill(lambda buffer: cap.retrieve(image=buffer))
+
+    def reconnect(self, stop_event):
+        """Переоткрывать источник с удвоением паузы; False - поток остановили раньше"""
+        delay = self.reconnect_delay
+        while True:
+            self.release()
+            if stop_event.wait(delay):
+                return False
+            self.stats["reconnects"] += 1
+            if self.open():
+                return True
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    def release(self):
+        if self.cap is not None and self.cap.isOpened():
+            self.cap.release()
@@ -0,0 +1,178 @@
+"""Кольцевой буфер кадров перед уведомлением и запись клипов.
+
+Поток захвата только оставляет ссылку на кадр (не чаще fps раз в
+секунду). Отдельный поток сжимает кадры в JPEG и складывает в кольцевой
+буфер камеры, из которого вытесняются кадры старше seconds и самые старые
+кадры при превышении бюджета памяти. При уведомлении об отсутствии
+содержимое буфера передаётся потоку записи, который собирает из него
+видеофайл; детектор и поток захвата не ждут ни сжатия, ни диска.
+"""
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class FrameRing:
+    """Сжатые кадры одной камеры за последние seconds секунд в пределах budget байт"""
+    def __init__(self, seconds, budget):
+        self.seconds = seconds
+        self.budget = budget
+        self.frames = deque()
+        self.size = 0
+
+    def append(self, timestamp, data):
+        self.frames.append((timestamp, data))
+        self.size += len(data)
+        while self.frames and (self.size > self.budget or timestamp - self.frames[0][0] > self.seconds):
+            _, old = self.frames.popleft()
+            self.size -= len(old)
+
+    def clear(self):
+        self.frames.clear()
+        self.size = 0
+
+
+class ClipRecorder:
+    def __init__(self, clip_dir, seconds=60, budget_mb=64, fps=10, quality=75, max_width=1280):
+        self.clip_dir = clip_dir
+        self.seconds = seconds
+        # Бюджет памяти на одну камеру
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.fps = fps
+        self.quality = quality
+        self.max_width = max_width
+
+        self._rings = {}
+        # Последний ещё не сжатый кадр каждой камеры: если сжатие не успевает, старый вытесняется
+        self._pending = {}
+        self._last_push = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._writes = queue.Queue()
+        self._encoder = threading.Thread(target=self._encode_loop, daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._encoder.start()
+        self._writer.start()
+
+    def push(self, stream, frame, timestamp, pool=None):
+        """Вызывается из потока захвата; лишние кадры отбрасываются без копирования.
+
+        pool - пул буферов кадра (см. FramePool в capture.py): кадр держится, пока не сжат.
+        """
+        if timestamp - self._last_push.get(stream, 0) < 1.0 / self.fps:
+            return
+        self._last_push[stream] = timestamp
+        if pool is not None:
+            pool.retain(frame)
+        with self._lock:
+            evicted = self._pending.get(stream)
+            self._pending[stream] = (frame, timestamp, pool)
+        self._release(evicted)
+        self._wakeup.set()
+
+    @staticmethod
+    def _release(item):
+        if item is not None and item[2] is not None:
+            item[2].release(item[0])
+
+    def clear(self, stream):
+        """Забыть кадры камеры, например перед её перезапуском"""
+        with self._lock:
+            ring = self._rings.get(stream)
+            if ring is not None:
+                ring.clear()
+            evicted = self._pending.pop(stream, None)
+        self._release(evicted)
+        self._last_push.pop(stream, None)
+
+    def memory_used(self):
+        with self._lock:
+            return sum(ring.size for ring in self._rings.values())
+
+    def save_clip(self, stream):
+        """Поставить содержимое буфера камеры в очередь на запись; возвращает путь будущего файла"""
+        with self._lock:
+            ring = self._rings.get(stream)
+            frames = list(ring.frames) if ring is not None else []
+        if not frames:
+            return None
+        name = re.sub(r"[^\w.-]+", "_", os.path.splitext(stream.name)[0]).strip("_") or "camera"
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(frames[-1][0]))
+        path = os.path.join(self.clip_dir, f"{stamp}_{name}.mp4")
+        self._writes.put((path, frames))
+        return path
+
+    def close(self, timeout=10.0):
+        """Дописать клипы из очереди и остановить потоки"""
+        self._stop.set()
+        self._wakeup.set()
+        self._writes.put(None)
+        self._writer.join(timeout)
+
+    def _encode(self, frame):
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, h * self.max_width // w), interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return data.tobytes() if ok else None
+
+    def _encode_loop(self):
+        while not self._stop.is_set():
+            if not self._wakeup.wait(0.5):
+                continue
+            self._wakeup.clear()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for stream, item in pending.items():
+                frame, timestamp, _ = item
+                try:
+                    data = self._encode(frame)
+                finally:
+                    self._release(item)
+                if data is None:
+                    continue
+                with self._lock:
+                    ring = self._rings.get(stream)
+                    if ring is None:
+                        ring = self._rings[stream] = FrameRing(self.seconds, self.budget)
+                    ring.append(timestamp, data)
+
+    def _write_loop(self):
+        while True:
+            job = self._writes.get()
+            if job is None:
+                return
+            path, frames = job
+            try:
+                self._write(path, frames)
+            except Exception as e:
+                print(f"Не удалось записать клип {path}: {e}", file=sys.stderr)
+
+    def _write(self, path, frames):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else self.fps
+        writer = None
+        tmp_path = path + ".part.mp4"
+        try:
+            for _, data in frames:
+                frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if writer is None:
+                    h, w = frame.shape[:2]
+                    writer = cv2.VideoWriter(tmp_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+                    if not writer.isOpened():
+                        raise RuntimeError("кодек mp4v недоступен")
+                writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+        # Файл появляется под своим именем только целиком
+        os.replace(tmp_path, path)
@@ -0,0 +1,81 @@
+"""Колоночное представление обнаружений одного кадра.
+
+Вместо списка кортежей по каждому боксу результат YOLO один раз
+переводится в массивы NumPy: индексы классов, координаты и уверенности.
+Фильтрация по списку объектов камеры и множество обнаруженных классов
+считаются векторно, без поэлементного обращения к тензорам.
+"""
+import numpy as np
+
+
+def to_numpy(values):
+    if hasattr(values, "cpu"):
+        values = values.cpu().numpy()
+    return np.asarray(values)
+
+
+class ArrayBoxes:
+    """Боксы в массивах NumPy с интерфейсом result.boxes YOLO (cls, xyxy, conf)"""
+    def __init__(self, cls, xyxy, conf):
+        self.cls = cls
+        self.xyxy = xyxy
+        self.conf = conf
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class ArrayResult:
+    """Результат, собранный не моделью (тайлы, пул процессов, сервер инференса), с интерфейсом результата YOLO"""
+    def __init__(self, boxes, orig_shape):
+        self.boxes = boxes
+        self.orig_shape = orig_shape
+
+
+class Detections:
+    __slots__ = ("classes", "cls", "xyxy", "conf")
+
+    def __init__(self, classes, cls, xyxy, conf):
+        # Словарь модели, к которому относятся индексы cls
+        self.classes = classes
+        self.cls = cls
+        self.xyxy = xyxy
+        self.conf = conf
+
+    @classmethod
+    def empty(cls, classes=()):
+        return cls(classes, np.empty(0, np.int64), np.empty((0, 4), np.int32), np.empty(0, np.float32))
+
+    @classmethod
+    def from_result(cls, result, classes, stream_classes=None):
+        """Результат YOLO -> обнаружения; stream_classes оставляет только объекты камеры"""
+        boxes = result.boxes
+        cls_idx = to_numpy(boxes.cls).reshape(-1).astype(np.int64)
+        if not len(cls_idx) or not len(classes):
+            return cls.empty(classes)
+
+        # Индексы вне словаря могут прийти только от устаревшего результата - отбрасываем
+        keep = cls_idx < len(classes)
+        if stream_classes is not None:
+            allowed = np.fromiter((name in stream_classes for name in classes), bool, len(classes))
+            keep &= allowed[np.minimum(cls_idx, len(classes) - 1)]
+
+        # astype отбрасывает дробную часть так же, как int()
+        xyxy = to_numpy(boxes.xyxy).reshape(-1, 4)[keep].astype(np.int32)
+        conf = to_numpy(boxes.conf).reshape(-1)[keep].astype(np.float32)
+        return cls(classes, cls_idx[keep], xyxy, conf)
+
+    def select(self, mask):
+        if mask.all():
+            return self
+        return Detections(self.classes, self.cls[mask], self.xyxy[mask], self.conf[mask])
+
+    def __len__(self):
+        return len(self.cls)
+
+    def names(self):
+        """Множество обнаруженных классов"""
+        return {self.classes[i] for i in np.unique(self.cls)}
+
+    def name(self, i):
+        return self.classes[self.cls[i]]
@@ -0,0 +1,130 @@
+"""Кэш текстовых эмбеддингов промптов для YOLO-World.
+
+Вместо того чтобы при каждом изменении списка объектов заново прогонять все
+промпты через текстовый энкодер CLIP, эмбеддинги хранятся по строке промпта,
+вытесняются по LRU и сохраняются на диск между запусками.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Идентификатор текстового энкодера: эмбеддинги разных энкодеров несовместимы
+TEXT_ENCODER = "clip:ViT-B/32"
+
+
+class TextEmbeddingCache:
+    def __init__(self, path=None, max_size=2048):
+        self.path = path
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        # Количество промптов, прогнанных через энкодер (для диагностики)
+        self.encoded = 0
+        if path:
+            self.load()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, prompt):
+        return prompt in self._items
+
+    def get(self, prompt):
+        with self._lock:
+            emb = self._items.get(prompt)
+            if emb is not None:
+                self._items.move_to_end(prompt)
+            return emb
+
+    def put(self, prompt, emb):
+        with self._lock:
+            self._items[prompt] = emb.detach().float().cpu()
+            self._items.move_to_end(prompt)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        # torch импортируется по месту: импорт модуля не должен задерживать запуск GUI
+        import torch
+
+        try:
+            data = torch.load(self.path, map_location="cpu")
+        except Exception as e:
+            print(f"Не удалось загрузить кэш эмбеддингов {self.path}: {e}", file=sys.stderr)
+            return
+        if data.get("encoder") != TEXT_ENCODER:
+            return
+        with self._lock:
+            self._items = OrderedDict(data["embeddings"])
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"encoder": TEXT_ENCODER, "embeddings": OrderedDict(self._items)}
+        import torch
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Пишем во временный файл и переименовываем, чтобы не оставить битый кэш
+        tmp_path = self.path + ".tmp"
+        torch.save(data, tmp_path)
+        os.replace(tmp_path, self.path)
+
+
+def encode_prompts(net, prompts):
+    """Прогоняет промпты через текстовый энкодер одним вызовом, возвращает (N, D)"""
+    if hasattr(net, "get_text_pe"):
+        # CLIP остаётся загруженным между вызовами
+        feats = net.get_text_pe(prompts, cache_clip_model=True)
+    else:
+        # Старые версии ultralytics умеют только set_classes
+        net.set_classes(prompts)
+        feats = net.txt_feats
+    return feats.reshape(len(prompts), -1)
+
+
+def text_features(model, classes, cache=None):
+    """Эмбеддинги промптов (1, N, D) для словаря classes; модель не меняется.
+
+    С кэшем через энкодер проходят только промпты, которых в нём нет.
+    """
+    net = model.model
+    if cache is None:
+        return encode_prompts(net, list(classes)).detach().unsqueeze(0)
+    embeddings = {}
+    missing = []
+    for prompt in classes:
+        emb = cache.get(prompt)
+        if emb is None:
+            missing.append(prompt)
+        else:
+            embeddings[prompt] = emb
+
+    if missing:
+        feats = encode_prompts(net, missing)
+        for prompt, emb in zip(missing, feats):
+            cache.put(prompt, emb)
+            embeddings[prompt] = emb.detach().float().cpu()
+        cache.encoded += len(missing)
+        cache.save()
+
+    import torch
+
+    device = next(net.parameters()).device
+    return torch.stack([embeddings[prompt] for prompt in classes]).unsqueeze(0).to(device)
+
+
+def apply_text_features(model, classes, txt_feats):
+    """Подмена словаря модели готовыми эмбеддингами: только присваивания, без энкодера"""
+    net = model.model
+    net.txt_feats = txt_feats
+    net.model[-1].nc = len(classes)
+    net.names = list(classes)
+
+
+def set_classes_cached(model, classes, cache):
+    """Аналог model.set_classes, кодирующий только промпты, которых нет в кэше"""
+    apply_text_features(model, classes, text_features(model, classes, cache))
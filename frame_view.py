@@ -0,0 +1,69 @@
+"""Виджет вывода кадров камеры.
+
+Кадр приходит уже уменьшенным до размера виджета (rendering.fit_frame)
+и оборачивается в QImage формата BGR888 без копирования и без перевода
+в RGB; виджет рисует его в paintEvent напрямую, минуя QPixmap и
+масштабирование в QLabel.
+"""
+from PyQt5.QtCore import Qt, QRectF
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen
+from PyQt5.QtWidgets import QWidget
+
+
+class FrameView(QWidget):
+    def __init__(self, width, height, border_color="#7B9E89", parent=None):
+        super().__init__(parent)
+        self.setFixedSize(width, height)
+        self.border_pen = QPen(QColor(border_color), 2)
+        self.background = QColor(Qt.black)
+        self._image = None
+        # QImage не владеет памятью, поэтому массив кадра держим до следующего кадра
+        self._frame = None
+        self._message = None
+
+    def frame_size(self):
+        """Размер области под кадр; рамка рисуется поверх его краёв"""
+        return self.width(), self.height()
+
+    def set_frame(self, frame):
+        """Показать BGR-кадр, не превышающий размеров виджета"""
+        h, w = frame.shape[:2]
+        self._frame = frame
+        self._image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        self._message = None
+        self.update()
+
+    def show_message(self, text):
+        self._frame = self._image = None
+        self._message = text
+        self.background = QColor(Qt.white)
+        self.update()
+
+    def clear(self):
+        self._frame = self._image = None
+        self._message = None
+        self.background = QColor(Qt.white)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = QRectF(self.rect()).adjusted(1, 1, -1, -1)
+        painter.setRenderHint(QPainter.Antialiasing)
+        image = self._image
+        if image is None or image.width() < self.width() or image.height() < self.height():
+            # Фон виден только там, где кадр не закрывает виджет
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self.background if image is None else QColor(Qt.black))
+            painter.drawRoundedRect(rect, 8, 8)
+        if image is not None:
+            # Кадр по центру, поля остаются чёрными
+            x = (self.width() - image.width()) // 2
+            y = (self.height() - image.height()) // 2
+            painter.drawImage(x, y, image)
+        elif self._message:
+            painter.setPen(Qt.black)
+            painter.drawText(self.rect(), Qt.AlignCenter, self._message)
+        painter.setPen(self.border_pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRoundedRect(rect, 8, 8)
+        painter.end()
@@ -0,0 +1,567 @@
+"""Локальный сервер инференса с динамическим пакетированием и клиент к нему.
+
+Модель загружается один раз на сервере, а приложения и мониторы без
+графического интерфейса становятся тонкими клиентами: вместо модели у них
+RemoteBackend, который отправляет кадры по HTTP (TCP или Unix-сокет) и
+получает компактные обнаружения. Так на рабочих станциях не нужны ни веса,
+ни torch.
+
+Сервер собирает кадры всех клиентов в общую очередь. Поток пакетирования
+берёт первый кадр и ждёт ещё не дольше max_wait секунд или до max_batch
+кадров, после чего прогоняет пакет через бэкенд (см. backends.py) одним
+вызовом. Потоков столько, сколько пакетов бэкенд держит в работе
+одновременно (concurrency, например у ProcessPoolBackend).
+
+Каждый клиент регистрирует свой список объектов (POST /vocabulary), модель
+работает с их объединением, а клиент получает боксы с именами классов и
+сам переводит их в индексы своего словаря. Словарь готовится в фоне
+(см. vocabulary.py) и применяется, когда пакеты на старом закончатся.
+Клиент, который не присылал кадров дольше client_ttl, из объединения
+исключается, а сервер отключается от его сегментов разделяемой памяти.
+
+Кадры передаются одним из способов:
+    jpeg - сжатые кадры в теле запроса (по сети);
+    raw  - несжатые BGR-кадры в теле запроса (Unix-сокет, локальная сеть);
+    shm  - кадры в разделяемой памяти клиента, в запросе только её имя
+           и смещения (клиент и сервер на одной машине).
+
+Запуск сервера:
+    python inference_server.py --model LVIS.pt --port 8765
+    python inference_server.py --model LVIS.pt --unix /tmp/detector.sock --workers 4
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import resource_tracker, shared_memory
+from urllib.parse import urlsplit
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS, PreparedVocabulary, create_backend
+from detections import ArrayBoxes, ArrayResult, to_numpy
+from monitor import EMBEDDINGS_PATH, EXPORTS_DIR, MODELS_DIR, MonitorEngine
+from vocabulary import Vocabulary, VocabularySwitcher
+
+TRANSPORTS = ("jpeg", "raw", "shm")
+
+
+class _Item:
+    """Кадр в очереди сервера и место для его результата"""
+    def __init__(self, frame):
+        self.frame = frame
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class InferenceServer:
+    def __init__(self, backend, max_batch=16, max_wait=0.01, client_ttl=60.0):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.client_ttl = client_ttl
+        self.stats = {"requests": 0, "frames": 0, "batches": 0, "max_batch": 0}
+
+        # Клиент -> [список объектов, момент последнего запроса]
+        self.clients = {}
+        self._clients_lock = threading.Lock()
+        self._next_prune = 0.0
+        # Словарь, с которым работает модель, и смена словаря между пакетами, как в DetectorWorker
+        self.classes = Vocabulary()
+        self._pending = None
+        self._inflight = 0
+        self._applying = False
+        self.lock = threading.Condition()
+        self._apply_lock = threading.Lock()
+        self.vocabulary = VocabularySwitcher(backend, self.switch)
+
+        # Подключённые сегменты разделяемой памяти: клиент -> {имя: сегмент}
+        self._segments = {}
+        # Отключённые сегменты, на память которых ещё ссылаются кадры (закрываются позже)
+        self._retired = []
+        self._segments_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._batch_loop, daemon=True) for _ in range(backend.concurrency)]
+        for thread in self._threads:
+            thread.start()
+        self.httpd = None
+
+    # Словарь
+
+    def register(self, client, classes):
+        with self._clients_lock:
+            self.clients[client] = [list(classes), time.monotonic()]
+        # Повторная регистрация (после 409 или перезапуска клиента): прежние сегменты могли смениться
+        self._release_segments(client)
+        self._update_vocabulary()
+
+    def _touch(self, client):
+        now = time.monotonic()
+        with self._clients_lock:
+            entry = self.clients.get(client)
+            if entry is None:
+                return False
+            entry[1] = now
+            prune = now >= self._next_prune
+            if prune:
+                self._next_prune = now + self.client_ttl / 4
+        if prune:
+            self._update_vocabulary()
+        return True
+
+    def _update_vocabulary(self):
+        now = time.monotonic()
+        with self._clients_lock:
+            expired = [c for c, (_, seen) in self.clients.items() if now - seen > self.client_ttl]
+            for client in expired:
+                del self.clients[client]
+            vocabulary = tuple(MonitorEngine.vocabulary_for(classes for classes, _ in self.clients.values()))
+        for client in expired:
+            self._release_segments(client)
+        if vocabulary != self.vocabulary.target:
+            self.vocabulary.request(vocabulary)
+
+    def switch(self, prepared):
+        """Вызывается из потока подготовки словаря; ждёт, пока идущие пакеты закончатся"""
+        with self._apply_lock, self.lock:
+            self._applying = True
+            self.lock.wait_for(lambda: self._inflight == 0)
+            try:
+                self.backend.apply(prepared)
+                self.classes = prepared.vocabulary
+            finally:
+                self._applying = False
+                self.lock.notify_all()
+
+    # Кадры
+
+    def detect(self, client, meta, body, timeout=30.0):
+        """Кадры запроса в общую очередь; возвращает результаты в порядке кадров"""
+        if not self._touch(client):
+            return None
+        items = [_Item(frame) for frame in self._decode(client, meta, body)]
+        for item in items:
+            self._queue.put(item)
+        for item in items:
+            if not item.done.wait(timeout):
+                raise TimeoutError("Сервер инференса не успел обработать кадр")
+            if item.error is not None:
+                raise RuntimeError(item.error)
+        with self._clients_lock:
+            self.stats["requests"] += 1
+            self.stats["frames"] += len(items)
+        return [item.result for item in items]
+
+    def _decode(self, client, meta, body):
+        transport = meta.get("transport", "jpeg")
+        if transport == "shm":
+            return self._shm_frames(client, meta)
+        frames = []
+        offset = 0
+        for info in meta["frames"]:
+            if transport == "jpeg":
+                data = np.frombuffer(body, np.uint8, info["size"], offset)
+                offset += info["size"]
+                frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                if frame is None:
+                    raise ValueError("Не удалось декодировать JPEG")
+            elif transport == "raw":
+                shape = tuple(info["shape"])
+                frame = np.frombuffer(body, np.uint8, int(np.prod(shape)), offset).reshape(shape)
+                offset += frame.nbytes
+            else:
+                raise ValueError(f"Неизвестный способ передачи кадров: {transport}")
+            frames.append(frame)
+        return frames
+
+    def _shm_frames(self, client, meta):
+        if meta.get("replaces"):
+            # Клиент пересоздал сегмент большего размера, старый больше не придёт
+            self._release_segments(client, [meta["replaces"]])
+        # Кадры создаются под блокировкой: отключение сегмента не проскочит между подключением и чтением
+        with self._segments_lock:
+            segments = self._segments.setdefault(client, {})
+            segment = segments.get(meta["shm"])
+            if segment is None:
+                segment = segments[meta["shm"]] = attach_shared_memory(meta["shm"])
+            # Кадр читается прямо из памяти клиента: клиент ждёт ответа и не трогает её
+            return [
+                np.ndarray(tuple(info["shape"]), np.uint8, buffer=segment.buf, offset=info["offset"])
+                for info in meta["frames"]
+            ]
+
+    def _release_segments(self, client=None, names=None):
+        """Отключиться от сегментов клиента (всех или names; client=None - всех клиентов)"""
+        with self._segments_lock:
+            for owner in list(self._segments) if client is None else [client]:
+                segments = self._segments.get(owner, {})
+                for name in list(segments) if names is None else names:
+                    segment = segments.pop(name, None)
+                    if segment is not None:
+                        self._retired.append(segment)
+                if not segments:
+                    self._segments.pop(owner, None)
+            busy = []
+            for segment in self._retired:
+                try:
+                    segment.close()
+                except BufferError:
+                    # На память ещё ссылаются кадры в работе или последний пакет предиктора
+                    busy.append(segment)
+            self._retired = busy
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        with self.lock:
+            self.lock.wait_for(lambda: not self._applying)
+            self._inflight += 1
+            classes = self.classes
+        try:
+            results = self.backend([item.frame for item in batch])
+            for item, result in zip(batch, results):
+                item.result = compact_result(result, classes)
+        except Exception as e:
+            for item in batch:
+                item.error = f"{type(e).__name__}: {e}"
+        finally:
+            with self.lock:
+                self._inflight -= 1
+                self.lock.notify_all()
+        with self._clients_lock:
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+        for item in batch:
+            item.done.set()
+
+    # HTTP
+
+    def serve(self, port=8765, host="127.0.0.1", unix=None):
+        """Обслуживать запросы до shutdown (блокирует вызывающий поток)"""
+        if unix:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            self.httpd = _UnixHTTPServer(unix, _Handler)
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.inference = self
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            if isinstance(self.httpd, _UnixHTTPServer):
+                os.unlink(self.httpd.server_address)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self.vocabulary.close()
+        self.backend.close()
+        self._release_segments()
+
+
+def compact_result(result, classes):
+    """Боксы результата с именами классов вместо индексов"""
+    boxes = result.boxes
+    cls = to_numpy(boxes.cls).reshape(-1).astype(int)
+    keep = cls < len(classes)
+    return {
+        "labels": [classes[i] for i in cls[keep]],
+        "xyxy": np.round(to_numpy(boxes.xyxy).reshape(-1, 4)[keep], 1).tolist(),
+        "conf": np.round(to_numpy(boxes.conf).reshape(-1)[keep], 3).tolist(),
+        "shape": list(result.orig_shape) if hasattr(result, "orig_shape") else None,
+    }
+
+
+def attach_shared_memory(name):
+    """Подключение к чужому сегменту: при выходе сервер не должен его удалять"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # До Python 3.13 каждый подключившийся процесс регистрирует сегмент для удаления
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Соединения клиентов держатся открытыми между кадрами
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/stats":
+            server = self.server.inference
+            with server._clients_lock:
+                stats = dict(server.stats, clients=len(server.clients), vocabulary=len(server.classes))
+            self._reply(200, stats)
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        server = self.server.inference
+        path = urlsplit(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if path == "/vocabulary":
+                request = json.loads(body)
+                server.register(request["client"], request["classes"])
+                self._reply(200, {"ok": True})
+            elif path == "/detect":
+                meta = json.loads(self.headers["X-Frames"])
+                results = server.detect(self.headers["X-Client"], meta, body)
+                if results is None:
+                    # Клиент неизвестен (например, сервер перезапущен): он зарегистрирует словарь заново
+                    self._reply(409, {"error": "unknown client"})
+                else:
+                    self._reply(200, {"results": results})
+            else:
+                self._reply(404, {"error": "not found"})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # У Unix-сокета нет адреса клиента
+        return str(self.client_address or "unix")
+
+    def log_message(self, *args):
+        pass
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class RemoteBackend:
+    """Бэкенд-клиент сервера инференса: модель и torch на клиенте не нужны"""
+    name = "remote"
+
+    def __init__(self, url, transport="jpeg", quality=90, concurrency=2, timeout=30.0):
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Неизвестный способ передачи кадров: {transport}")
+        self.url = url
+        self.transport = transport
+        self.quality = quality
+        # Пока один пакет в пути, следующий уже кодируется
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.client = uuid.uuid4().hex
+        self.vocabulary = ()
+        self._local = threading.local()
+        self._segments = []
+        self._segments_lock = threading.Lock()
+
+    def set_classes(self, classes):
+        self.apply(self.prepare(classes))
+
+    def prepare(self, vocabulary):
+        # Текстовый энкодер работает на сервере
+        return PreparedVocabulary(vocabulary)
+
+    def apply(self, prepared):
+        self.vocabulary = tuple(prepared.vocabulary)
+        try:
+            self._register()
+        except OSError as e:
+            # Сервер ещё не запущен: словарь отправится с первым пакетом кадров
+            print(f"Сервер инференса {self.url} недоступен: {e}", file=sys.stderr)
+
+    def _register(self):
+        classes = [cls for cls in self.vocabulary if cls != "__placeholder__"]
+        body = json.dumps({"client": self.client, "classes": classes}, ensure_ascii=False).encode("utf-8")
+        self._request("/vocabulary", body, {"Content-Type": "application/json"})
+
+    def __call__(self, frames, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        if not frames:
+            return []
+        vocabulary = self.vocabulary
+        meta, body = self._encode(frames)
+        headers = {"X-Client": self.client, "X-Frames": json.dumps(meta), "Content-Type": "application/octet-stream"}
+        status, reply = self._request("/detect", body, headers, check=False)
+        if status == 409:
+            self._register()
+            status, reply = self._request("/detect", body, headers, check=False)
+        if status != 200:
+            raise RuntimeError(f"Сервер инференса ответил {status}: {reply.get('error')}")
+
+        # Имена классов переводятся в индексы словаря клиента, чужие классы отбрасываются
+        index = {cls: i for i, cls in enumerate(vocabulary)}
+        results = []
+        for frame, result in zip(frames, reply["results"]):
+            keep = [i for i, label in enumerate(result["labels"]) if label in index]
+            cls = np.array([index[result["labels"][i]] for i in keep], np.float32)
+            xyxy = np.array(result["xyxy"], np.float32).reshape(-1, 4)[keep]
+            conf = np.array(result["conf"], np.float32)[keep]
+            results.append(ArrayResult(ArrayBoxes(cls, xyxy, conf), tuple(frame.shape[:2])))
+        return results
+
+    def _encode(self, frames):
+        if self.transport == "jpeg":
+            chunks = []
+            for frame in frames:
+                ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    raise ValueError("Не удалось сжать кадр в JPEG")
+                chunks.append(data.tobytes())
+            return {"transport": "jpeg", "frames": [{"size": len(chunk)} for chunk in chunks]}, b"".join(chunks)
+        frames = [np.ascontiguousarray(frame, dtype=np.uint8) for frame in frames]
+        if self.transport == "raw":
+            meta = {"transport": "raw", "frames": [{"shape": list(frame.shape)} for frame in frames]}
+            return meta, b"".join(frame.tobytes() for frame in frames)
+
+        # Свой сегмент на поток: пока запрос в пути, другой поток его не перезапишет
+        size = sum(frame.nbytes for frame in frames)
+        segment = getattr(self._local, "segment", None)
+        replaced = None
+        if segment is None or segment.size < size:
+            replaced = segment
+            segment = shared_memory.SharedMemory(create=True, size=size * 2)
+            with self._segments_lock:
+                self._segments.append(segment)
+                if replaced is not None:
+                    # Прежний запрос этого потока закончен: старый сегмент больше не нужен
+                    self._segments.remove(replaced)
+            if replaced is not None:
+                replaced.close()
+                replaced.unlink()
+            self._local.segment = segment
+        infos = []
+        offset = 0
+        for frame in frames:
+            view = np.ndarray(frame.shape, np.uint8, buffer=segment.buf, offset=offset)
+            view[...] = frame
+            del view
+            infos.append({"shape": list(frame.shape), "offset": offset})
+            offset += frame.nbytes
+        meta = {"transport": "shm", "shm": segment.name, "frames": infos}
+        if replaced is not None:
+            meta["replaces"] = replaced.name
+        return meta, b""
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            parts = urlsplit(self.url)
+            if parts.scheme == "unix":
+                connection = _UnixConnection(parts.path, self.timeout)
+            else:
+                connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def _request(self, path, body, headers, check=True):
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("POST", path, body, headers)
+                response = connection.getresponse()
+                reply = json.loads(response.read() or b"{}")
+                break
+            except (OSError, http.client.HTTPException):
+                # Соединение закрыто сервером: одна попытка на новом соединении
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        if check and response.status != 200:
+            raise RuntimeError(f"Сервер инференса ответил {response.status}: {reply.get('error')}")
+        return response.status, reply
+
+    def close(self):
+        with self._segments_lock:
+            for segment in self._segments:
+                segment.close()
+                segment.unlink()
+            self._segments = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер инференса YOLO-World для тонких клиентов")
+    parser.add_argument("--model", required=True, help="путь к весам YOLO-World")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="слушать Unix-сокет вместо TCP")
+    parser.add_argument("--max-batch", type=int, default=16, help="кадров в пакете модели")
+    parser.add_argument("--max-wait-ms", type=float, default=10,
+                        help="сколько ждать кадров других клиентов после первого кадра пакета, мс")
+    parser.add_argument("--client-ttl", type=float, default=60,
+                        help="через сколько секунд без запросов словарь клиента исключается из модели")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--workers", type=int, default=1, help="процессов инференса на CPU (см. process_pool.py)")
+    parser.add_argument("--worker-threads", type=int, help="потоков PyTorch в каждом процессе пула")
+    args = parser.parse_args(argv)
+    if args.workers > 1 and args.backend != "torch":
+        parser.error("пул процессов (--workers) работает только с бэкендом torch")
+
+    from embeddings import TextEmbeddingCache
+    from startup import load_model
+
+    cache = TextEmbeddingCache(EMBEDDINGS_PATH)
+    model = load_model(args.model, MODELS_DIR, embedding_cache=cache, warmup=args.workers <= 1)
+    if args.workers > 1:
+        from process_pool import ProcessPoolBackend
+
+        backend = ProcessPoolBackend(model, args.workers, cache, args.worker_threads)
+    else:
+        backend = create_backend(model, args.backend, cache, EXPORTS_DIR)
+    server = InferenceServer(backend, args.max_batch, args.max_wait_ms / 1000, args.client_ttl)
+    address = args.unix or f"{args.host}:{args.port}"
+    print(f"Сервер инференса слушает {address}", file=sys.stderr)
+    try:
+        server.serve(args.port, args.host, args.unix)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
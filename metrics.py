@@ -0,0 +1,220 @@
+"""Метрики горячего пути мониторинга.
+
+Длительности стадий (чтение кадра, инференс, постобработка, обновление
+панели статуса, вывод кадра) копятся в гистограммах: накопительные
+корзины нужны для Prometheus, а кольцевое окно последних значений - для
+скользящих p50/p95/p99 в оверлее и JSON. Частота детектора считается по
+скользящему окну, число вытесненных кадров и прочие величины, которые
+уже хранит движок, снимаются функциями-датчиками в момент экспорта.
+
+Сбор выключается тем, что движку не передают объект Metrics: тогда в
+рабочих потоках остаётся одна проверка на None.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+PREFIX = "monitor"
+
+# Верхние границы корзин, секунды
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+STAGES = {
+    "frame_read": "Чтение кадра из источника",
+    "inference": "Вызов детектора на пакете кадров",
+    "postprocess": "Перевод результатов детектора в Detections",
+    "tracking": "Перенос и сопоставление треков",
+    "status_update": "Обновление панели статуса",
+    "display": "Подготовка кадра к выводу",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS, window=1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        # Последние window значений для скользящих перцентилей
+        self._window = np.zeros(window)
+        self._size = 0
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        # Граница корзины включительная, как le в Prometheus
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            self._window[self._position] = value
+            self._position = (self._position + 1) % len(self._window)
+            self._size = min(self._size + 1, len(self._window))
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        with self._lock:
+            values = self._window[:self._size].copy()
+        if not len(values):
+            return {q: None for q in quantiles}
+        return dict(zip(quantiles, np.percentile(values, quantiles).tolist()))
+
+
+class RateMeter:
+    """События в секунду за последние window секунд"""
+    def __init__(self, window=5.0):
+        self.window = window
+        self._events = deque()
+        self._start = None
+        self._lock = threading.Lock()
+
+    def add(self, count=1, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._start is None:
+                self._start = now
+            self._events.append((now, count))
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            if not self._events:
+                return 0.0
+            total = sum(count for _, count in self._events)
+            # Пока окно не заполнилось, делим на фактически прошедшее время
+            span = min(now - self._start, self.window)
+            return total / span if span > 0 else 0.0
+
+
+class Metrics:
+    def __init__(self, window=1024, rate_window=5.0):
+        self.histograms = {name: Histogram(window=window) for name in STAGES}
+        self.counters = {"frames_captured": 0, "frames_inferred": 0, "frames_reused": 0, "frames_tracked": 0}
+        self.detector_rate = RateMeter(rate_window)
+        # Имя -> (функция, тип Prometheus, описание)
+        self.probes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        self.histograms[name].observe(seconds)
+
+    def inc(self, name, count=1):
+        with self._lock:
+            self.counters[name] += count
+
+    def add_probe(self, name, func, kind="gauge", description=""):
+        self.probes[name] = (func, kind, description)
+
+    def detector_frames(self, count):
+        """Кадры, прошедшие через детектор за один пакет"""
+        self.inc("frames_inferred", count)
+        self.detector_rate.add(count)
+
+    def snapshot(self):
+        """Все метрики в виде словаря для JSON; длительности в миллисекундах"""
+        stages = {}
+        for name, histogram in self.histograms.items():
+            stages[name] = {
+                f"p{q}": None if value is None else round(value * 1000, 3)
+                for q, value in histogram.percentiles().items()
+            }
+            stages[name]["count"] = histogram.count
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "time": time.time(),
+            "stages_ms": stages,
+            "counters": counters,
+            "detector_fps": round(self.detector_rate.rate(), 2),
+            **{name: func() for name, (func, _, _) in self.probes.items()},
+        }
+
+    def overlay_lines(self):
+        """Короткая сводка для вывода поверх кадра"""
+        lines = [f"detector {self.detector_rate.rate():.1f} fps"]
+        for name, histogram in self.histograms.items():
+            p = histogram.percentiles((50, 95))
+            if p[50] is not None:
+                lines.append(f"{name} {p[50] * 1000:.1f}/{p[95] * 1000:.1f} ms")
+        for name, (func, _, _) in self.probes.items():
+            value = func()
+            lines.append(f"{name} {value:.2f}" if isinstance(value, float) else f"{name} {value}")
+        return lines
+
+    def prometheus(self):
+        """Текстовый формат экспозиции Prometheus"""
+        out = []
+        for name, histogram in self.histograms.items():
+            metric = f"{PREFIX}_{name}_seconds"
+            out.append(f"# HELP {metric} {STAGES[name]}")
+            out.append(f"# TYPE {metric} histogram")
+            with histogram._lock:
+                counts, total, count = list(histogram.counts), histogram.sum, histogram.count
+            cumulative = 0
+            for bound, bucket in zip(histogram.buckets, counts):
+                cumulative += bucket
+                out.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            out.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+            out.append(f"{metric}_sum {total}")
+            out.append(f"{metric}_count {count}")
+        with self._lock:
+            counters = dict(self.counters)
+        for name, value in counters.items():
+            out.append(f"# TYPE {PREFIX}_{name}_total counter")
+            out.append(f"{PREFIX}_{name}_total {value}")
+        out.append(f"# TYPE {PREFIX}_detector_fps gauge")
+        out.append(f"{PREFIX}_detector_fps {self.detector_rate.rate()}")
+        for name, (func, kind, description) in self.probes.items():
+            metric = f"{PREFIX}_{name}_total" if kind == "counter" else f"{PREFIX}_{name}"
+            if description:
+                out.append(f"# HELP {metric} {description}")
+            out.append(f"# TYPE {metric} {kind}")
+            out.append(f"{metric} {func()}")
+        return "\n".join(out) + "\n"
+
+    def write_textfile(self, path):
+        """Файл для textfile collector node_exporter; запись атомарная"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """HTTP-сервер в фоновом потоке: /metrics - Prometheus, /metrics.json - JSON"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot(), ensure_ascii=False), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
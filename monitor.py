@@ -0,0 +1,1114 @@
+"""Движок мониторинга отсутствия объектов без зависимости от PyQt5.
+
+Модуль содержит захват кадров, пакетный детектор и учёт времени
+отсутствия объектов для нескольких камер. Графическое приложение
+(app.py) подписывается на события движка, а при запуске как скрипт
+модуль работает без дисплея и пишет события отсутствия в формате
+JSON Lines:
+
+    python monitor.py --model LVIS.pt --source 0 --prompts cup keys --max-absence 30
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+from alerts import Alert, AlertDispatcher, JsonLinesSink, WebhookSink
+from backends import BACKENDS, create_backend
+from capture import CaptureSource, FramePool, parse_size
+from clips import ClipRecorder
+from detections import Detections
+from embeddings import TextEmbeddingCache
+from metrics import Metrics
+from motion import MotionGate
+from regions import in_zones, parse_zone, zone_mosaic
+from scheduler import AbsenceBudgetScheduler
+from tiling import TiledBackend, parse_region
+from timeline import TimelineStore
+from tracking import Tracker
+from vocabulary import Vocabulary, VocabularySwitcher
+
+# Каталог пользовательских данных: сохранённые камеры и кэш эмбеддингов
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".course_work")
+WATCHLIST_PATH = os.path.join(DATA_DIR, "watchlist.json")
+EMBEDDINGS_PATH = os.path.join(DATA_DIR, "text_embeddings.pt")
+EXPORTS_DIR = os.path.join(DATA_DIR, "exports")
+CLIPS_DIR = os.path.join(DATA_DIR, "clips")
+TIMELINE_PATH = os.path.join(DATA_DIR, "timeline.sqlite3")
+PROFILES_PATH = os.path.join(DATA_DIR, "profiles.json")
+MODELS_DIR = os.path.join(DATA_DIR, "models")
+ALERTS_PATH = os.path.join(DATA_DIR, "alerts.jsonl")
+
+
+def parse_source(text):
+    """Источник видео: число - индекс камеры, иначе путь к файлу, каталогу или URL потока"""
+    text = str(text).strip()
+    return int(text) if text.isdigit() else text
+
+
+def load_cameras(path):
+    """Загрузка сохранённых камер и их списков объектов (пустой список, если файла нет)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return []
+    # Старый формат: просто список объектов для единственной камеры
+    if isinstance(data, list):
+        data = {"cameras": [{"source": 0, "classes": data}]}
+    return [parse_camera(camera) for camera in data.get("cameras", [])]
+
+
+def parse_camera(camera):
+    return {
+        "source": camera.get("source", 0),
+        "classes": [cls for cls in camera.get("classes", []) if cls != "__placeholder__"],
+        "max_absence_time": camera.get("max_absence_time", 30),
+        "zones": {cls: [tuple(zone) for zone in zones] for cls, zones in camera.get("zones", {}).items()},
+    }
+
+
+def save_cameras(path, streams):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = {"cameras": [stream.to_dict() for stream in streams]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def load_profiles(path):
+    """Именованные профили: имя -> камеры в формате watchlist.json (пустой словарь, если файла нет)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {
+        name: [parse_camera(camera) for camera in profile.get("cameras", [])]
+        for name, profile in data.get("profiles", {}).items()
+    }
+
+
+def save_profile(path, name, streams):
+    """Сохранить списки объектов камер как профиль name"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data.setdefault("profiles", {})[name] = {"cameras": [stream.to_dict() for stream in streams]}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class FrameSlot:
+    """Слот «последний кадр побеждает»: новый кадр вытесняет ещё не забранный старый.
+
+    С пулом (см. FramePool в capture.py) слот держит кадр, пока его не
+    заберут; забравший отпускает кадр через pool.release.
+    """
+    def __init__(self, wakeup=None, pool=None):
+        self._cond = threading.Condition()
+        self._item = None
+        # Общее событие, по которому пакетный детектор узнаёт о новых кадрах
+        self._wakeup = wakeup
+        self.pool = pool
+        self.dropped = 0
+
+    def put(self, frame, timestamp):
+        # Возвращает True, если слот был пуст (потребитель ещё не уведомлён)
+        if self.pool is not None:
+            self.pool.retain(frame)
+        with self._cond:
+            was_empty = self._item is None
+            if not was_empty:
+                self.dropped += 1
+                self._release(self._item)
+            self._item = (frame, timestamp)
+            self._cond.notify()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return was_empty
+
+    def take(self, timeout=None):
+        with self._cond:
+            if self._item is None and timeout:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def clear(self):
+        with self._cond:
+            self._release(self._item)
+            self._item = None
+
+    def _release(self, item):
+        if item is not None and self.pool is not None:
+            self.pool.release(item[0])
+
+
+class CameraStream:
+    """Одна камера: источник, собственный список объектов и таймеры отсутствия"""
+    def __init__(self, source=0, classes=None, max_absence_time=30, wakeup=None, fps=None, zones=None, capture=None):
+        self.source = source
+        self.selected_classes = list(classes) if classes else ["__placeholder__"]
+
+        # Зоны объектов в долях кадра (см. regions.py); объект без зон ищется по всему кадру
+        self.zones = {
+            cls: list(value) for cls, value in (zones or {}).items() if cls in self.selected_classes and value
+        }
+
+        # Время, когда видели объект в последний раз
+        self.last_seen = {cls: 0 for cls in self.selected_classes}
+
+        # Максимальное время, которое может отсутствовать объект
+        self.max_absence_time = max_absence_time
+
+        # Затригеренные объекты
+        self.notified_objects = set()
+
+        # Частота воспроизведения для файлов и каталогов (None - частота из файла)
+        self.fps = fps
+        self.frame_interval = 0
+
+        # Настройки захвата (см. capture.py); буферы кадров и счётчики переживают перезапуск камеры
+        options = dict(capture or {})
+        self.frame_pool = FramePool(options.pop("pool_size", 6))
+        self.capture_options = options
+        self.capture_stats = {"drained": 0, "reconnects": 0}
+
+        # Время, раньше которого планировщик не запускает детектор для этой камеры
+        self.next_inference = 0.0
+
+        self.cap = None
+        self.capture_thread = None
+        self.inference_slot = FrameSlot(wakeup, self.frame_pool)
+        self.display_slot = FrameSlot(pool=self.frame_pool)
+
+        # Последние обнаружения для отрисовки поверх свежих кадров и время их кадра
+        self.last_detections = Detections.empty()
+        self.last_detections_time = 0.0
+        # Клип к последнему уведомлению (None - запись выключена или буфер пуст)
+        self.last_clip = None
+
+    @property
+    def name(self):
+        if isinstance(self.source, int):
+            return f"Камера {self.source}"
+        return os.path.basename(os.path.normpath(self.source)) or self.source
+
+    @property
+    def running(self):
+        return self.capture_thread is not None
+
+    def display_classes(self):
+        # Фильтруем заполнитель, который пользователи не видят в интерфейсе
+        return [cls for cls in self.selected_classes if cls != "__placeholder__"]
+
+    def add_class(self, cls):
+        # Если у нас был только класс-заполнитель, полностью заменяем его
+        if self.selected_classes == ["__placeholder__"]:
+            self.selected_classes = [cls]
+        else:
+            self.selected_classes.append(cls)
+        # Новый класс пока не обнаружен -> считаем отсутствующим
+        self.last_seen[cls] = 0
+
+    def set_classes(self, classes, zones=None):
+        """Новый список объектов; таймеры оставшихся объектов сохраняются"""
+        self.selected_classes = list(classes) if classes else ["__placeholder__"]
+        self.last_seen = {cls: self.last_seen.get(cls, 0) for cls in self.selected_classes}
+        self.notified_objects &= set(self.selected_classes)
+        self.zones = {
+            cls: list(value) for cls, value in (zones or {}).items() if cls in self.selected_classes and value
+        }
+
+    def remove_class(self, cls):
+        self.selected_classes.remove(cls)
+        self.last_seen.pop(cls, None)
+        self.zones.pop(cls, None)
+        # Добавляем заполнитель, если пользователь удалил все классы,
+        # чтобы предотвратить сбой YOLO с пустым массивом
+        if not self.selected_classes:
+            self.selected_classes = ["__placeholder__"]
+            self.last_seen["__placeholder__"] = 0
+
+    def open(self):
+        if self.cap is None or not self.cap.isOpened():
+            self.cap = CaptureSource(
+                self.source, self.fps, pool=self.frame_pool, stats=self.capture_stats, **self.capture_options
+            )
+            self.cap.open()
+            self.frame_interval = self.cap.frame_interval
+        return self.cap.isOpened()
+
+    def set_zones(self, cls, zones):
+        if zones:
+            self.zones[cls] = list(zones)
+        else:
+            self.zones.pop(cls, None)
+
+    def zone_mosaic(self, width, height):
+        """Мозаика из зон объектов для детектора (None - нужен весь кадр)"""
+        return zone_mosaic(self.zones, self.display_classes(), width, height)
+
+    def release(self):
+        if self.cap and self.cap.isOpened():
+            self.cap.release()
+        self.cap = None
+
+    def update_absence(self, detections, timestamp, now):
+        """Обновление таймеров по результатам детекции.
+
+        Возвращает время отсутствия каждого объекта (в целых секундах, не более
+        max_absence_time) и список объектов, впервые превысивших порог.
+        """
+        # Обновляем время обнаружения (момент захвата кадра, а не окончания инференса)
+        for class_name in detections.names():
+            if class_name in self.last_seen:
+                self.last_seen[class_name] = timestamp
+                # Объект вернулся: о следующем его отсутствии снова нужно уведомить
+                self.notified_objects.discard(class_name)
+
+        absence = {}
+        missing_objects = []
+        for cls in self.display_classes():
+            last_seen = self.last_seen.get(cls, 0)
+            absence_time = int(now - last_seen) if last_seen > 0 else 0
+            # Ограничиваем максимальным значением
+            absence_time = min(absence_time, self.max_absence_time)
+            absence[cls] = absence_time
+
+            # Проверяем, отсутствует ли объект максимальное время
+            if absence_time >= self.max_absence_time and cls not in self.notified_objects:
+                missing_objects.append(cls)
+                self.notified_objects.add(cls)
+        return absence, missing_objects
+
+    def reset_absence(self):
+        # Сбрасываем время последнего обнаружения и состояние уведомлений
+        for obj in self.selected_classes:
+            self.last_seen[obj] = 0
+        self.notified_objects = set()
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "classes": self.display_classes(),
+            "max_absence_time": self.max_absence_time,
+            "zones": {cls: [list(zone) for zone in zones] for cls, zones in self.zones.items()},
+        }
+
+
+class CaptureWorker(threading.Thread):
+    """Поток чтения кадров одной камеры.
+
+    Обрыв камеры или сетевого потока не останавливает её: источник
+    переоткрывается с удвоением паузы (см. capture.py), а on_reconnecting
+    сообщает о потере и восстановлении сигнала.
+    """
+    def __init__(self, stream, on_frame=None, on_failed=None, metrics=None, recorder=None, on_reconnecting=None):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.on_frame = on_frame
+        self.on_failed = on_failed
+        self.metrics = metrics
+        self.recorder = recorder
+        self.on_reconnecting = on_reconnecting
+        self.stop_event = threading.Event()
+
+    def run(self):
+        stream = self.stream
+        metrics = self.metrics
+        next_time = time.monotonic()
+        while not self.stop_event.is_set():
+            started = time.perf_counter()
+            ret, frame = stream.cap.read()
+            if metrics is not None and ret:
+                metrics.observe("frame_read", time.perf_counter() - started)
+                metrics.inc("frames_captured")
+            if not ret:
+                if self.reconnect():
+                    next_time = time.monotonic()
+                    continue
+                if not self.stop_event.is_set() and self.on_failed is not None:
+                    self.on_failed(stream)
+                return
+            now = time.time()
+            stream.inference_slot.put(frame, now)
+            if self.recorder is not None:
+                self.recorder.push(stream, frame, now, stream.frame_pool)
+            # Уведомляем, только если потребитель уже забрал предыдущий кадр,
+            # чтобы очередь событий не росла
+            if stream.display_slot.put(frame, now) and self.on_frame is not None:
+                self.on_frame(stream)
+
+            if stream.frame_interval:
+                next_time += stream.frame_interval
+                self.stop_event.wait(max(0.0, next_time - time.monotonic()))
+
+    def reconnect(self):
+        """Переподключение живого источника; False - источник закончился или поток остановлен"""
+        cap = self.stream.cap
+        if not getattr(cap, "live", False) or not cap.reconnect_max_delay:
+            return False
+        if self.on_reconnecting is not None:
+            self.on_reconnecting(self.stream, False)
+        if not cap.reconnect(self.stop_event):
+            return False
+        if self.on_reconnecting is not None:
+            self.on_reconnecting(self.stream, True)
+        return True
+
+
+class DetectorWorker:
+    """Поток детекции: собирает свежие кадры всех камер и прогоняет их одним пакетом.
+
+    Устаревшие кадры отбрасываются слотами, поэтому очередь не растёт.
+    Модель работает с объединённым словарём всех камер, а результаты
+    фильтруются по списку объектов каждой камеры. Если у всех объектов
+    камеры заданы зоны, вместо кадра в пакет идёт мозаика из вырезок
+    вокруг зон (см. regions.py), а обнаружения вне зоны своего объекта
+    отбрасываются. С трекером (см.
+    tracking.py) на промежуточных кадрах детектор не запускается:
+    обнаружения переносятся с прошлых кадров оптическим потоком.
+
+    Новый словарь (см. vocabulary.py) передаётся готовым через switch и
+    вступает в силу между пакетами: пакет целиком обрабатывается одним
+    словарём, который и попадает в его Detections. До первого словаря
+    детектор кадры не обрабатывает.
+
+    Если бэкенд обрабатывает несколько пакетов одновременно (concurrency,
+    см. process_pool.py), детектор запускает столько же потоков: каждый
+    забирает свежие кадры, пока остальные ждут результатов. Словарь
+    меняется, только когда ни один пакет не в работе.
+    """
+    def __init__(self, backend, on_results, scheduler=None, motion_gate=None, metrics=None, tracker=None):
+        self.backend = backend
+        self.on_results = on_results
+        self.scheduler = scheduler
+        self.motion_gate = motion_gate
+        self.metrics = metrics
+        self.tracker = tracker
+        # Блокировка защищает модель от смены классов посреди инференса
+        self.lock = threading.Condition()
+        self.classes = Vocabulary()
+        self._pending = None
+        # Пока первый словарь не применён, кадры не отдаются модели
+        self._applied = False
+        # Пакеты в работе и признак смены словаря, которая ждёт их завершения
+        self._inflight = 0
+        self._applying = False
+        self._apply_lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self.streams = ()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.threads = []
+        # Когда последний раз сообщали об ошибке бэкенда
+        self._error_reported = 0.0
+
+    def switch(self, prepared):
+        """Подготовленный словарь применяется перед следующим пакетом"""
+        self._pending = prepared
+        if self.is_running():
+            self.wakeup.set()
+        else:
+            self._apply_pending()
+
+    def _apply_pending(self):
+        # Забираем и применяем под одной блокировкой: более старый словарь не перепишет новый
+        with self._apply_lock, self.lock:
+            prepared, self._pending = self._pending, None
+            if prepared is None:
+                return
+            # Новые пакеты ждут, пока идущие закончатся на старом словаре
+            self._applying = True
+            self.lock.wait_for(lambda: self._inflight == 0)
+            try:
+                self.backend.apply(prepared)
+                self.classes = prepared.vocabulary
+                self._applied = True
+            finally:
+                self._applying = False
+                self.lock.notify_all()
+
+    def _infer(self, images):
+        """Инференс пакета; возвращает словарь, с которым он выполнен, и результаты"""
+        with self.lock:
+            self.lock.wait_for(lambda: not self._applying)
+            self._inflight += 1
+            classes = self.classes
+        try:
+            return classes, self.backend(images)
+        finally:
+            with self.lock:
+                self._inflight -= 1
+                self.lock.notify_all()
+
+    def _report_error(self, error):
+        # Не чаще раза в 10 секунд, чтобы не засыпать вывод при долгом сбое
+        now = time.monotonic()
+        if now - self._error_reported >= 10:
+            self._error_reported = now
+            print(f"Ошибка инференса, кадры пропускаются: {type(error).__name__}: {error}", file=sys.stderr)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def start(self):
+        if self.is_running():
+            return
+        self.stop_event.clear()
+        self.threads = [
+            threading.Thread(target=self.run, daemon=True)
+            for _ in range(self.backend.concurrency)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self.threads = []
+
+    def collect_batch(self):
+        """Свежие кадры для детектора, кадры статичных сцен и кадры, где обнаружения перенёс трекер"""
+        batch = []
+        reused = []
+        tracked = []
+        now = time.time()
+        for stream in self.streams:
+            # Камеры, которым детектор пока не нужен, пропускаем: их кадры вытеснятся свежими
+            if self.scheduler is not None and not self.scheduler.due(stream, now):
+                continue
+            item = stream.inference_slot.take()
+            if item is None:
+                continue
+            frame, timestamp = item
+            if self.motion_gate is not None and self.motion_gate.is_static(stream, frame, timestamp):
+                stream.frame_pool.release(frame)
+                reused.append((stream, timestamp))
+                continue
+            if self.tracker is not None:
+                started = time.perf_counter()
+                found = self.tracker.propagate(stream, frame, timestamp)
+                if self.metrics is not None:
+                    self.metrics.observe("tracking", time.perf_counter() - started)
+                if found is not None:
+                    h, w = frame.shape[:2]
+                    stream.frame_pool.release(frame)
+                    tracked.append((stream, in_zones(found, stream.zones, w, h), timestamp))
+                    continue
+            # Кадры пакета отпускает run, когда обработка пакета закончена
+            batch.append((stream, frame, timestamp))
+        return batch, reused, tracked
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if not self.wakeup.wait(0.1):
+                continue
+            with self._collect_lock:
+                self.wakeup.clear()
+                if self._pending is not None:
+                    self._apply_pending()
+                # Словарь готовится в фоне (см. VocabularySwitcher.request): switch разбудит детектор
+                if not self._applied:
+                    continue
+                batch, reused, tracked = self.collect_batch()
+            metrics = self.metrics
+            if metrics is not None and reused:
+                metrics.inc("frames_reused", len(reused))
+            if metrics is not None and tracked:
+                metrics.inc("frames_tracked", len(tracked))
+            # Сцена не изменилась: прошлые обнаружения подтверждают присутствие на новом кадре
+            for stream, timestamp in reused:
+                self.on_results(stream, stream.last_detections, timestamp)
+            for stream, found, timestamp in tracked:
+                self.on_results(stream, found, timestamp)
+            if not batch:
+                continue
+            try:
+                self._detect(batch)
+            finally:
+                # Буферы кадров возвращаются в пул захвата (см. FramePool в capture.py)
+                for stream, frame, _ in batch:
+                    stream.frame_pool.release(frame)
+
+    def _detect(self, batch):
+        """Инференс пакета, постобработка и передача обнаружений в on_results"""
+        metrics = self.metrics
+        # Камеры с зонами у всех объектов отдают детектору только мозаику из зон
+        mosaics = [stream.zone_mosaic(frame.shape[1], frame.shape[0]) for stream, frame, _ in batch]
+        images = [
+            frame if mosaic is None else mosaic.compose(frame)
+            for (_, frame, _), mosaic in zip(batch, mosaics)
+        ]
+
+        started = time.perf_counter()
+        try:
+            classes, results = self._infer(images)
+        except Exception as e:
+            # Сбой бэкенда (например, сервер инференса недоступен) не останавливает детектор:
+            # кадры пропускаются, а таймеры отсутствия не растут без результатов
+            self._report_error(e)
+            self.stop_event.wait(0.5)
+            return
+        if metrics is not None:
+            metrics.observe("inference", time.perf_counter() - started)
+            metrics.detector_frames(len(batch))
+
+        # Переводим результаты в массивы NumPy прямо в рабочем потоке
+        started = time.perf_counter()
+        detections = []
+        for (stream, frame, _), mosaic, result in zip(batch, mosaics, results):
+            found = Detections.from_result(result, classes, set(stream.selected_classes))
+            if mosaic is not None:
+                found = mosaic.to_frame(found)
+            h, w = frame.shape[:2]
+            detections.append(in_zones(found, stream.zones, w, h))
+        if metrics is not None:
+            metrics.observe("postprocess", time.perf_counter() - started)
+        if self.tracker is not None:
+            started = time.perf_counter()
+            detections = [
+                self.tracker.update(stream, frame, found)
+                for (stream, frame, _), found in zip(batch, detections)
+            ]
+            if metrics is not None:
+                metrics.observe("tracking", time.perf_counter() - started)
+        for (stream, _, timestamp), found in zip(batch, detections):
+            self.on_results(stream, found, timestamp)
+
+
+class MonitorEngine:
+    """Камеры, общий детектор и учёт отсутствия объектов.
+
+    Обработчики событий вызываются из рабочих потоков:
+    on_frame(stream) - в слоте отображения появился свежий кадр;
+    on_status(stream, absence) - обновлены таймеры отсутствия;
+    on_absence(stream, missing_objects) - объекты отсутствуют дольше порога;
+    on_stream_stopped(stream) - источник закончился или перестал отдавать кадры;
+    on_reconnecting(stream, connected) - камера или сетевой поток потеряли
+    сигнал (connected=False) и переподключились (True).
+
+    Если передан планировщик, детектор запускается не на каждом кадре,
+    а по мере расходования бюджета отсутствия (см. scheduler.py).
+    Фильтр движения (см. motion.py) пропускает детектор на статичных сценах.
+    Модель скрыта за бэкендом инференса (см. backends.py).
+    Если передан объект Metrics (см. metrics.py), рабочие потоки замеряют
+    стадии конвейера. С ClipRecorder (см. clips.py) последние секунды
+    каждой камеры держатся в памяти и при уведомлении записываются в клип,
+    путь к которому сохраняется в stream.last_clip. TimelineStore (см.
+    timeline.py) получает обнаружения и уведомления для журнала на диске.
+    AlertDispatcher (см. alerts.py) доставляет уведомления в фоне, не
+    останавливая камеры.
+    Tracker (см. tracking.py) заменяет детектор на промежуточных кадрах
+    и сглаживает единичные пропуски обнаружений.
+    capture_options - настройки захвата новых камер (разрешение, FOURCC,
+    очередь драйвера, переподключение; см. capture.py).
+
+    Словарь модели готовится в фоне (см. vocabulary.py): после изменения
+    списков объектов детектор продолжает работу со старым словарём и
+    переключается на новый между кадрами, когда тот готов.
+    """
+    def __init__(self, backend, scheduler=None, motion_gate=None, metrics=None, recorder=None, timeline=None,
+                 tracker=None, alerts=None):
+        self.backend = backend
+        self.scheduler = scheduler
+        self.motion_gate = motion_gate
+        self.metrics = metrics
+        self.recorder = recorder
+        self.timeline = timeline
+        self.tracker = tracker
+        self.alerts = alerts
+        self.detector = DetectorWorker(backend, self._handle_results, scheduler, motion_gate, metrics, tracker)
+        self.vocabulary = VocabularySwitcher(backend, self.detector.switch)
+        self.streams = []
+        self.capture_options = {}
+        self.lock = threading.RLock()
+        if metrics is not None:
+            self._add_probes(metrics)
+
+        self.on_frame = None
+        self.on_status = None
+        self.on_absence = None
+        self.on_stream_stopped = None
+        self.on_reconnecting = None
+
+    def add_stream(self, source=0, classes=None, max_absence_time=30, fps=None, zones=None):
+        stream = CameraStream(
+            source, classes, max_absence_time, self.detector.wakeup, fps, zones, self.capture_options
+        )
+        with self.lock:
+            self.streams.append(stream)
+        return stream
+
+    def remove_stream(self, stream):
+        self.stop_stream(stream)
+        with self.lock:
+            self.streams.remove(stream)
+        self.update_vocabulary()
+
+    def add_class(self, stream, cls):
+        with self.lock:
+            stream.add_class(cls)
+        self.update_vocabulary()
+        self.wake(stream)
+
+    def remove_class(self, stream, cls):
+        with self.lock:
+            stream.remove_class(cls)
+        self.update_vocabulary()
+        self.wake(stream)
+
+    def set_zones(self, stream, cls, zones):
+        with self.lock:
+            stream.set_zones(cls, zones)
+        self.wake(stream)
+
+    def set_max_absence_time(self, stream, value):
+        with self.lock:
+            stream.max_absence_time = value
+            # Сбрасываем состояние уведомлений при изменении максимального времени
+            stream.notified_objects = set()
+        self.wake(stream)
+
+    def wake(self, stream):
+        # Новое состояние камеры нужно проверить детектором на ближайшем кадре
+        if self.scheduler is not None:
+            self.scheduler.wake(stream)
+        if self.motion_gate is not None:
+            self.motion_gate.reset(stream)
+        if self.tracker is not None:
+            self.tracker.reset(stream)
+
+    @staticmethod
+    def vocabulary_for(class_lists):
+        """Модель работает с объединением списков объектов всех камер.
+
+        Порядок не зависит от порядка камер, чтобы один и тот же набор
+        объектов давал один и тот же словарь и попадал в кэш подготовленных.
+        """
+        vocabulary = sorted({cls for classes in class_lists for cls in classes if cls != "__placeholder__"})
+        # Предотвращаем сбой YOLO с пустым массивом
+        return vocabulary or ["__placeholder__"]
+
+    def update_vocabulary(self, wait=False):
+        """Переключить детектор на словарь текущих камер; wait - подготовить его в этом потоке"""
+        vocabulary = tuple(self.vocabulary_for(stream.selected_classes for stream in self.streams))
+        if wait:
+            self.vocabulary.target = vocabulary
+            self.detector.switch(self.vocabulary.prepare(vocabulary))
+        elif vocabulary != self.vocabulary.target:
+            self.vocabulary.request(vocabulary)
+
+    def profile_classes(self, cameras):
+        """Списки объектов камер после применения профиля: камеры сопоставляются по источнику"""
+        profile = {str(camera["source"]): camera for camera in cameras}
+        return [
+            profile[str(stream.source)]["classes"] if str(stream.source) in profile else stream.selected_classes
+            for stream in self.streams
+        ]
+
+    def prefetch_profile(self, cameras):
+        """Подготовить словарь профиля в фоне, чтобы переключение на него было мгновенным"""
+        self.vocabulary.prefetch(self.vocabulary_for(self.profile_classes(cameras)))
+
+    def apply_profile(self, cameras):
+        """Списки объектов, зоны и пороги камер из профиля; камеры не из профиля не меняются"""
+        profile = {str(camera["source"]): camera for camera in cameras}
+        with self.lock:
+            for stream in self.streams:
+                camera = profile.get(str(stream.source))
+                if camera is None:
+                    continue
+                stream.set_classes(camera["classes"], camera.get("zones"))
+                stream.max_absence_time = camera.get("max_absence_time", stream.max_absence_time)
+        self.update_vocabulary()
+        for stream in self.streams:
+            self.wake(stream)
+
+    def start_stream(self, stream):
+        """Запуск захвата; возвращает False, если источник не открылся"""
+        if stream.running:
+            return True
+        if not stream.open():
+            return False
+        stream.inference_slot.clear()
+        stream.display_slot.clear()
+        stream.last_detections = Detections.empty()
+        stream.last_detections_time = 0.0
+        # Сбрасываем состояние уведомлений при запуске камеры
+        stream.notified_objects = set()
+        if self.timeline is not None:
+            self.timeline.start_session(str(stream.source), stream.last_seen)
+        self.wake(stream)
+
+        if self.recorder is not None:
+            # Кадры прошлого запуска в клип не попадают
+            self.recorder.clear(stream)
+        stream.capture_thread = CaptureWorker(
+            stream, self._emit_frame, self._handle_failed, self.metrics, self.recorder, self._handle_reconnecting
+        )
+        stream.capture_thread.start()
+        self._update_running()
+        return True
+
+    def stop_stream(self, stream):
+        worker = stream.capture_thread
+        if worker is None:
+            return
+        stream.capture_thread = None
+        worker.stop_event.set()
+        if worker is not threading.current_thread():
+            worker.join()
+        stream.release()
+        stream.inference_slot.clear()
+        stream.display_slot.clear()
+        self._update_running()
+
+    def stop(self):
+        for stream in list(self.streams):
+            self.stop_stream(stream)
+        self.detector.stop()
+        self.vocabulary.close()
+        self.backend.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.timeline is not None:
+            self.timeline.close()
+        if self.alerts is not None:
+            self.alerts.close()
+
+    def running_streams(self):
+        return [stream for stream in self.streams if stream.running]
+
+    def restore_last_seen(self, stream):
+        """Таймеры отсутствия из журнала: объекты считаются отсутствующими с момента последнего обнаружения"""
+        if self.timeline is None:
+            return
+        restored = self.timeline.restore_last_seen(str(stream.source), stream.display_classes())
+        with self.lock:
+            for cls, timestamp in restored.items():
+                if cls in stream.last_seen:
+                    stream.last_seen[cls] = timestamp
+
+    def _add_probes(self, metrics):
+        # Величины, которые движок и так хранит, снимаются только при экспорте
+        metrics.add_probe(
+            "frames_dropped", lambda: sum(stream.inference_slot.dropped for stream in self.streams),
+            "counter", "Кадры, вытесненные более свежими до детектора")
+        metrics.add_probe(
+            "display_dropped", lambda: sum(stream.display_slot.dropped for stream in self.streams),
+            "counter", "Кадры, вытесненные более свежими до вывода на экран")
+        metrics.add_probe("streams_running", lambda: len(self.running_streams()), "gauge", "Работающие камеры")
+        metrics.add_probe(
+            "frames_drained", lambda: sum(stream.capture_stats["drained"] for stream in self.streams),
+            "counter", "Устаревшие кадры из очереди драйвера, пропущенные без декодирования")
+        metrics.add_probe(
+            "capture_reconnects", lambda: sum(stream.capture_stats["reconnects"] for stream in self.streams),
+            "counter", "Попытки переподключения камер и сетевых потоков")
+        metrics.add_probe(
+            "frame_buffers_allocated", lambda: sum(stream.frame_pool.allocated for stream in self.streams),
+            "counter", "Кадры, прочитанные в новый массив, а не в буфер пула")
+        metrics.add_probe(
+            "vocabulary_version", lambda: self.detector.classes.version, "gauge", "Версия словаря модели в детекторе")
+        if self.motion_gate is not None:
+            metrics.add_probe(
+                "motion_skip_ratio", lambda: round(self.motion_gate.skip_ratio, 4),
+                "gauge", "Доля статичных кадров без детектора")
+        if self.alerts is not None:
+            metrics.add_probe(
+                "alerts_delivered", lambda: self.alerts.stats["delivered"], "counter", "Доставленные уведомления")
+            metrics.add_probe(
+                "alerts_failed", lambda: self.alerts.stats["failed"], "counter",
+                "Уведомления, не доставленные после всех повторов")
+            metrics.add_probe(
+                "alerts_coalesced", lambda: self.alerts.stats["coalesced"], "counter",
+                "Уведомления, объединённые с ещё не отправленными")
+            metrics.add_probe("alerts_pending", self.alerts.pending, "gauge", "Уведомления, ждущие отправки")
+        if self.tracker is not None:
+            metrics.add_probe(
+                "tracked_ratio", lambda: round(self.tracker.propagated_ratio, 4),
+                "gauge", "Доля кадров, обнаружения на которых перенёс трекер")
+
+    def _update_running(self):
+        self.detector.streams = tuple(self.running_streams())
+        if self.detector.streams:
+            self.detector.start()
+        else:
+            self.detector.stop()
+
+    def _emit_frame(self, stream):
+        if self.on_frame is not None:
+            self.on_frame(stream)
+
+    def _handle_reconnecting(self, stream, connected):
+        if connected:
+            # Кадр после переподключения сравнивать не с чем: его проверяет детектор
+            self.wake(stream)
+        else:
+            stream.display_slot.clear()
+        if self.on_reconnecting is not None:
+            self.on_reconnecting(stream, connected)
+
+    def _handle_failed(self, stream):
+        self.stop_stream(stream)
+        if self.on_stream_stopped is not None:
+            self.on_stream_stopped(stream)
+
+    def _handle_results(self, stream, detections, timestamp):
+        if not stream.running:
+            # Результат пришёл после остановки камеры
+            return
+        with self.lock:
+            if timestamp < stream.last_detections_time:
+                # Несколько потоков детектора: результат более старого кадра пришёл позже нового
+                return
+            stream.last_detections = detections
+            stream.last_detections_time = timestamp
+            now = time.time()
+            absence, missing_objects = stream.update_absence(detections, timestamp, now)
+            if self.timeline is not None:
+                seen = [cls for cls in detections.names() if cls in stream.last_seen and cls != "__placeholder__"]
+                self.timeline.record(str(stream.source), seen, timestamp, stream.max_absence_time)
+                if missing_objects:
+                    self.timeline.record_alert(str(stream.source), missing_objects, now)
+            if self.scheduler is not None:
+                self.scheduler.schedule(stream, now)
+            if not stream.display_classes():
+                return
+            if missing_objects and self.recorder is not None:
+                # Сжатые кадры уходят потоку записи, детектор не ждёт диска
+                stream.last_clip = self.recorder.save_clip(stream)
+            alert = None
+            if missing_objects and self.alerts is not None:
+                alert = Alert(stream.name, stream.source, missing_objects, stream.max_absence_time, stream.last_clip, now)
+
+        if alert is not None:
+            # Диспетчер только ставит уведомление в очередь, детектор не ждёт доставки
+            self.alerts.submit(alert)
+        if self.on_status is not None:
+            self.on_status(stream, absence)
+        if missing_objects and self.on_absence is not None:
+            self.on_absence(stream, missing_objects)
+
+
+def read_prompts(args):
+    prompts = list(args.prompts or [])
+    if args.prompts_file:
+        with open(args.prompts_file, encoding="utf-8") as f:
+            prompts += [line.strip() for line in f if line.strip()]
+    # Убираем повторы, сохраняя порядок
+    return list(dict.fromkeys(prompts))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Мониторинг отсутствия объектов без графического интерфейса")
+    parser.add_argument("--model", help="путь к весам YOLO-World")
+    parser.add_argument("--server", metavar="URL",
+                        help="сервер инференса вместо локальной модели: http://host:port или unix:///path.sock")
+    parser.add_argument("--frame-transport", choices=("jpeg", "raw", "shm"), default="jpeg",
+                        help="как передавать кадры серверу инференса (shm - только на той же машине)")
+    parser.add_argument("--source", action="append",
+                        help="индекс камеры, видеофайл или каталог изображений (можно указать несколько раз)")
+    parser.add_argument("--prompts", nargs="+", help="объекты для отслеживания")
+    parser.add_argument("--prompts-file", help="файл с объектами, по одному на строку")
+    parser.add_argument("--profile", help="взять камеры, объекты и зоны из сохранённого профиля")
+    parser.add_argument("--profiles-file", default=PROFILES_PATH, help="файл профилей")
+    parser.add_argument("--max-absence", type=int, default=30, help="порог отсутствия, сек")
+    parser.add_argument("--zone", action="append", type=parse_zone, default=[], metavar="PROMPT=X1,Y1,X2,Y2",
+                        help="зона объекта в долях кадра: детектор смотрит только в зоны (можно указать несколько раз)")
+    parser.add_argument("--fps", type=float,
+                        help="частота кадров: воспроизведения каталогов и видеофайлов, запрашиваемая у камер")
+    parser.add_argument("--capture-size", type=parse_size, metavar="WxH", help="разрешение, запрашиваемое у камер")
+    parser.add_argument("--capture-fourcc", metavar="FOURCC", help="формат кадров камер, например MJPG")
+    parser.add_argument("--capture-buffer", type=int, default=1,
+                        help="кадров в очереди драйвера камеры (0 - не менять)")
+    parser.add_argument("--reconnect-max-delay", type=float, default=30.0,
+                        help="предельная пауза между попытками переподключения камер и потоков, сек (0 - не переподключать)")
+    parser.add_argument("--output", help="файл для событий JSON Lines (по умолчанию stdout)")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch",
+                        help="бэкенд инференса: onnx и openvino экспортируют модель с зашитым списком объектов, "
+                             "onnx-int8 - квантованную по кадрам калибровки (см. quantize.py)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="процессов инференса на CPU: кадры передаются через разделяемую память (1 - без пула)")
+    parser.add_argument("--worker-threads", type=int,
+                        help="потоков PyTorch в каждом процессе пула (по умолчанию ядра делятся поровну)")
+    parser.add_argument("--tile-size", type=int, default=0,
+                        help="резать кадры больше этого размера на тайлы для поиска мелких объектов (0 - не резать)")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="перекрытие соседних тайлов, доля тайла")
+    parser.add_argument("--tile-roi", action="append", type=parse_region, metavar="X1,Y1,X2,Y2",
+                        help="резать на тайлы только эту область кадра, в долях (можно указать несколько раз)")
+    parser.add_argument("--no-full-frame", action="store_true",
+                        help="в тайловом режиме не прогонять дополнительно весь кадр целиком")
+    parser.add_argument("--idle-interval", type=float, default=1.0,
+                        help="интервал запусков детектора, пока все объекты подтверждены недавно, сек")
+    parser.add_argument("--every-frame", action="store_true", help="запускать детектор на каждом кадре")
+    parser.add_argument("--motion-threshold", type=float, default=0.002,
+                        help="доля изменившихся пикселей, ниже которой кадр считается статичным")
+    parser.add_argument("--no-motion-gate", action="store_true", help="запускать детектор и на статичных сценах")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="запускать детектор на каждом K-м кадре, между ними вести объекты трекером (1 - без трекера)")
+    parser.add_argument("--track-max-misses", type=int, default=2,
+                        help="сколько запусков детектора подряд объект может не находиться, оставаясь на месте")
+    parser.add_argument("--no-embeddings-cache", action="store_true", help="не использовать кэш эмбеддингов на диске")
+    parser.add_argument("--no-model-cache", action="store_true", help="не сохранять слитую модель для быстрого запуска")
+    parser.add_argument("--metrics-textfile", help="файл метрик Prometheus для textfile collector node_exporter")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="период записи файла метрик, сек")
+    parser.add_argument("--metrics-port", type=int, help="порт HTTP с /metrics и /metrics.json")
+    parser.add_argument("--clip-seconds", type=float, default=0,
+                        help="сколько секунд до уведомления сохранять в клип (0 - не записывать)")
+    parser.add_argument("--clip-budget-mb", type=float, default=64, help="память под буфер клипа на камеру, МБ")
+    parser.add_argument("--clip-fps", type=float, default=10, help="частота кадров в буфере клипа")
+    parser.add_argument("--clip-dir", default=CLIPS_DIR, help="каталог для клипов")
+    parser.add_argument("--timeline", default=TIMELINE_PATH, help="журнал обнаружений SQLite")
+    parser.add_argument("--no-timeline", action="store_true", help="не вести журнал обнаружений")
+    parser.add_argument("--restore-last-seen", action="store_true",
+                        help="продолжить таймеры отсутствия с последних обнаружений из журнала")
+    parser.add_argument("--webhook", action="append", default=[], metavar="URL",
+                        help="отправлять уведомления POST-запросом JSON (можно указать несколько раз)")
+    parser.add_argument("--alert-coalesce", type=float, default=1.0,
+                        help="уведомления камеры за это время объединяются в одно, сек")
+    parser.add_argument("--alert-interval", type=float, default=10.0,
+                        help="не чаще одного уведомления по камере за это время, сек")
+    parser.add_argument("--alert-retries", type=int, default=3, help="повторов неудачной отправки уведомления")
+    args = parser.parse_args(argv)
+
+    if not args.model and not args.server:
+        parser.error("нужно указать веса через --model или сервер инференса через --server")
+    if args.workers > 1 and args.backend != "torch":
+        parser.error("пул процессов (--workers) работает только с бэкендом torch")
+    cameras = []
+    if args.profile:
+        cameras = load_profiles(args.profiles_file).get(args.profile)
+        if cameras is None:
+            parser.error(f"профиль не найден в {args.profiles_file}: {args.profile}")
+    elif not args.source:
+        parser.error("нужно указать хотя бы одну камеру через --source или профиль через --profile")
+    prompts = read_prompts(args)
+    if not prompts and not args.profile:
+        parser.error("нужно указать хотя бы один объект через --prompts или --prompts-file")
+
+    scheduler = None if args.every_frame else AbsenceBudgetScheduler(args.idle_interval)
+    motion_gate = None if args.no_motion_gate else MotionGate(changed_fraction=args.motion_threshold)
+    if args.server:
+        # Модель загружена на сервере инференса (см. inference_server.py), здесь только клиент
+        from inference_server import RemoteBackend
+
+        backend = RemoteBackend(args.server, args.frame_transport)
+    else:
+        from startup import load_model
+
+        cache = None if args.no_embeddings_cache else TextEmbeddingCache(EMBEDDINGS_PATH)
+        # Прогрев собирает предиктор до первого кадра; пул процессов создаётся до первого инференса
+        classes = prompts or [cls for camera in cameras for cls in camera["classes"]]
+        model = load_model(
+            args.model, None if args.no_model_cache else MODELS_DIR, classes, cache, warmup=args.workers <= 1
+        )
+        if args.workers > 1:
+            # Процессы пула создаются до первого инференса, пока модель только загружена
+            from process_pool import ProcessPoolBackend
+
+            backend = ProcessPoolBackend(model, args.workers, cache, args.worker_threads)
+        else:
+            backend = create_backend(model, args.backend, cache, EXPORTS_DIR)
+    if args.tile_size > 0:
+        backend = TiledBackend(backend, args.tile_size, args.tile_overlap, not args.no_full_frame, args.tile_roi)
+    # Метрики собираются, только если их есть куда выводить
+    metrics = Metrics() if args.metrics_textfile or args.metrics_port else None
+    recorder = None
+    if args.clip_seconds > 0:
+        recorder = ClipRecorder(args.clip_dir, args.clip_seconds, args.clip_budget_mb, args.clip_fps)
+    timeline = None if args.no_timeline else TimelineStore(args.timeline)
+    tracker = Tracker(args.detect_every, args.track_max_misses) if args.detect_every > 1 else None
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    output_lock = threading.Lock()
+    # События отсутствия пишутся тем же потоком, что и остальные события, но из потока доставки
+    sinks = [JsonLinesSink(output, output_lock)] + [WebhookSink(url) for url in args.webhook]
+    alerts = AlertDispatcher(sinks, args.alert_coalesce, args.alert_interval, args.alert_retries)
+    engine = MonitorEngine(backend, scheduler, motion_gate, metrics, recorder, timeline, tracker, alerts)
+    engine.capture_options = {
+        "size": args.capture_size,
+        "fourcc": args.capture_fourcc,
+        "buffer_size": args.capture_buffer,
+        "reconnect_max_delay": args.reconnect_max_delay,
+    }
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+    zones = {}
+    for prompt, zone in args.zone:
+        if prompt not in prompts:
+            parser.error(f"зона задана для объекта, которого нет в списке: {prompt}")
+        zones.setdefault(prompt, []).append(zone)
+    for camera in cameras:
+        engine.add_stream(**camera, fps=args.fps)
+    for source in args.source or []:
+        engine.add_stream(parse_source(source), prompts, args.max_absence, fps=args.fps, zones=zones)
+    engine.update_vocabulary(wait=True)
+    if args.restore_last_seen:
+        for stream in engine.streams:
+            engine.restore_last_seen(stream)
+
+    stopped = threading.Event()
+
+    def emit(event):
+        with output_lock:
+            output.write(json.dumps(event, ensure_ascii=False) + "\n")
+            output.flush()
+
+    def on_stream_stopped(stream):
+        emit({"event": "stream_stopped", "time": time.time(), "stream": stream.name, "source": stream.source})
+        if not engine.running_streams():
+            stopped.set()
+
+    def on_reconnecting(stream, connected):
+        event = "stream_reconnected" if connected else "stream_disconnected"
+        emit({"event": event, "time": time.time(), "stream": stream.name, "source": stream.source})
+
+    engine.on_stream_stopped = on_stream_stopped
+    engine.on_reconnecting = on_reconnecting
+
+    for stream in engine.streams:
+        if not engine.start_stream(stream):
+            print(f"Не удалось открыть источник: {stream.source}", file=sys.stderr)
+    if not engine.running_streams():
+        return 1
+
+    next_metrics = time.monotonic()
+    try:
+        while not stopped.wait(0.5):
+            if args.metrics_textfile and time.monotonic() >= next_metrics:
+                metrics.write_textfile(args.metrics_textfile)
+                next_metrics = time.monotonic() + args.metrics_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        stats = {"event": "stats", "time": time.time()}
+        if motion_gate is not None:
+            stats["motion_skip_ratio"] = round(motion_gate.skip_ratio, 4)
+        if tracker is not None:
+            stats["tracked_ratio"] = round(tracker.propagated_ratio, 4)
+        if metrics is not None:
+            stats["metrics"] = metrics.snapshot()
+            if args.metrics_textfile:
+                metrics.write_textfile(args.metrics_textfile)
+        if alerts.stats["submitted"]:
+            stats["alerts"] = dict(alerts.stats)
+        if len(stats) > 2:
+            emit(stats)
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
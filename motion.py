@@ -0,0 +1,61 @@
+"""Пропуск детектора на статичных кадрах.
+
+Перед запуском модели кадр уменьшается, переводится в оттенки серого и
+сравнивается с последним кадром, прошедшим через детектор. Если доля
+изменившихся пикселей меньше порога, сцена считается неизменной:
+детектор не запускается, а предыдущие обнаружения переиспользуются
+с меткой времени нового кадра.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, pixel_threshold=12, changed_fraction=0.002, size=(64, 48), max_skip_time=10.0):
+        # Разница яркости, начиная с которой пиксель считается изменившимся
+        self.pixel_threshold = pixel_threshold
+        # Доля изменившихся пикселей, начиная с которой кадр считается новым
+        self.changed_fraction = changed_fraction
+        self.size = size
+        # Раз в столько секунд детектор запускается даже на статичной сцене
+        self.max_skip_time = max_skip_time
+
+        self._references = {}
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        # Размытие подавляет шум матрицы, чтобы он не считался движением
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def is_static(self, stream, frame, timestamp):
+        """True, если кадр не отличается от последнего прогнанного через детектор"""
+        thumbnail = self._thumbnail(frame)
+        with self._lock:
+            self.checked += 1
+            reference = self._references.get(stream)
+            static = False
+            if reference is not None and timestamp - reference[1] < self.max_skip_time:
+                diff = cv2.absdiff(thumbnail, reference[0])
+                changed = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+                static = changed < self.changed_fraction
+            if static:
+                self.skipped += 1
+            else:
+                # Кадр пойдёт в детектор и станет новым эталоном
+                self._references[stream] = (thumbnail, timestamp)
+            return static
+
+    def reset(self, stream):
+        """Забыть эталон камеры: следующий кадр обязательно пройдёт через детектор"""
+        with self._lock:
+            self._references.pop(stream, None)
@@ -0,0 +1,420 @@
+"""Офлайн-анализ записанного видео быстрее реального времени.
+
+Записи за часы проверяются задним числом («когда ящик с инструментами
+пропал со стола?»): видеофайл не проигрывается в реальном времени, а
+декодируется с максимальной скоростью, и детектор видит каждый stride-й
+кадр. Декодирование идёт в своём потоке (FFmpeg с несколькими потоками
+и аппаратным ускорением, если оно доступно), пока модель обрабатывает
+предыдущие пакеты. Пропущенные кадры только распаковываются (grab), без
+перевода в BGR и копирования.
+
+Пакеты кадров уходят бэкенду (см. backends.py), пулу процессов (см.
+process_pool.py) или серверу инференса; одновременно в работе до
+concurrency пакетов бэкенда, а результаты разбираются строго по порядку
+кадров. Порог отсутствия считается той же логикой камеры (см.
+CameraStream.update_absence в monitor.py), но по времени кадра в записи,
+а не по часам. Результат - отчёт с интервалами присутствия и отсутствия
+каждого объекта и моментами уведомлений; скорость анализа указывается
+как кратность реального времени.
+
+    python offline.py --model LVIS.pt --prompts toolbox --max-absence 60 --stride 10 shelf.mp4
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from backends import BACKENDS, create_backend
+from detections import Detections
+from monitor import (
+    EMBEDDINGS_PATH, EXPORTS_DIR, MODELS_DIR, TIMELINE_PATH, CameraStream, MonitorEngine, read_prompts,
+)
+from regions import in_zones, parse_zone
+from timeline import TimelineStore
+from vocabulary import Vocabulary
+
+
+def open_video(path, threads=0, hw_acceleration=True):
+    """VideoCapture с многопоточным и, если возможно, аппаратным декодированием"""
+    params = [cv2.CAP_PROP_N_THREADS, threads]
+    if hw_acceleration:
+        params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    cap = cv2.VideoCapture(path, cv2.CAP_ANY, params)
+    if not cap.isOpened() and hw_acceleration:
+        # Бэкенд без поддержки этих параметров: открываем как обычно
+        cap = cv2.VideoCapture(path)
+    return cap
+
+
+class VideoSampler:
+    """Каждый stride-й кадр файла с временем в записи; декодирование в фоновом потоке"""
+    def __init__(self, path, stride=1, threads=0, hw_acceleration=True, max_queued=64):
+        self.path = path
+        self.stride = max(1, stride)
+        self.cap = open_video(path, threads, hw_acceleration)
+        if not self.cap.isOpened():
+            raise OSError(f"Не удалось открыть видео: {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 25
+        frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Длительность по заголовку; у потоковых форматов её может не быть
+        self.duration = frame_count / self.fps if frame_count > 0 else None
+        self.frames_decoded = 0
+        # Время последнего распакованного кадра в записи
+        self.position = 0.0
+        self._queue = queue.Queue(max_queued)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _timestamp(self, index):
+        msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        # Не все контейнеры отдают время кадра: тогда считаем по номеру и частоте
+        timestamp = msec / 1000 if msec > 0 else index / self.fps
+        return max(timestamp, self.position)
+
+    def _run(self):
+        index = 0
+        try:
+            while not self._stop.is_set() and self.cap.grab():
+                self.frames_decoded += 1
+                if index % self.stride == 0:
+                    ok, frame = self.cap.retrieve()
+                    if ok:
+                        self.position = self._timestamp(index)
+                        self._put((index, self.position, frame))
+                else:
+                    self.position = max(self.position, index / self.fps)
+                index += 1
+        finally:
+            self._put(None)
+
+    def _put(self, item):
+        # Очередь ограничена: декодер не уходит далеко вперёд детектора
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.cap.release()
+
+
+class ObjectTimeline:
+    """Интервалы присутствия и отсутствия одного объекта по времени записи.
+
+    Перерыв между обнаружениями короче порога отсутствия считается
+    присутствием, не короче - отсутствием, как в журнале (см. timeline.py).
+    """
+    def __init__(self, max_absence_time):
+        self.max_absence_time = max_absence_time
+        self.samples = 0
+        self.first_seen = None
+        self.last_seen = None
+        self.present = []
+        self.absences = []
+        self.alerts = []
+        self._present_start = None
+
+    def seen(self, timestamp):
+        self.samples += 1
+        if self.last_seen is None:
+            self.first_seen = self._present_start = timestamp
+        elif timestamp - self.last_seen >= self.max_absence_time:
+            self.present.append((self._present_start, self.last_seen))
+            self.absences.append((self.last_seen, timestamp))
+            self._present_start = timestamp
+        self.last_seen = timestamp
+
+    def finish(self, end):
+        """Запись закончилась в момент end; открытое отсутствие остаётся без конца"""
+        if self.last_seen is None:
+            return
+        self.present.append((self._present_start, self.last_seen))
+        if end - self.last_seen >= self.max_absence_time:
+            self.absences.append((self.last_seen, None))
+
+    def to_dict(self, samples, end):
+        return {
+            "first_seen": _round(self.first_seen),
+            "last_seen": _round(self.last_seen),
+            "seen_ratio": round(self.samples / samples, 4) if samples else 0.0,
+            "present": [[_round(start), _round(stop)] for start, stop in self.present],
+            "absences": [
+                {"start": _round(start), "end": _round(stop), "duration": _round((end if stop is None else stop) - start)}
+                for start, stop in self.absences
+            ],
+            "alerts": [_round(moment) for moment in self.alerts],
+        }
+
+
+class OfflineAnalyzer:
+    """Анализ видеофайлов одним бэкендом с общим списком объектов"""
+    def __init__(self, backend, classes, max_absence_time=30, zones=None, batch_size=8, timeline=None):
+        self.backend = backend
+        self.classes = list(classes)
+        self.max_absence_time = max_absence_time
+        self.zones = zones or {}
+        self.batch_size = batch_size
+        self.timeline = timeline
+        self.vocabulary = Vocabulary(MonitorEngine.vocabulary_for([self.classes]), 1)
+        backend.apply(backend.prepare(self.vocabulary))
+
+    def _detect(self, stream, batch):
+        """Пакет кадров -> обнаружения; выполняется в потоках пула"""
+        mosaics = [stream.zone_mosaic(frame.shape[1], frame.shape[0]) for _, _, frame in batch]
+        images = [frame if mosaic is None else mosaic.compose(frame) for (_, _, frame), mosaic in zip(batch, mosaics)]
+        results = self.backend(images, verbose=False)
+        detections = []
+        for (_, timestamp, frame), mosaic, result in zip(batch, mosaics, results):
+            found = Detections.from_result(result, self.vocabulary, set(stream.selected_classes))
+            if mosaic is not None:
+                found = mosaic.to_frame(found)
+            h, w = frame.shape[:2]
+            detections.append((timestamp, in_zones(found, stream.zones, w, h)))
+        return detections
+
+    def analyze(self, path, stride=1, start=None, threads=0, hw_acceleration=True, progress=None):
+        """Отчёт по одному файлу.
+
+        start - время начала записи (Unix time) для абсолютных моментов в
+        отчёте и журнале; по умолчанию время изменения файла минус его
+        длительность. progress(position, duration, realtime) вызывается
+        после каждого разобранного пакета.
+        """
+        sampler = VideoSampler(path, stride, threads, hw_acceleration)
+        if start is None:
+            start = os.path.getmtime(path) - (sampler.duration or 0)
+        stream = CameraStream(path, self.classes, self.max_absence_time, zones=self.zones)
+        objects = {cls: ObjectTimeline(self.max_absence_time) for cls in stream.display_classes()}
+        camera = str(path)
+        if self.timeline is not None:
+            # Отсутствие не переносится из предыдущей записи той же камеры
+            self.timeline.start_session(camera, {})
+
+        samples = 0
+        last_timestamp = 0.0
+
+        def consume(detections):
+            nonlocal samples, last_timestamp
+            for timestamp, found in detections:
+                samples += 1
+                last_timestamp = timestamp
+                # Таймеры камеры считают 0 как «ещё не видели», поэтому время - абсолютное
+                moment = start + timestamp
+                names = set(found.names())
+                for cls, timeline in objects.items():
+                    if cls in names:
+                        timeline.seen(timestamp)
+                _, missing_objects = stream.update_absence(found, moment, moment)
+                for cls in missing_objects:
+                    objects[cls].alerts.append(timestamp)
+                if self.timeline is not None:
+                    seen = [cls for cls in objects if cls in names]
+                    self.timeline.record(camera, seen, moment, self.max_absence_time)
+                    if missing_objects:
+                        self.timeline.record_alert(camera, missing_objects, moment)
+
+        started = time.perf_counter()
+        concurrency = max(1, self.backend.concurrency)
+        pending = deque()
+        batch = []
+        try:
+            with ThreadPoolExecutor(concurrency) as executor:
+                for item in sampler:
+                    batch.append(item)
+                    if len(batch) < self.batch_size:
+                        continue
+                    pending.append(executor.submit(self._detect, stream, batch))
+                    batch = []
+                    # В работе не больше пакетов, чем бэкенд обрабатывает одновременно
+                    while len(pending) >= concurrency:
+                        consume(pending.popleft().result())
+                        if progress is not None:
+                            progress(last_timestamp, sampler.duration, last_timestamp / (time.perf_counter() - started))
+                if batch:
+                    pending.append(executor.submit(self._detect, stream, batch))
+                while pending:
+                    consume(pending.popleft().result())
+        finally:
+            sampler.close()
+        elapsed = time.perf_counter() - started
+
+        end = max(sampler.position, last_timestamp)
+        for timeline in objects.values():
+            timeline.finish(end)
+        return {
+            "source": camera,
+            "start": start,
+            "duration": _round(end),
+            "fps": round(sampler.fps, 3),
+            "stride": sampler.stride,
+            "frames_decoded": sampler.frames_decoded,
+            "frames_analyzed": samples,
+            "max_absence_time": self.max_absence_time,
+            "elapsed": round(elapsed, 2),
+            "realtime_factor": round(end / elapsed, 2) if elapsed > 0 else None,
+            "decode_fps": round(sampler.frames_decoded / elapsed, 1) if elapsed > 0 else None,
+            "objects": {cls: timeline.to_dict(samples, end) for cls, timeline in objects.items()},
+        }
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def format_time(seconds):
+    """Секунды от начала записи -> Ч:ММ:СС"""
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def format_report(report):
+    """Отчёт для чтения человеком: моменты - от начала записи и по часам"""
+    def moment(seconds):
+        clock = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(report["start"] + seconds))
+        return f"{format_time(seconds)} ({clock})"
+
+    lines = [
+        f"{report['source']}: {format_time(report['duration'])} записи за {report['elapsed']} с "
+        f"(x{report['realtime_factor']} реального времени), "
+        f"кадров для детектора: {report['frames_analyzed']} из {report['frames_decoded']}"
+    ]
+    for cls, info in report["objects"].items():
+        if info["first_seen"] is None:
+            lines.append(f"  {cls}: не обнаружен")
+            continue
+        present = ", ".join(f"{format_time(start)}-{format_time(stop)}" for start, stop in info["present"])
+        lines.append(f"  {cls}: виден {present} ({info['seen_ratio']:.0%} кадров)")
+        for absence in info["absences"]:
+            end = "до конца записи" if absence["end"] is None else f"до {moment(absence['end'])}"
+            lines.append(f"    отсутствовал с {moment(absence['start'])} {end}, {format_time(absence['duration'])}")
+        for alert in info["alerts"]:
+            lines.append(f"    уведомление в {moment(alert)}")
+    return "\n".join(lines)
+
+
+def parse_start(text):
+    """Начало записи: Unix time или «ГГГГ-ММ-ДД ЧЧ:ММ:СС» по местному времени"""
+    try:
+        return float(text)
+    except ValueError:
+        return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M:%S"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Анализ записанного видео быстрее реального времени")
+    parser.add_argument("videos", nargs="+", help="видеофайлы")
+    parser.add_argument("--model", help="путь к весам YOLO-World")
+    parser.add_argument("--server", metavar="URL", help="сервер инференса вместо локальной модели")
+    parser.add_argument("--frame-transport", choices=("jpeg", "raw", "shm"), default="shm",
+                        help="как передавать кадры серверу инференса")
+    parser.add_argument("--prompts", nargs="+", help="объекты для отслеживания")
+    parser.add_argument("--prompts-file", help="файл с объектами, по одному на строку")
+    parser.add_argument("--max-absence", type=int, default=30, help="порог отсутствия, сек записи")
+    parser.add_argument("--zone", action="append", type=parse_zone, default=[], metavar="PROMPT=X1,Y1,X2,Y2",
+                        help="зона объекта в долях кадра (можно указать несколько раз)")
+    parser.add_argument("--stride", type=int, default=5, help="детектор видит каждый N-й кадр записи")
+    parser.add_argument("--batch", type=int, default=8, help="кадров в пакете модели")
+    parser.add_argument("--start", type=parse_start,
+                        help="начало записи (Unix time или «ГГГГ-ММ-ДД ЧЧ:ММ:СС»), по умолчанию по времени файла")
+    parser.add_argument("--decode-threads", type=int, default=0, help="потоков декодера (0 - выбирает FFmpeg)")
+    parser.add_argument("--no-hw-decode", action="store_true", help="не пробовать аппаратное декодирование")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--workers", type=int, default=1, help="процессов инференса на CPU (см. process_pool.py)")
+    parser.add_argument("--worker-threads", type=int, help="потоков PyTorch в каждом процессе пула")
+    parser.add_argument("--timeline", nargs="?", const=TIMELINE_PATH,
+                        help="записать обнаружения в журнал SQLite (по умолчанию журнал приложения)")
+    parser.add_argument("--format", choices=("text", "json"), default="text", help="формат отчёта")
+    parser.add_argument("--output", help="файл отчёта (по умолчанию stdout)")
+    parser.add_argument("--quiet", action="store_true", help="не показывать ход анализа")
+    args = parser.parse_args(argv)
+
+    if not args.model and not args.server:
+        parser.error("нужно указать веса через --model или сервер инференса через --server")
+    if args.workers > 1 and args.backend != "torch":
+        parser.error("пул процессов (--workers) работает только с бэкендом torch")
+    prompts = read_prompts(args)
+    if not prompts:
+        parser.error("нужно указать хотя бы один объект через --prompts или --prompts-file")
+    zones = {}
+    for prompt, zone in args.zone:
+        if prompt not in prompts:
+            parser.error(f"зона задана для объекта, которого нет в списке: {prompt}")
+        zones.setdefault(prompt, []).append(zone)
+
+    if args.server:
+        from inference_server import RemoteBackend
+
+        backend = RemoteBackend(args.server, args.frame_transport)
+    else:
+        from embeddings import TextEmbeddingCache
+        from startup import load_model
+
+        cache = TextEmbeddingCache(EMBEDDINGS_PATH)
+        model = load_model(args.model, MODELS_DIR, prompts, cache, warmup=args.workers <= 1)
+        if args.workers > 1:
+            from process_pool import ProcessPoolBackend
+
+            backend = ProcessPoolBackend(model, args.workers, cache, args.worker_threads)
+        else:
+            backend = create_backend(model, args.backend, cache, EXPORTS_DIR)
+    timeline = None
+    if args.timeline:
+        timeline = TimelineStore(args.timeline)
+    analyzer = OfflineAnalyzer(backend, prompts, args.max_absence, zones, args.batch, timeline)
+
+    def progress(position, duration, realtime):
+        total = f" / {format_time(duration)}" if duration else ""
+        print(f"\r{format_time(position)}{total}, x{realtime:.1f}", end="", file=sys.stderr, flush=True)
+
+    reports = []
+    try:
+        for path in args.videos:
+            try:
+                reports.append(analyzer.analyze(
+                    path, args.stride, args.start, args.decode_threads, not args.no_hw_decode,
+                    None if args.quiet else progress,
+                ))
+            except OSError as e:
+                print(e, file=sys.stderr)
+            if not args.quiet:
+                print(file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
+        if timeline is not None:
+            timeline.close()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            output.write(json.dumps(reports, ensure_ascii=False, indent=2) + "\n")
+        else:
+            output.write("\n\n".join(format_report(report) for report in reports) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0 if len(reports) == len(args.videos) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
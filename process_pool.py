@@ -0,0 +1,258 @@
+"""Пул процессов инференса для многоядерных серверов.
+
+В одном процессе модель упирается в GIL и в плохое распараллеливание
+PyTorch на пакетах из одного кадра, поэтому ядра сервера простаивают.
+ProcessPoolBackend запускает workers процессов, каждый со своей копией
+предиктора и небольшим числом потоков PyTorch.
+
+Процессы создаются через fork сразу после загрузки модели: веса не
+копируются и не сериализуются, а разделяются с родителем в режиме
+копирования при записи. Поэтому пул создаётся до первого инференса и
+до обращения к CUDA в родительском процессе - он рассчитан на CPU.
+
+Кадры передаются через кольцо слотов в разделяемой памяти
+(multiprocessing.shared_memory): родитель кладёт кадр в свободный слот,
+а рабочий процесс отдаёт модели массив прямо поверх слота, без
+сериализации. Если свободных слотов нет или кадр больше слота, кадр
+уходит обычной сериализацией через очередь, так что вызовы из
+нескольких потоков не блокируют друг друга на слотах. Обратно приходят
+только массивы боксов (cls, xyxy, conf).
+
+Пакет кадров делится между наименее загруженными процессами, а
+concurrency сообщает детектору (см. monitor.py), сколько пакетов можно
+держать в работе одновременно. Новый словарь рассылается каждому
+процессу в его очередь задач, поэтому пакеты, отправленные до смены
+словаря, обрабатываются старым словарём, а после - новым. Завершившийся
+процесс исключается из распределения: его задачи завершаются с ошибкой,
+а их слоты возвращаются в пул.
+"""
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+from backends import TorchBackend
+from detections import ArrayBoxes, ArrayResult, to_numpy
+from embeddings import apply_text_features
+
+
+def _serve(model, shm, slot_bytes, tasks, results, threads):
+    """Цикл рабочего процесса: задачи из своей очереди, ответы в общую"""
+    # Ctrl+C получает вся группа процессов - останавливает пул родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    torch.set_num_threads(threads)
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        if task[0] == "vocabulary":
+            _, classes, txt_feats = task
+            if txt_feats is None:
+                model.set_classes(classes)
+            else:
+                device = next(model.model.parameters()).device
+                apply_text_features(model, classes, torch.from_numpy(txt_feats).to(device))
+            continue
+
+        _, job, items, kwargs = task
+        try:
+            images = [
+                item if isinstance(item, np.ndarray)
+                else np.ndarray(item[1], item[2], buffer=shm.buf, offset=item[0] * slot_bytes)
+                for item in items
+            ]
+            output = []
+            for result in model(images, **kwargs):
+                boxes = result.boxes
+                output.append((
+                    to_numpy(boxes.cls).reshape(-1).astype(np.float32),
+                    to_numpy(boxes.xyxy).reshape(-1, 4).astype(np.float32),
+                    to_numpy(boxes.conf).reshape(-1).astype(np.float32),
+                    tuple(result.orig_shape) if hasattr(result, "orig_shape") else None,
+                ))
+            del images
+            results.put((job, output, None))
+        except Exception as e:
+            results.put((job, None, f"{type(e).__name__}: {e}"))
+
+
+class _Job:
+    def __init__(self, worker, slots):
+        self.worker = worker
+        self.slots = slots
+        self.done = threading.Event()
+        self.output = None
+        self.error = None
+
+
+class ProcessPoolBackend(TorchBackend):
+    """Бэкенд PyTorch, распределяющий кадры по процессам (см. backends.py)"""
+    name = "torch-pool"
+
+    def __init__(self, model, workers=2, embedding_cache=None, threads=None, slots=None,
+                 max_frame=(1920, 1080)):
+        super().__init__(model, embedding_cache)
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("Пул процессов инференса требует fork (Linux)")
+        context = multiprocessing.get_context("fork")
+        self.workers = workers
+        self.concurrency = workers
+        # Потоки PyTorch на процесс: ядра делятся между процессами поровну
+        threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        # Кадры больше слота идут сериализацией; 3 байта на пиксель BGR
+        self.slot_bytes = max_frame[0] * max_frame[1] * 3
+        slots = slots or 4 * workers
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * self.slot_bytes)
+        self._free = queue.SimpleQueue()
+        for slot in range(slots):
+            self._free.put(slot)
+        # Сколько кадров ушло сериализацией вместо слота
+        self.copied = 0
+
+        # Предиктор сливает свёртки с BatchNorm при первом вызове, создавая новые тензоры;
+        # слитые до fork веса остаются общими для всех процессов
+        net = getattr(model, "model", None)
+        if hasattr(net, "fuse") and not net.is_fused():
+            net.fuse(verbose=False)
+
+        self._results = context.Queue()
+        self._tasks = [context.Queue() for _ in range(workers)]
+        self._processes = [
+            context.Process(
+                target=_serve, args=(model, self.shm, self.slot_bytes, tasks, self._results, threads), daemon=True
+            )
+            for tasks in self._tasks
+        ]
+        for process in self._processes:
+            process.start()
+        self._load = [0] * workers
+        self._jobs = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def apply(self, prepared):
+        txt_feats = None if prepared.txt_feats is None else prepared.txt_feats.detach().cpu().numpy()
+        with self._lock:
+            for tasks in self._tasks:
+                tasks.put(("vocabulary", list(prepared.vocabulary), txt_feats))
+
+    def __call__(self, frames, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        if not frames:
+            return []
+        # Пакет делится на части по числу процессов, порядок кадров сохраняется
+        parts = np.array_split(np.arange(len(frames)), min(len(frames), self.workers))
+        jobs = [self._submit([frames[i] for i in part], kwargs) for part in parts if len(part)]
+        results = []
+        for job in jobs:
+            results.extend(self._wait(job))
+        return results
+
+    def _submit(self, frames, kwargs):
+        items, slots = [], []
+        for frame in frames:
+            frame = np.ascontiguousarray(frame)
+            slot = None
+            if frame.nbytes <= self.slot_bytes:
+                try:
+                    slot = self._free.get_nowait()
+                except queue.Empty:
+                    pass
+            if slot is None:
+                self.copied += 1
+                items.append(frame)
+                continue
+            # Единственное копирование кадра - в слот разделяемой памяти
+            view = np.ndarray(frame.shape, frame.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+            view[...] = frame
+            del view
+            slots.append(slot)
+            items.append((slot, frame.shape, frame.dtype.str))
+        with self._lock:
+            self._reap()
+            error = None
+            if self._closed:
+                error = "Пул процессов инференса остановлен"
+            elif min(self._load) == float("inf"):
+                error = "Все процессы пула инференса завершились"
+            if error is not None:
+                for slot in slots:
+                    self._free.put(slot)
+                raise RuntimeError(error)
+            worker = self._load.index(min(self._load))
+            self._load[worker] += 1
+            job_id = next(self._ids)
+            job = self._jobs[job_id] = _Job(worker, slots)
+            self._tasks[worker].put(("frames", job_id, items, kwargs))
+        return job
+
+    def _reap(self):
+        """Завершившиеся процессы исключаются из распределения, их задачи завершаются с ошибкой.
+
+        Вызывается под self._lock. Слоты таких задач возвращаются в пул:
+        процесс, который их читал, уже не существует.
+        """
+        for worker, process in enumerate(self._processes):
+            if self._load[worker] == float("inf") or process.is_alive():
+                continue
+            self._load[worker] = float("inf")
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.worker == worker]:
+                job = self._jobs.pop(job_id)
+                for slot in job.slots:
+                    self._free.put(slot)
+                job.error = f"процесс {worker} завершился"
+                job.done.set()
+
+    def _wait(self, job):
+        while not job.done.wait(1.0):
+            with self._lock:
+                self._reap()
+        if job.error is not None:
+            raise RuntimeError(f"Ошибка инференса в процессе пула: {job.error}")
+        return [
+            ArrayResult(ArrayBoxes(cls, xyxy, conf), shape)
+            for cls, xyxy, conf, shape in job.output
+        ]
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            job_id, output, error = message
+            with self._lock:
+                job = self._jobs.pop(job_id, None)
+                if job is None:
+                    continue
+                self._load[job.worker] -= 1
+            # Слоты освобождаются, только когда процесс закончил с ними работать
+            for slot in job.slots:
+                self._free.put(slot)
+            job.output, job.error = output, error
+            job.done.set()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for tasks in self._tasks:
+                tasks.put(None)
+        for process in self._processes:
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._collector.join()
+        self.shm.close()
+        self.shm.unlink()
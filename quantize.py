@@ -0,0 +1,471 @@
+"""INT8-квантизация детектора по кадрам из записей своих камер.
+
+На хостах без GPU узкое место - модель YOLO-World в FP32, хотя для
+решения «объект ещё на месте» такая точность избыточна. Инструмент берёт
+список объектов (по умолчанию объединение списков камер приложения),
+равномерно выбирает кадры калибровки из записей камер, экспортирует
+модель с зашитым словарём в ONNX и квантует её статически (ONNX Runtime,
+формат QDQ, веса INT8 по каналам, активации UINT8). Диапазоны активаций
+считаются по кадрам калибровки, прошедшим ту же предобработку ultralytics,
+что и при инференсе. Узлы головы детектора, кроме свёрток (декодирование
+боксов, сравнение с текстовыми эмбеддингами), остаются в FP32.
+
+Модель кладётся в кэш экспорта под ключом словаря, как артефакты бэкенда
+onnx-int8 (см. ExportedBackend в backends.py), поэтому приложение с
+DETECTOR_BACKEND=onnx-int8 и monitor.py с --backend onnx-int8 сразу
+работают на ней вместо PyTorch. Кадры калибровки сохраняются рядом: при
+смене списка объектов бэкенд квантует новый словарь по ним сам, в фоне.
+
+Затем на записях (--eval, по умолчанию те же) офлайн-анализ (см.
+offline.py) проходит дважды - с FP32 и с INT8 - и отчёт сравнивает их:
+полноту и точность боксов INT8 относительно FP32 по каждому промпту,
+совпадение присутствия по кадрам, совпадение уведомлений об отсутствии и
+задержку на кадр для PyTorch, ONNX FP32 и ONNX INT8. По порогам
+--min-recall и --min-alert-agreement отчёт заканчивается выводом, ставить
+ли INT8 на этой площадке.
+
+    python quantize.py --model LVIS.pt shelf_monday.mp4 shelf_tuesday.mp4
+    python quantize.py calib/ --model LVIS.pt --prompts toolbox drill --eval shelf_friday.mp4
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from backends import TorchBackend, create_backend, export_model
+from capture import IMAGE_EXTENSIONS
+from monitor import EMBEDDINGS_PATH, EXPORTS_DIR, MODELS_DIR, WATCHLIST_PATH, MonitorEngine, load_cameras, read_prompts
+from offline import OfflineAnalyzer, VideoSampler, format_time
+from tracking import greedy_match, iou_matrix
+
+CALIBRATION_METHODS = {"minmax": "MinMax", "percentile": "Percentile", "entropy": "Entropy"}
+
+
+def calibration_dir(cache_dir):
+    """Каталог кадров калибровки рядом с артефактами экспорта"""
+    return os.path.join(cache_dir, "calibration")
+
+
+def sample_frames(sources, count):
+    """count кадров, равномерно взятых из видеофайлов и каталогов изображений"""
+    per_source = max(1, -(-count // len(sources)))
+    frames = []
+    for source in sources:
+        if os.path.isdir(source):
+            files = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+            for name in files[::max(1, len(files) // per_source)][:per_source]:
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    frames.append(frame)
+            continue
+        cap = cv2.VideoCapture(source)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        sampler = VideoSampler(source, max(1, total // per_source))
+        try:
+            taken = 0
+            for _, _, frame in sampler:
+                frames.append(frame)
+                taken += 1
+                if taken >= per_source:
+                    break
+        finally:
+            sampler.close()
+    return frames[:count]
+
+
+def save_calibration(frames, directory, method="minmax"):
+    """Кадры калибровки в JPEG и метод калибровки; старые кадры удаляются"""
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(directory, f"{i:05d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+    with open(os.path.join(directory, "settings.json"), "w", encoding="utf-8") as f:
+        json.dump({"method": method}, f)
+
+
+def load_calibration(directory):
+    """Кадры калибровки, сохранённые save_calibration (пустой список, если их нет)"""
+    if not os.path.isdir(directory):
+        return []
+    frames = [cv2.imread(os.path.join(directory, name)) for name in sorted(os.listdir(directory)) if name.endswith(".jpg")]
+    return [frame for frame in frames if frame is not None]
+
+
+def calibration_method(directory):
+    try:
+        with open(os.path.join(directory, "settings.json"), encoding="utf-8") as f:
+            return json.load(f).get("method", "minmax")
+    except (OSError, ValueError):
+        return "minmax"
+
+
+class CalibrationReader:
+    """Кадры калибровки как входы ONNX-модели (интерфейс CalibrationDataReader ONNX Runtime)"""
+    def __init__(self, runner, frames, input_name):
+        # Первый вызов собирает предиктор: дальше кадры проходят ту же предобработку, что при инференсе
+        runner(frames[0], verbose=False)
+        self._inputs = (runner.predictor.preprocess([frame]).cpu().numpy() for frame in frames)
+        self.input_name = input_name
+
+    def get_next(self):
+        tensor = next(self._inputs, None)
+        return None if tensor is None else {self.input_name: tensor}
+
+
+def head_nodes(graph):
+    """Узлы последнего модуля (головы детектора), кроме свёрток.
+
+    Декодирование боксов (DFL) и сравнение со словарём в INT8 теряют
+    точность координат и уверенностей, а времени почти не занимают.
+    """
+    pattern = re.compile(r"/model\.(\d+)/")
+    layers = {}
+    for node in graph.node:
+        match = pattern.match(node.name)
+        if match:
+            layers[node.name] = int(match.group(1))
+    if not layers:
+        return []
+    head = max(layers.values())
+    return [node.name for node in graph.node if layers.get(node.name) == head and node.op_type != "Conv"]
+
+
+def export_int8(model, prepared, path, frames, imgsz=640, method=None):
+    """Экспорт словаря prepared в ONNX и статическая квантизация в INT8 по кадрам frames"""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    from ultralytics import YOLO
+
+    method = method or calibration_method(calibration_dir(os.path.dirname(path)))
+    workdir = tempfile.mkdtemp(prefix="quantize_")
+    try:
+        fp32_path = os.path.join(workdir, "fp32.onnx")
+        shutil.move(export_model(model, prepared, "onnx", imgsz), fp32_path)
+        # Вывод форм и слияние узлов; вход с динамическими размерами, поэтому без символьного вывода форм
+        optimized_path = os.path.join(workdir, "optimized.onnx")
+        quant_pre_process(fp32_path, optimized_path, skip_symbolic_shape=True)
+        graph = onnx.load(optimized_path).graph
+        reader = CalibrationReader(YOLO(fp32_path, task="detect"), frames, graph.input[0].name)
+        int8_path = os.path.join(workdir, "int8.onnx")
+        quantize_static(
+            optimized_path, int8_path, reader,
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            nodes_to_exclude=head_nodes(graph),
+            calibrate_method=getattr(CalibrationMethod, CALIBRATION_METHODS[method]),
+        )
+        # Метаданные ultralytics (имена классов, шаг, размер входа) переносятся квантизацией
+        shutil.move(int8_path, path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+class RecordingAnalyzer(OfflineAnalyzer):
+    """Офлайн-анализ, который запоминает обнаружения каждого кадра"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.detections = []
+
+    def _detect(self, stream, batch):
+        detections = super()._detect(stream, batch)
+        # Сравниваемые бэкенды обрабатывают по одному пакету за раз, так что кадры приходят по порядку
+        self.detections.extend(found for _, found in detections)
+        return detections
+
+
+def ratio(part, total):
+    return round(part / total, 4) if total else None
+
+
+def compare_boxes(reference, candidate, classes, iou_threshold=0.5):
+    """Боксы INT8 против FP32 по кадрам: для каждого промпта число боксов, совпавших по IoU, и кадров с одинаковым присутствием"""
+    counts = {cls: {"fp32_boxes": 0, "int8_boxes": 0, "matched": 0, "frames": 0, "frames_agree": 0} for cls in classes}
+    for ref, cand in zip(reference, candidate):
+        for cls in classes:
+            ref_boxes = ref.xyxy[ref.cls == ref.classes.index(cls)].astype(np.float32)
+            cand_boxes = cand.xyxy[cand.cls == cand.classes.index(cls)].astype(np.float32)
+            row = counts[cls]
+            row["fp32_boxes"] += len(ref_boxes)
+            row["int8_boxes"] += len(cand_boxes)
+            row["matched"] += len(greedy_match(iou_matrix(ref_boxes, cand_boxes), iou_threshold))
+            row["frames"] += 1
+            row["frames_agree"] += bool(len(ref_boxes)) == bool(len(cand_boxes))
+    return counts
+
+
+def compare_alerts(reference, candidate, tolerance):
+    """Уведомления INT8 против FP32: совпавшими считаются моменты не дальше tolerance секунд"""
+    matched = 0
+    remaining = list(candidate)
+    for moment in reference:
+        nearest = min(remaining, key=lambda other: abs(other - moment), default=None)
+        if nearest is not None and abs(nearest - moment) <= tolerance:
+            remaining.remove(nearest)
+            matched += 1
+    return {"fp32_alerts": len(reference), "int8_alerts": len(candidate), "alerts_matched": matched}
+
+
+def measure_latency(backend, frames, warmup=3):
+    """Задержка вызова бэкенда на один кадр, мс"""
+    for frame in frames[:warmup]:
+        backend([frame], verbose=False)
+    latencies = []
+    for frame in frames:
+        started = time.perf_counter()
+        backend([frame], verbose=False)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+        "mean_ms": round(float(np.mean(latencies)), 1),
+    }
+
+
+def evaluate(model, int8_backend, classes, videos, args, embedding_cache=None):
+    """Офлайн-анализ записей с FP32 и INT8 и сравнение обнаружений и уведомлений"""
+    fp32_backend = TorchBackend(model, embedding_cache)
+    totals = {cls: {} for cls in classes}
+    runs = []
+    for path in videos:
+        reports = {}
+        detections = {}
+        for name, backend in (("fp32", fp32_backend), ("int8", int8_backend)):
+            analyzer = RecordingAnalyzer(backend, classes, args.max_absence, batch_size=args.batch)
+            reports[name] = analyzer.analyze(path, args.eval_stride)
+            detections[name] = analyzer.detections
+        boxes = compare_boxes(detections["fp32"], detections["int8"], classes, args.iou)
+        for cls in classes:
+            alerts = compare_alerts(
+                reports["fp32"]["objects"][cls]["alerts"], reports["int8"]["objects"][cls]["alerts"], args.alert_tolerance,
+            )
+            for field, value in {**boxes[cls], **alerts}.items():
+                totals[cls][field] = totals[cls].get(field, 0) + value
+        runs.append({
+            "source": path,
+            "duration": reports["fp32"]["duration"],
+            "frames": len(detections["fp32"]),
+            "fp32_realtime_factor": reports["fp32"]["realtime_factor"],
+            "int8_realtime_factor": reports["int8"]["realtime_factor"],
+        })
+
+    prompts = {}
+    for cls, total in totals.items():
+        alerts = max(total["fp32_alerts"], total["int8_alerts"])
+        prompts[cls] = {
+            "fp32_boxes": total["fp32_boxes"],
+            "int8_boxes": total["int8_boxes"],
+            "recall": ratio(total["matched"], total["fp32_boxes"]),
+            "precision": ratio(total["matched"], total["int8_boxes"]),
+            "presence_agreement": ratio(total["frames_agree"], total["frames"]),
+            "fp32_alerts": total["fp32_alerts"],
+            "int8_alerts": total["int8_alerts"],
+            "alerts_matched": total["alerts_matched"],
+            # Ни одного уведомления ни у одной модели - полное совпадение
+            "alert_agreement": ratio(total["alerts_matched"], alerts) if alerts else 1.0,
+        }
+    matched = sum(row["alerts_matched"] for row in prompts.values())
+    alerts = sum(max(row["fp32_alerts"], row["int8_alerts"]) for row in prompts.values())
+    return {
+        "videos": runs,
+        "iou": args.iou,
+        "alert_tolerance": args.alert_tolerance,
+        "prompts": prompts,
+        "alert_agreement": ratio(matched, alerts) if alerts else 1.0,
+    }
+
+
+def verdict(report, min_recall, min_alert_agreement):
+    """Ставить ли INT8: список причин против (пустой - можно ставить)"""
+    reasons = []
+    accuracy = report.get("accuracy")
+    if accuracy is not None:
+        for cls, row in accuracy["prompts"].items():
+            if row["recall"] is not None and row["recall"] < min_recall:
+                reasons.append(f"полнота «{cls}» {row['recall']:.1%} ниже {min_recall:.0%}")
+        if accuracy["alert_agreement"] < min_alert_agreement:
+            reasons.append(
+                f"уведомления совпадают с FP32 на {accuracy['alert_agreement']:.1%}, нужно {min_alert_agreement:.0%}"
+            )
+    latency = report.get("latency")
+    if latency is not None and latency["speedup"] is not None and latency["speedup"] <= 1.0:
+        reasons.append(f"INT8 не быстрее PyTorch (x{latency['speedup']})")
+    return reasons
+
+
+def format_report(report):
+    """Отчёт для чтения человеком"""
+    lines = [
+        f"INT8-модель: {report['artifact']}",
+        f"Словарь: {', '.join(report['vocabulary'])}",
+        f"Калибровка: {report['calibration']['frames']} кадров, метод {report['calibration']['method']}, "
+        f"{report['calibration']['seconds']} с",
+    ]
+    accuracy = report.get("accuracy")
+    if accuracy is not None:
+        for run in accuracy["videos"]:
+            lines.append(
+                f"{run['source']}: {format_time(run['duration'])} записи, {run['frames']} кадров, "
+                f"x{run['fp32_realtime_factor']} реального времени на FP32 и x{run['int8_realtime_factor']} на INT8"
+            )
+        lines.append(f"Точность INT8 относительно FP32 (IoU >= {accuracy['iou']}, уведомления ±{accuracy['alert_tolerance']} с):")
+        lines.append(f"  {'промпт':<24} {'полнота':>8} {'точность':>9} {'присутствие':>12} {'уведомления':>14}")
+        for cls, row in accuracy["prompts"].items():
+            def percent(value):
+                return "-" if value is None else f"{value:.1%}"
+
+            alerts = f"{row['alerts_matched']}/{max(row['fp32_alerts'], row['int8_alerts'])}"
+            lines.append(
+                f"  {cls:<24} {percent(row['recall']):>8} {percent(row['precision']):>9} "
+                f"{percent(row['presence_agreement']):>12} {alerts:>14}"
+            )
+        lines.append(f"Совпадение уведомлений об отсутствии: {accuracy['alert_agreement']:.1%}")
+    latency = report.get("latency")
+    if latency is not None:
+        lines.append(f"Задержка на кадр ({latency['frames']} кадров):")
+        for name, row in latency["backends"].items():
+            lines.append(f"  {name:<10} p50 {row['p50_ms']:>7.1f} мс, p95 {row['p95_ms']:>7.1f} мс")
+        if latency["speedup"] is not None:
+            lines.append(f"Ускорение INT8 относительно PyTorch: x{latency['speedup']}")
+    if "deploy" in report:
+        if report["deploy"]:
+            lines.append("Вывод: INT8 можно ставить (DETECTOR_BACKEND=onnx-int8 или --backend onnx-int8)")
+        else:
+            lines.append("Вывод: INT8 не ставить - " + "; ".join(report["reasons"]))
+    return "\n".join(lines)
+
+
+def watchlist_prompts(path):
+    """Объединение списков объектов камер приложения"""
+    return [cls for cls in MonitorEngine.vocabulary_for(camera["classes"] for camera in load_cameras(path))
+            if cls != "__placeholder__"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="INT8-квантизация детектора по кадрам из записей камер")
+    parser.add_argument("footage", nargs="+", help="видеофайлы или каталоги изображений для калибровки")
+    parser.add_argument("--model", default="LVIS.pt", help="путь к весам YOLO-World")
+    parser.add_argument("--prompts", nargs="+", help="объекты (по умолчанию - списки камер приложения)")
+    parser.add_argument("--prompts-file", help="файл с объектами, по одному на строку")
+    parser.add_argument("--watchlist", default=WATCHLIST_PATH, help="файл камер приложения со списками объектов")
+    parser.add_argument("--frames", type=int, default=200, help="кадров калибровки")
+    parser.add_argument("--calibration-method", choices=CALIBRATION_METHODS, default="minmax",
+                        help="как выбирать диапазоны активаций")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--eval", nargs="+", metavar="VIDEO",
+                        help="записи для сравнения с FP32 (по умолчанию видеофайлы калибровки)")
+    parser.add_argument("--eval-stride", type=int, default=15, help="при сравнении модель видит каждый N-й кадр")
+    parser.add_argument("--batch", type=int, default=8, help="кадров в пакете модели при сравнении")
+    parser.add_argument("--max-absence", type=int, default=30, help="порог отсутствия для уведомлений, сек записи")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU, с которым бокс INT8 совпадает с боксом FP32")
+    parser.add_argument("--alert-tolerance", type=float, default=5.0,
+                        help="на сколько секунд записи может разойтись момент уведомления")
+    parser.add_argument("--latency-frames", type=int, default=30, help="кадров для замера задержки (0 - не замерять)")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="наименьшая полнота боксов каждого промпта")
+    parser.add_argument("--min-alert-agreement", type=float, default=0.95,
+                        help="наименьшая доля совпавших уведомлений")
+    parser.add_argument("--no-eval", action="store_true", help="только квантовать, без сравнения с FP32")
+    parser.add_argument("--cache-dir", default=EXPORTS_DIR, help="кэш экспорта, из которого модель берёт бэкенд")
+    parser.add_argument("--format", choices=("text", "json"), default="text", help="формат отчёта")
+    parser.add_argument("--output", help="файл отчёта (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+
+    prompts = read_prompts(args) or watchlist_prompts(args.watchlist)
+    if not prompts:
+        parser.error("нет объектов: укажите --prompts, --prompts-file или добавьте объекты камерам в приложении")
+    missing = [path for path in args.footage + (args.eval or []) if not os.path.exists(path)]
+    if missing:
+        parser.error(f"нет таких файлов: {', '.join(missing)}")
+    videos = args.eval or [path for path in args.footage if os.path.isfile(path)]
+
+    from embeddings import TextEmbeddingCache
+    from startup import load_model
+
+    cache = TextEmbeddingCache(EMBEDDINGS_PATH)
+    vocabulary = MonitorEngine.vocabulary_for([prompts])
+    # Та же загрузка и тот же кэш слитой модели, что у приложения: от пути весов зависит ключ артефакта
+    model = load_model(args.model, MODELS_DIR, vocabulary, cache)
+
+    print(f"Выбор кадров калибровки из {len(args.footage)} записей...", file=sys.stderr)
+    frames = sample_frames(args.footage, args.frames)
+    if not frames:
+        print("Не удалось прочитать ни одного кадра калибровки", file=sys.stderr)
+        return 1
+    save_calibration(frames, calibration_dir(args.cache_dir), args.calibration_method)
+
+    print(f"Квантизация по {len(frames)} кадрам...", file=sys.stderr)
+    started = time.perf_counter()
+    backend = create_backend(model, "onnx-int8", cache, args.cache_dir, args.imgsz)
+    artifact = backend.artifact_path(backend.vocabulary_key(vocabulary))
+    # Прежняя модель для этого словаря могла быть откалибрована на других записях
+    if os.path.exists(artifact):
+        os.remove(artifact)
+    backend.set_classes(vocabulary)
+    if not backend.wait_ready():
+        print(f"Квантизация не удалась: {backend.error}", file=sys.stderr)
+        backend.close()
+        return 1
+    report = {
+        "model": args.model,
+        "artifact": artifact,
+        "vocabulary": list(vocabulary),
+        "calibration": {
+            "frames": len(frames),
+            "sources": args.footage,
+            "method": args.calibration_method,
+            "seconds": round(time.perf_counter() - started, 1),
+        },
+    }
+
+    try:
+        if not args.no_eval:
+            if videos:
+                print(f"Сравнение с FP32 на {len(videos)} записях...", file=sys.stderr)
+                report["accuracy"] = evaluate(model, backend, vocabulary, videos, args, cache)
+            if args.latency_frames > 0:
+                print("Замер задержки...", file=sys.stderr)
+                sample = frames[:args.latency_frames]
+                backends = {"torch": TorchBackend(model, cache)}
+                fp32 = create_backend(model, "onnx", cache, args.cache_dir, args.imgsz)
+                fp32.set_classes(vocabulary)
+                if fp32.wait_ready():
+                    backends["onnx"] = fp32
+                backends["onnx-int8"] = backend
+                latency = {name: measure_latency(candidate, sample) for name, candidate in backends.items()}
+                fp32.close()
+                report["latency"] = {
+                    "frames": len(sample),
+                    "backends": latency,
+                    "speedup": round(latency["torch"]["p50_ms"] / latency["onnx-int8"]["p50_ms"], 2),
+                }
+            reasons = verdict(report, args.min_recall, args.min_alert_agreement)
+            report["deploy"] = not reasons
+            report["reasons"] = reasons
+    finally:
+        backend.close()
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            output.write(json.dumps(report, ensure_ascii=False, indent=2) + "\n")
+        else:
+            output.write(format_report(report) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Зоны объектов: области кадра, в которых объект должен находиться.
+
+Зона задаётся в долях кадра (x1, y1, x2, y2), у объекта их может быть
+несколько. Если зоны заданы у всех объектов камеры, детектор получает
+не весь кадр, а мозаику из вырезок вокруг объединения зон (с полем
+margin, чтобы объект на краю зоны попал в вырезку целиком):
+пересекающиеся вырезки сливаются, а результат укладывается полками в
+один компактный кадр. Так на камеру по-прежнему приходится одно
+изображение пакета, но модель обрабатывает меньше пикселей, а зоны
+уменьшаются слабее, чем при сжатии всего кадра. Боксы мозаики
+возвращаются в координаты кадра по вырезке, в которой лежит их центр.
+
+Обнаружение засчитывается объекту, только если центр бокса лежит в
+одной из его зон.
+"""
+import numpy as np
+
+from tiling import parse_region
+
+
+def parse_zone(text):
+    """Зона объекта "prompt=x1,y1,x2,y2" -> (prompt, зона)"""
+    prompt, sep, region = text.rpartition("=")
+    if not sep or not prompt.strip():
+        raise ValueError(f"Зона задаётся как объект=x1,y1,x2,y2: {text}")
+    return prompt.strip(), parse_region(region)
+
+
+def format_zones(zones):
+    return "; ".join(",".join(f"{value:g}" for value in zone) for zone in zones)
+
+
+def to_pixels(zone, width, height, margin=0.0):
+    x1, y1, x2, y2 = zone
+    mx, my = (x2 - x1) * margin, (y2 - y1) * margin
+    return (
+        max(0, int((x1 - mx) * width)), max(0, int((y1 - my) * height)),
+        min(width, int(np.ceil((x2 + mx) * width))), min(height, int(np.ceil((y2 + my) * height))),
+    )
+
+
+def merge_rects(rects):
+    """Пересекающиеся прямоугольники сливаются в описанные, пока пересечения не кончатся"""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+def crop_rects(zones, classes, width, height, margin=0.1):
+    """Вырезки кадра для детектора; None - какой-то объект ищется по всему кадру"""
+    if not classes or any(not zones.get(cls) for cls in classes):
+        return None
+    rects = [to_pixels(zone, width, height, margin) for cls in classes for zone in zones[cls]]
+    return merge_rects(rect for rect in rects if rect[2] > rect[0] and rect[3] > rect[1])
+
+
+class Mosaic:
+    """Вырезки кадра, уложенные полками в один кадр с промежутком gap"""
+    def __init__(self, rects, gap=16):
+        self.rects = rects
+        # Ширина полки - не меньше самой широкой вырезки, иначе примерно квадрат
+        area = sum((x2 - x1 + gap) * (y2 - y1 + gap) for x1, y1, x2, y2 in rects)
+        shelf_width = max(max(x2 - x1 for x1, _, x2, _ in rects), int(np.sqrt(area)))
+        self.offsets = [None] * len(rects)
+        x = y = shelf_height = width = 0
+        for i in sorted(range(len(rects)), key=lambda i: rects[i][1] - rects[i][3]):
+            w, h = rects[i][2] - rects[i][0], rects[i][3] - rects[i][1]
+            if x and x + w > shelf_width:
+                x, y, shelf_height = 0, y + shelf_height + gap, 0
+            self.offsets[i] = (x, y)
+            width = max(width, x + w)
+            shelf_height = max(shelf_height, h)
+            x += w + gap
+        self.width, self.height = width, y + shelf_height
+        self.placed = np.array(
+            [(mx, my, mx + x2 - x1, my + y2 - y1) for (mx, my), (x1, y1, x2, y2) in zip(self.offsets, rects)]
+        )
+        self.shift = np.array([(x1 - mx, y1 - my) for (mx, my), (x1, y1, _, _) in zip(self.offsets, rects)])
+
+    @property
+    def area(self):
+        return self.width * self.height
+
+    def compose(self, frame):
+        if len(self.rects) == 1:
+            # Одна вырезка - срез без копирования
+            x1, y1, x2, y2 = self.rects[0]
+            return frame[y1:y2, x1:x2]
+        canvas = np.zeros((self.height, self.width) + frame.shape[2:], frame.dtype)
+        for (mx, my), (x1, y1, x2, y2) in zip(self.offsets, self.rects):
+            canvas[my:my + y2 - y1, mx:mx + x2 - x1] = frame[y1:y2, x1:x2]
+        return canvas
+
+    def to_frame(self, detections):
+        """Боксы мозаики -> координаты кадра; боксы с центром в промежутке отбрасываются"""
+        if not len(detections):
+            return detections
+        xyxy = detections.xyxy
+        cx = (xyxy[:, 0] + xyxy[:, 2]) // 2
+        cy = (xyxy[:, 1] + xyxy[:, 3]) // 2
+        placed = self.placed
+        inside = (
+            (cx[:, None] >= placed[None, :, 0]) & (cx[:, None] < placed[None, :, 2])
+            & (cy[:, None] >= placed[None, :, 1]) & (cy[:, None] < placed[None, :, 3])
+        )
+        keep = inside.any(axis=1)
+        owner = inside.argmax(axis=1)[keep]
+        # Бокс обрезается своей вырезкой, чтобы не залезать на соседние
+        box = np.clip(xyxy[keep], np.tile(placed[owner, :2], 2), np.tile(placed[owner, 2:], 2))
+        box = (box + np.tile(self.shift[owner], 2)).astype(np.int32)
+        return type(detections)(detections.classes, detections.cls[keep], box, detections.conf[keep])
+
+
+def zone_mosaic(zones, classes, width, height, margin=0.1, max_share=0.7):
+    """Мозаика зон для кадра; None - выгоднее отдать детектору весь кадр"""
+    rects = crop_rects(zones, classes, width, height, margin)
+    if not rects:
+        return None
+    mosaic = Mosaic(rects)
+    return mosaic if mosaic.area <= max_share * width * height else None
+
+
+def in_zones(detections, zones, width, height):
+    """Только обнаружения с центром бокса в зонах своего объекта (объекты без зон - везде)"""
+    if not zones or not len(detections):
+        return detections
+    cx = (detections.xyxy[:, 0] + detections.xyxy[:, 2]) / 2 / width
+    cy = (detections.xyxy[:, 1] + detections.xyxy[:, 3]) / 2 / height
+    keep = np.ones(len(detections), bool)
+    for name, regions in zones.items():
+        if not regions or name not in detections.classes:
+            continue
+        mine = detections.cls == detections.classes.index(name)
+        inside = np.zeros(len(detections), bool)
+        for x1, y1, x2, y2 in regions:
+            inside |= (cx >= x1) & (cx <= x2) & (cy >= y1) & (cy <= y2)
+        keep &= ~mine | inside
+    return detections.select(keep)
@@ -0,0 +1,58 @@
+"""Планировщик запусков детектора по оставшемуся бюджету отсутствия.
+
+Отсутствие считается в целых секундах относительно max_absence_time,
+поэтому прогонять детектор на каждом кадре нужно только тогда, когда
+какой-то объект приближается к порогу. Пока все объекты подтверждены
+недавно, детектор запускается с частотой idle_interval (по умолчанию
+1 Гц), а в последней части бюджета (urgency_window) интервал линейно
+сокращается до min_interval.
+
+Гарантия задержки: в окне срочности интервал всегда меньше оставшегося
+бюджета, поэтому ближе к порогу детектор работает на каждом свежем кадре.
+Уведомление приходит не позже чем через
+max(min_interval, период кадра) + время одного инференса после порога,
+то есть так же, как и без планировщика. Объекты, которые ещё ни разу
+не были обнаружены, порога не имеют и проверяются с частотой idle_interval.
+"""
+
+
+class AbsenceBudgetScheduler:
+    def __init__(self, idle_interval=1.0, min_interval=0.0, urgency_window=0.25):
+        self.idle_interval = idle_interval
+        self.min_interval = min_interval
+        # Доля max_absence_time, в которой детектор ускоряется
+        self.urgency_window = urgency_window
+
+    def remaining_budget(self, stream, now):
+        """Наименьший оставшийся бюджет среди объектов камеры (None, если порогов нет)"""
+        remaining = None
+        for cls in stream.display_classes():
+            last_seen = stream.last_seen.get(cls, 0)
+            if last_seen <= 0 or cls in stream.notified_objects:
+                continue
+            budget = stream.max_absence_time - (now - last_seen)
+            if remaining is None or budget < remaining:
+                remaining = budget
+        return remaining
+
+    def next_interval(self, stream, now):
+        remaining = self.remaining_budget(stream, now)
+        if remaining is None:
+            return self.idle_interval
+        # Окно не меньше двух интервалов простоя, иначе интервал может перешагнуть порог
+        window = max(self.urgency_window * stream.max_absence_time, 2 * self.idle_interval)
+        if remaining >= window:
+            return self.idle_interval
+        share = max(remaining, 0.0) / window
+        return self.min_interval + (self.idle_interval - self.min_interval) * share
+
+    def due(self, stream, now):
+        return now >= stream.next_inference
+
+    def schedule(self, stream, now):
+        """Вызывается после обработки результата: назначает следующий запуск"""
+        stream.next_inference = now + self.next_interval(stream, now)
+
+    def wake(self, stream):
+        """Запустить детектор на ближайшем кадре (например, после изменения списка объектов)"""
+        stream.next_inference = 0.0
@@ -0,0 +1,114 @@
+"""Быстрый запуск: загрузка модели, кэш слитой модели и прогрев.
+
+Импорт ultralytics вместе с torch занимает секунды, загрузка весов и
+первый вызов модели - ещё столько же: при первом кадре собирается
+предиктор и свёртки сливаются с BatchNorm. Поэтому GUI сначала
+показывает окно, а load_model выполняет в фоновом потоке.
+
+Слитая модель в float32 сохраняется в cache_dir с ключом по пути, размеру
+и времени изменения весов, а также версиям torch и ultralytics. Следующие
+запуски загружают её без перевода весов из half, без состояния оптимизатора
+из чекпоинта и без повторного слияния слоёв.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from embeddings import set_classes_cached
+
+
+def fused_path(path, cache_dir):
+    """Путь к слитой модели для весов path в каталоге cache_dir"""
+    import torch
+    import ultralytics
+
+    stat = os.stat(path)
+    payload = {
+        "weights": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime),
+        # Модель сохраняется сериализацией классов: другие версии могут её не прочитать
+        "torch": torch.__version__,
+        "ultralytics": ultralytics.__version__,
+    }
+    key = hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    # Имя файла начинается с имени весов: по нему ultralytics выбирает класс модели
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{stem}-{key}.pt")
+
+
+def fuse(model):
+    net = getattr(model, "model", None)
+    if hasattr(net, "fuse") and not net.is_fused():
+        net.fuse(verbose=False)
+
+
+def save_fused(model, path):
+    """Сохраняет слитую сеть в формате чекпоинта ultralytics"""
+    import torch
+
+    train_args = (getattr(model, "ckpt", None) or {}).get("train_args", {})
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Пишем во временный файл и переименовываем, чтобы не оставить битую модель
+    tmp_path = path + ".tmp"
+    torch.save({"model": model.model, "train_args": train_args}, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def warm_up(model, size=(640, 480)):
+    """Первый вызов модели на пустом кадре: собирает предиктор до запуска камер"""
+    started = time.perf_counter()
+    model(np.zeros((size[1], size[0], 3), dtype=np.uint8), verbose=False)
+    return time.perf_counter() - started
+
+
+def load_model(path, cache_dir=None, classes=None, embedding_cache=None, warmup=True, progress=None):
+    """Загружает YOLO-World, готовый к первому кадру.
+
+    progress(stage, fraction) вызывается перед каждым этапом. Если задан
+    classes, словарь ставится до прогрева - через кэш эмбеддингов, так что
+    CLIP загружается только для новых промптов.
+    """
+    def report(stage, fraction):
+        if progress is not None:
+            progress(stage, fraction)
+
+    report("Загрузка библиотек", 0.0)
+    from ultralytics import YOLO
+
+    # Кэшируются только чекпоинты PyTorch; yaml и экспортированные модели загружаются как есть
+    cached = None
+    if cache_dir and path.endswith(".pt") and os.path.exists(path):
+        cached = fused_path(path, cache_dir)
+    model = None
+    if cached and os.path.exists(cached):
+        report("Загрузка модели из кэша", 0.4)
+        try:
+            model = YOLO(cached)
+        except Exception as e:
+            print(f"Не удалось загрузить слитую модель {cached}, загружаем исходные веса: {e}", file=sys.stderr)
+    if model is None:
+        report("Загрузка модели", 0.4)
+        model = YOLO(path)
+        fuse(model)
+        if cached:
+            try:
+                save_fused(model, cached)
+                # Ключи экспортированных моделей считаются от пути весов (см. ExportedBackend.vocabulary_key):
+                # первый запуск должен давать тот же ключ, что и следующие, которые грузят модель из кэша
+                model.ckpt_path = cached
+            except Exception as e:
+                print(f"Не удалось сохранить слитую модель {cached}: {e}", file=sys.stderr)
+
+    if classes:
+        report("Подготовка списка объектов", 0.6)
+        set_classes_cached(model, sorted(set(classes)), embedding_cache)
+    if warmup:
+        report("Прогрев модели", 0.8)
+        warm_up(model)
+    report("Готово", 1.0)
+    return model
@@ -0,0 +1,169 @@
+"""Панель статуса отслеживаемых объектов на модели/представлении Qt.
+
+Каждый объект - строка модели AbsenceModel со временем отсутствия и
+уровнем тревоги. Строки рисует AbsenceDelegate заранее созданными кистями,
+без таблиц стилей. Модель сообщает представлению только о строках, у
+которых изменилось значение, а при добавлении или удалении объекта
+вставляет или удаляет отдельные строки вместо пересборки всей панели.
+"""
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QSize
+from PyQt5.QtGui import QBrush, QColor, QFont, QPen
+from PyQt5.QtWidgets import QAbstractItemView, QListView, QStyledItemDelegate
+
+AbsenceRole = Qt.UserRole + 1
+SeverityRole = Qt.UserRole + 2
+
+# Цвет полосы по уровню тревоги: норма, больше половины порога, больше трёх четвертей
+SEVERITY_COLORS = ("#7B9E89", "#F0AD4E", "#D9534F")
+
+
+def severity(absence_time, max_absence_time):
+    if absence_time > max_absence_time * 0.75:
+        return 2
+    if absence_time > max_absence_time * 0.5:
+        return 1
+    return 0
+
+
+class AbsenceModel(QAbstractListModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.max_absence_time = 1
+        # Строки: [класс, время отсутствия, уровень тревоги]
+        self._rows = []
+        self._index = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        cls, absence_time, level = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            # Сокращаем длинные имена/описания для отображения в статусной панели
+            return cls if len(cls) <= 30 else cls[:27] + "..."
+        if role == Qt.ToolTipRole:
+            return cls
+        if role == AbsenceRole:
+            return absence_time
+        if role == SeverityRole:
+            return level
+        return None
+
+    def _reindex(self):
+        self._index = {row[0]: i for i, row in enumerate(self._rows)}
+
+    def set_classes(self, classes, max_absence_time):
+        """Синхронизация строк со списком объектов камеры"""
+        if max_absence_time != self.max_absence_time:
+            self.max_absence_time = max_absence_time
+            for row in self._rows:
+                row[2] = severity(row[1], max_absence_time)
+            if self._rows:
+                self.dataChanged.emit(self.index(0), self.index(len(self._rows) - 1))
+
+        wanted = set(classes)
+        for i in range(len(self._rows) - 1, -1, -1):
+            if self._rows[i][0] not in wanted:
+                self.beginRemoveRows(QModelIndex(), i, i)
+                del self._rows[i]
+                self.endRemoveRows()
+
+        present = {row[0] for row in self._rows}
+        for i, cls in enumerate(classes):
+            if cls not in present:
+                self.beginInsertRows(QModelIndex(), i, i)
+                self._rows.insert(i, [cls, 0, 0])
+                self.endInsertRows()
+        self._reindex()
+
+    def update_absence(self, absence):
+        """Новые значения таймеров; перерисовываются только изменившиеся строки"""
+        for cls, absence_time in absence.items():
+            i = self._index.get(cls)
+            if i is None:
+                continue
+            row = self._rows[i]
+            if row[1] == absence_time:
+                continue
+            row[1] = absence_time
+            row[2] = severity(absence_time, self.max_absence_time)
+            index = self.index(i)
+            self.dataChanged.emit(index, index, [AbsenceRole, SeverityRole])
+
+    def reset(self):
+        self.update_absence({row[0]: 0 for row in self._rows})
+
+
+class AbsenceDelegate(QStyledItemDelegate):
+    ROW_HEIGHT = 34
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Кисти и шрифты создаются один раз, при отрисовке только выбираются
+        self.chunk_brushes = [QBrush(QColor(color)) for color in SEVERITY_COLORS]
+        self.icon_brush = QBrush(QColor("#7B9E89"))
+        self.border_pen = QPen(QColor("#DCD0C0"))
+        self.text_pen = QPen(QColor("#3F4B3B"))
+        self.separator_pen = QPen(QColor("#DCD0C0"))
+        self.name_font = QFont()
+        self.name_font.setBold(True)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def paint(self, painter, option, index):
+        model = index.model()
+        absence_time = index.data(AbsenceRole)
+        level = index.data(SeverityRole)
+        max_absence_time = model.max_absence_time
+        rect = option.rect.adjusted(0, 5, 0, -5)
+
+        painter.save()
+        painter.setRenderHint(painter.Antialiasing)
+
+        # Иконка и имя объекта
+        name_width = rect.width() * 2 // 5
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.icon_brush)
+        painter.drawEllipse(rect.left(), rect.center().y() - 8, 16, 16)
+        painter.setPen(self.text_pen)
+        painter.setFont(self.name_font)
+        name_rect = QRect(rect.left() + 22, rect.top(), name_width - 26, rect.height())
+        name = painter.fontMetrics().elidedText(index.data(Qt.DisplayRole), Qt.ElideRight, name_rect.width())
+        painter.drawText(name_rect, Qt.AlignVCenter | Qt.AlignLeft, name)
+
+        # Полоса времени отсутствия
+        bar = QRect(rect.left() + name_width, rect.top(), rect.width() - name_width, rect.height())
+        painter.setPen(self.border_pen)
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRoundedRect(bar.adjusted(0, 0, -1, -1), 4, 4)
+        if absence_time > 0 and max_absence_time > 0:
+            chunk = QRect(bar)
+            chunk.setWidth(bar.width() * min(absence_time, max_absence_time) // max_absence_time)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self.chunk_brushes[level])
+            painter.drawRoundedRect(chunk.adjusted(1, 1, -1, -1), 4, 4)
+        painter.setPen(self.text_pen)
+        painter.setFont(option.font)
+        painter.drawText(bar, Qt.AlignCenter, f"{absence_time} сек / {max_absence_time} сек")
+
+        # Разделитель между строками
+        if index.row() < model.rowCount() - 1:
+            painter.setPen(self.separator_pen)
+            painter.drawLine(option.rect.left(), option.rect.bottom(), option.rect.right(), option.rect.bottom())
+        painter.restore()
+
+
+class StatusView(QListView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status_model = AbsenceModel(self)
+        self.setModel(self.status_model)
+        self.setItemDelegate(AbsenceDelegate(self))
+        # Все строки одной высоты: представлению не нужно опрашивать sizeHint каждой
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setStyleSheet("QListView { border: none; background-color: white; }")
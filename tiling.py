@@ -0,0 +1,180 @@
+"""Тайловый инференс кадров высокого разрешения.
+
+Модель уменьшает кадр до imgsz (640 по умолчанию), и на кадре 4K
+небольшие предметы сжимаются до нескольких пикселей. TiledBackend
+нарезает кадр на перекрывающиеся тайлы размера tile_size и прогоняет
+тайлы всех кадров пакета одним вызовом модели. По желанию в пакет
+добавляется и весь кадр целиком: уменьшенный кадр находит крупные
+объекты, которые не помещаются в тайл.
+
+Боксы переводятся в координаты кадра и сливаются межтайловым NMS по
+классам. Перекрытие считается относительно меньшего бокса (IoS), а не
+IoU, чтобы обрезанный краем тайла бокс подавлялся целым боксом того же
+объекта из соседнего тайла. Результат повторяет интерфейс результата
+YOLO (result.boxes.cls, xyxy, conf), поэтому Detections.from_result
+работает с ним без изменений.
+
+Если заданы области интереса (доли кадра x1, y1, x2, y2), тайлами
+покрываются только они, а остальной кадр проверяется только целиком.
+"""
+import numpy as np
+
+from detections import ArrayBoxes, ArrayResult, to_numpy
+
+
+def parse_region(text):
+    """Область интереса "x1,y1,x2,y2" в долях кадра"""
+    region = tuple(float(value) for value in text.split(","))
+    if len(region) != 4 or not all(0 <= value <= 1 for value in region):
+        raise ValueError(f"Область задаётся четырьмя долями кадра x1,y1,x2,y2: {text}")
+    if region[0] >= region[2] or region[1] >= region[3]:
+        raise ValueError(f"Пустая область: {text}")
+    return region
+
+
+def tile_starts(start, end, size, stride):
+    """Начала тайлов вдоль одной оси: последний тайл прижат к концу отрезка"""
+    if end - start <= size:
+        return [start]
+    starts = list(range(start, end - size, stride))
+    starts.append(end - size)
+    return starts
+
+
+def fit_span(start, end, size, limit):
+    """Отрезок области меньше тайла расширяется до тайла вокруг своего центра, не выходя за кадр"""
+    if end - start >= size:
+        return start, end
+    start = min(max(0, (start + end - size) // 2), max(0, limit - size))
+    return start, min(limit, start + size)
+
+
+def tile_grid(width, height, size, overlap, regions=None):
+    """Прямоугольники тайлов (x1, y1, x2, y2) в пикселях кадра"""
+    stride = max(1, int(size * (1 - overlap)))
+    areas = [(0, 0, width, height)]
+    if regions:
+        areas = []
+        for rx1, ry1, rx2, ry2 in regions:
+            x1, y1, x2, y2 = int(rx1 * width), int(ry1 * height), int(rx2 * width), int(ry2 * height)
+            x1, x2 = fit_span(x1, x2, size, width)
+            y1, y2 = fit_span(y1, y2, size, height)
+            areas.append((x1, y1, x2, y2))
+    tiles = []
+    for x1, y1, x2, y2 in areas:
+        for ty in tile_starts(y1, y2, size, stride):
+            for tx in tile_starts(x1, x2, size, stride):
+                tile = (tx, ty, min(tx + size, x2), min(ty + size, y2))
+                if tile not in tiles:
+                    tiles.append(tile)
+    return tiles
+
+
+def merge_nms(cls, xyxy, conf, threshold=0.6):
+    """Индексы оставшихся боксов: NMS по классам с перекрытием относительно меньшего бокса"""
+    order = np.argsort(-conf, kind="stable")
+    area = np.maximum(xyxy[:, 2] - xyxy[:, 0], 0) * np.maximum(xyxy[:, 3] - xyxy[:, 1], 0)
+    suppressed = np.zeros(len(conf), bool)
+    keep = []
+    for position, i in enumerate(order):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        others = order[position + 1:]
+        others = others[~suppressed[others] & (cls[others] == cls[i])]
+        if not len(others):
+            continue
+        w = np.minimum(xyxy[i, 2], xyxy[others, 2]) - np.maximum(xyxy[i, 0], xyxy[others, 0])
+        h = np.minimum(xyxy[i, 3], xyxy[others, 3]) - np.maximum(xyxy[i, 1], xyxy[others, 1])
+        inter = np.clip(w, 0, None) * np.clip(h, 0, None)
+        overlap = inter / np.maximum(np.minimum(area[i], area[others]), 1e-6)
+        suppressed[others[overlap > threshold]] = True
+    return np.array(keep, np.int64)
+
+
+class TiledBackend:
+    """Обёртка над бэкендом инференса (см. backends.py), режущая кадры на тайлы"""
+    def __init__(self, backend, tile_size=640, overlap=0.2, full_frame=True, regions=None, nms_threshold=0.6):
+        self.backend = backend
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.full_frame = full_frame
+        self.regions = list(regions) if regions else None
+        self.nms_threshold = nms_threshold
+        self._grids = {}
+
+    @property
+    def model(self):
+        return self.backend.model
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    @property
+    def concurrency(self):
+        return self.backend.concurrency
+
+    def set_classes(self, classes):
+        self.backend.set_classes(classes)
+
+    def prepare(self, vocabulary):
+        return self.backend.prepare(vocabulary)
+
+    def apply(self, prepared):
+        self.backend.apply(prepared)
+
+    def close(self):
+        self.backend.close()
+
+    def tiles(self, width, height):
+        # Сетка зависит только от размера кадра, поэтому считается один раз
+        key = (width, height)
+        grid = self._grids.get(key)
+        if grid is None:
+            grid = self._grids[key] = tile_grid(width, height, self.tile_size, self.overlap, self.regions)
+        return grid
+
+    def __call__(self, frames, **kwargs):
+        if not isinstance(frames, list):
+            frames = [frames]
+        images = []
+        # Для каждого изображения пакета: номер кадра и смещение тайла
+        owners = []
+        for index, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            if w <= self.tile_size and h <= self.tile_size:
+                # Кадр и так меньше тайла - режем только большие
+                images.append(frame)
+                owners.append((index, 0, 0))
+                continue
+            if self.full_frame:
+                images.append(frame)
+                owners.append((index, 0, 0))
+            for x1, y1, x2, y2 in self.tiles(w, h):
+                # Срез без копирования: предобработка модели всё равно создаёт новый массив
+                images.append(frame[y1:y2, x1:x2])
+                owners.append((index, x1, y1))
+
+        results = self.backend(images, **kwargs)
+
+        parts = [([], [], []) for _ in frames]
+        for (index, dx, dy), result in zip(owners, results):
+            boxes = result.boxes
+            if not len(boxes):
+                continue
+            cls, xyxy, conf = parts[index]
+            cls.append(to_numpy(boxes.cls).reshape(-1))
+            xyxy.append(to_numpy(boxes.xyxy).reshape(-1, 4) + np.float32((dx, dy, dx, dy)))
+            conf.append(to_numpy(boxes.conf).reshape(-1))
+
+        merged = []
+        for frame, (cls, xyxy, conf) in zip(frames, parts):
+            if cls:
+                cls, xyxy, conf = np.concatenate(cls), np.concatenate(xyxy), np.concatenate(conf)
+                keep = merge_nms(cls, xyxy, conf, self.nms_threshold)
+                cls, xyxy, conf = cls[keep], xyxy[keep], conf[keep]
+            else:
+                cls, xyxy, conf = np.empty(0, np.float32), np.empty((0, 4), np.float32), np.empty(0, np.float32)
+            merged.append(ArrayResult(ArrayBoxes(cls, xyxy, conf), frame.shape[:2]))
+        return merged
@@ -0,0 +1,211 @@
+"""Журнал присутствия и отсутствия объектов в SQLite.
+
+Движок только кладёт результаты детектора в очередь; фоновый поток
+разбирает их и пишет пачками, одной транзакцией раз в flush_interval
+секунд. В журнал попадают:
+
+sightings - объект виден камерой (не чаще раза в resolution секунд на
+    объект, чтобы за месяцы таблица оставалась компактной);
+absences - закрытые интервалы отсутствия: объект снова появился после
+    перерыва не короче порога камеры; отсчёт идёт от таймеров камеры
+    на момент её запуска, так что после сброса таймеров время простоя
+    не считается отсутствием;
+alerts - уведомления об отсутствии.
+
+Запросы «когда объект видели в последний раз» и «минуты отсутствия по
+дням» идут по индексам (prompt, ts) и (prompt, start) и не сканируют
+таблицы. Пример:
+    python timeline.py --last-seen cup keys
+    python timeline.py --absence-per-day cup --days 30
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sightings (camera TEXT NOT NULL, prompt TEXT NOT NULL, ts REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS sightings_prompt_ts ON sightings (prompt, ts);
+CREATE INDEX IF NOT EXISTS sightings_camera_prompt_ts ON sightings (camera, prompt, ts);
+CREATE TABLE IF NOT EXISTS absences (camera TEXT NOT NULL, prompt TEXT NOT NULL, start REAL NOT NULL, end REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS absences_prompt_start ON absences (prompt, start);
+CREATE TABLE IF NOT EXISTS alerts (camera TEXT NOT NULL, prompt TEXT NOT NULL, ts REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS alerts_prompt_ts ON alerts (prompt, ts);
+"""
+
+
+def connect(path):
+    """Новое соединение; закрывать его вызывающему"""
+    connection = sqlite3.connect(path, timeout=30)
+    # WAL: запросы читают журнал, не мешая фоновой записи
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class TimelineStore:
+    def __init__(self, path, flush_interval=1.0, resolution=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.resolution = resolution
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = connect(path)
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        # Точное время последнего обнаружения и последней записанной строки по (камера, объект)
+        self._last_seen = {}
+        self._last_written = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def record(self, camera, prompts, timestamp, max_absence_time):
+        """Объекты, найденные детектором на кадре; вызывается из рабочего потока"""
+        if prompts:
+            self._queue.put(("seen", camera, prompts, timestamp, max_absence_time))
+
+    def record_alert(self, camera, prompts, timestamp):
+        self._queue.put(("alert", camera, prompts, timestamp, None))
+
+    def start_session(self, camera, last_seen):
+        """Камера запущена: отсчёт отсутствия продолжается с её таймеров last_seen.
+
+        Если таймеры были сброшены, время до запуска отсутствием не считается.
+        """
+        seeds = {prompt: value for prompt, value in last_seen.items() if value > 0}
+        self._queue.put(("session", camera, seeds, None, None))
+
+    def close(self, timeout=10.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _write_loop(self):
+        connection = connect(self.path)
+        sightings, absences, alerts = [], [], []
+        deadline = time.monotonic() + self.flush_interval
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                running = False
+            elif item:
+                kind, camera, prompts, timestamp, max_absence_time = item
+                if kind == "seen":
+                    self._process_seen(camera, prompts, timestamp, max_absence_time, sightings, absences)
+                elif kind == "alert":
+                    alerts.extend((camera, prompt, timestamp) for prompt in prompts)
+                elif kind == "session":
+                    with self._lock:
+                        for key in [key for key in self._last_seen if key[0] == camera]:
+                            del self._last_seen[key]
+                        for prompt, value in prompts.items():
+                            self._last_seen[(camera, prompt)] = value
+            if not running or time.monotonic() >= deadline:
+                if sightings or absences or alerts:
+                    with connection:
+                        connection.executemany("INSERT INTO sightings VALUES (?, ?, ?)", sightings)
+                        connection.executemany("INSERT INTO absences VALUES (?, ?, ?, ?)", absences)
+                        connection.executemany("INSERT INTO alerts VALUES (?, ?, ?)", alerts)
+                    sightings, absences, alerts = [], [], []
+                deadline = time.monotonic() + self.flush_interval
+        connection.close()
+
+    def _process_seen(self, camera, prompts, timestamp, max_absence_time, sightings, absences):
+        for prompt in prompts:
+            key = (camera, prompt)
+            # Словарь меняет только этот поток, блокировка нужна лишь читателям
+            previous = self._last_seen.get(key)
+            if previous is not None and timestamp <= previous:
+                continue
+            with self._lock:
+                self._last_seen[key] = timestamp
+            if previous is not None and timestamp - previous >= max_absence_time:
+                absences.append((camera, prompt, previous, timestamp))
+            if timestamp - self._last_written.get(key, 0) >= self.resolution:
+                sightings.append((camera, prompt, timestamp))
+                self._last_written[key] = timestamp
+
+    def _query(self, sql, params=()):
+        connection = connect(self.path)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def _stored_last_seen(self, camera, prompt):
+        return self._query("SELECT MAX(ts) FROM sightings WHERE camera = ? AND prompt = ?", (camera, prompt))[0][0]
+
+    def last_seen(self, prompt, camera=None):
+        """Время последнего обнаружения объекта (None - ни разу не видели)"""
+        with self._lock:
+            pending = [ts for (cam, name), ts in self._last_seen.items()
+                       if name == prompt and (camera is None or cam == camera)]
+        if camera is None:
+            stored = self._query("SELECT MAX(ts) FROM sightings WHERE prompt = ?", (prompt,))[0][0]
+        else:
+            stored = self._stored_last_seen(camera, prompt)
+        values = pending + ([stored] if stored is not None else [])
+        return max(values) if values else None
+
+    def restore_last_seen(self, camera, prompts):
+        """Последние обнаружения объектов камеры для восстановления таймеров после перезапуска"""
+        restored = {}
+        for prompt in prompts:
+            value = self.last_seen(prompt, camera)
+            if value is not None:
+                restored[prompt] = value
+        return restored
+
+    def absence_minutes_per_day(self, prompt, since=None, camera=None):
+        """Суммарные минуты отсутствия по дням (день определяется по началу интервала)"""
+        query = "SELECT date(start, 'unixepoch', 'localtime'), SUM(end - start) / 60.0 FROM absences WHERE prompt = ?"
+        params = [prompt]
+        if since is not None:
+            query += " AND start >= ?"
+            params.append(since)
+        if camera is not None:
+            query += " AND camera = ?"
+            params.append(camera)
+        query += " GROUP BY 1 ORDER BY 1"
+        return [(day, round(minutes, 2)) for day, minutes in self._query(query, params)]
+
+
+def main(argv=None):
+    from monitor import TIMELINE_PATH
+
+    parser = argparse.ArgumentParser(description="Запросы к журналу обнаружений")
+    parser.add_argument("--path", default=TIMELINE_PATH)
+    parser.add_argument("--camera", help="источник камеры, как в watchlist.json")
+    parser.add_argument("--last-seen", nargs="+", metavar="PROMPT", help="когда объекты видели в последний раз")
+    parser.add_argument("--absence-per-day", metavar="PROMPT", help="минуты отсутствия объекта по дням")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        print(f"Журнал не найден: {args.path}", file=sys.stderr)
+        return 1
+    store = TimelineStore(args.path)
+    try:
+        for prompt in args.last_seen or []:
+            value = store.last_seen(prompt, args.camera)
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value)) if value else "не обнаружен"
+            print(f"{prompt}: {when}")
+        if args.absence_per_day:
+            since = time.time() - args.days * 86400
+            for day, minutes in store.absence_minutes_per_day(args.absence_per_day, since, args.camera):
+                print(f"{day}: {minutes} мин")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Трекинг объектов между запусками детектора.
+
+Детектор запускается раз в every кадров, а на промежуточных кадрах
+боксы переносятся пирамидальным оптическим потоком Лукаса-Канаде по
+особым точкам внутри каждого бокса. Точки проверяются прогоном потока
+в обратную сторону, бокс сдвигается на медианное смещение своих точек.
+
+Результаты детектора связываются с треками по IoU в стиле ByteTrack:
+сначала уверенные обнаружения, затем неуверенные - с оставшимися
+треками, так что неуверенный бокс частично перекрытого объекта
+продлевает его трек, а не отбирает чужой. Трек переживает до
+max_misses запусков детектора подряд без подтверждения, поэтому
+единичный пропуск детектора не становится моментом отсутствия.
+
+Детектор запускается вне очереди при потере трека: большая часть точек
+бокса не прошла проверку, бокс ушёл за край кадра или трек не
+подтвердился на прошлом запуске детектора.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from detections import Detections
+
+
+def iou_matrix(a, b):
+    """Попарные IoU боксов xyxy"""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(iou, threshold):
+    """Пары (трек, обнаружение) по убыванию IoU не ниже порога"""
+    pairs = []
+    if not iou.size:
+        return pairs
+    iou = iou.copy()
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < threshold:
+            return pairs
+        pairs.append((i, j))
+        iou[i, :] = -1
+        iou[:, j] = -1
+
+
+class _Tracks:
+    """Треки одной камеры в виде параллельных массивов, как в Detections"""
+    def __init__(self, classes=()):
+        self.classes = classes
+        self.boxes = np.empty((0, 4), np.float32)
+        self.cls = np.empty(0, np.int64)
+        self.conf = np.empty(0, np.float32)
+        self.ids = np.empty(0, np.int64)
+        self.misses = np.empty(0, np.int64)
+        # Уменьшенный серый кадр и особые точки с номером трека каждой точки
+        self.gray = None
+        self.points = np.empty((0, 1, 2), np.float32)
+        self.owners = np.empty(0, np.int64)
+        self.since_detection = 0
+        self.force = True
+
+    def detections(self):
+        return Detections(self.classes, self.cls.copy(), self.boxes.astype(np.int32), self.conf.copy())
+
+
+class Tracker:
+    def __init__(self, every=5, max_misses=2, high_conf=0.5, match_iou=0.3, low_match_iou=0.5,
+                 width=320, min_points=4, max_points=20):
+        # Детектор запускается на каждом every-м кадре
+        self.every = every
+        # Сколько запусков детектора подряд трек живёт без подтверждения
+        self.max_misses = max_misses
+        self.high_conf = high_conf
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        # Ширина кадра, на котором считается поток
+        self.width = width
+        self.min_points = min_points
+        self.max_points = max_points
+
+        self._states = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.propagated = 0
+        self.detected = 0
+
+    @property
+    def propagated_ratio(self):
+        total = self.propagated + self.detected
+        return self.propagated / total if total else 0.0
+
+    def _gray(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        h, w = gray.shape
+        scale = min(1.0, self.width / w)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (self.width, max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+        return gray, scale
+
+    def propagate(self, stream, frame, timestamp):
+        """Обнаружения на промежуточном кадре по трекам; None - нужен детектор"""
+        with self._lock:
+            state = self._states.get(stream)
+            if state is None or state.force or state.since_detection + 1 >= self.every:
+                return None
+            gray, scale = self._gray(frame)
+            boxes = state.boxes.copy()
+            points, owners = state.points, state.owners
+            if len(points):
+                moved, status, _ = cv2.calcOpticalFlowPyrLK(state.gray, gray, points, None, winSize=(15, 15), maxLevel=2)
+                back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, state.gray, moved, None, winSize=(15, 15), maxLevel=2)
+                error = np.linalg.norm((points - back).reshape(-1, 2), axis=1)
+                good = (status.reshape(-1) == 1) & (back_status.reshape(-1) == 1) & (error < 1.0)
+                shifts = (moved - points).reshape(-1, 2) / scale
+                for track in np.unique(owners):
+                    own = owners == track
+                    tracked = own & good
+                    count = np.count_nonzero(tracked)
+                    if count < max(self.min_points, np.count_nonzero(own) // 2):
+                        # Трек потерян: кадр уходит в детектор
+                        return None
+                    dx, dy = np.median(shifts[tracked], axis=0)
+                    boxes[track] += (dx, dy, dx, dy)
+                points, owners = moved[good], owners[good]
+
+            h, w = frame.shape[:2]
+            cx = (boxes[:, 0] + boxes[:, 2]) / 2
+            cy = (boxes[:, 1] + boxes[:, 3]) / 2
+            if np.any((cx < 0) | (cx >= w) | (cy < 0) | (cy >= h)):
+                return None
+            state.boxes = boxes
+            state.points, state.owners = points, owners
+            state.gray = gray
+            state.since_detection += 1
+            self.propagated += 1
+            return state.detections()
+
+    def update(self, stream, frame, detections):
+        """Связать результат детектора с треками; возвращает обнаружения всех живых треков"""
+        with self._lock:
+            state = self._states.get(stream)
+            if state is None or state.classes is not detections.classes:
+                # Словарь модели сменился - индексы классов старых треков больше не верны
+                state = self._states[stream] = _Tracks(detections.classes)
+            self._associate(state, detections)
+            state.gray, scale = self._gray(frame)
+            self._find_points(state, scale)
+            state.since_detection = 0
+            # Неподтверждённые треки проверяются детектором уже на следующем кадре
+            state.force = bool(np.any(state.misses > 0))
+            self.detected += 1
+            return state.detections()
+
+    def reset(self, stream):
+        """Забыть треки камеры: следующий кадр обязательно пройдёт через детектор"""
+        with self._lock:
+            self._states.pop(stream, None)
+
+    def _associate(self, state, detections):
+        boxes = detections.xyxy.astype(np.float32)
+        iou = iou_matrix(state.boxes, boxes)
+        iou[state.cls[:, None] != detections.cls[None, :]] = 0
+        high = detections.conf >= self.high_conf
+
+        matched_tracks, matched_detections = [], []
+        for columns, threshold in ((high, self.match_iou), (~high, self.low_match_iou)):
+            stage = iou.copy()
+            stage[:, ~columns] = -1
+            stage[matched_tracks, :] = -1
+            for i, j in greedy_match(stage, threshold):
+                matched_tracks.append(i)
+                matched_detections.append(j)
+
+        misses = state.misses + 1
+        misses[matched_tracks] = 0
+        state.boxes[matched_tracks] = boxes[matched_detections]
+        state.conf[matched_tracks] = detections.conf[matched_detections]
+        keep = misses <= self.max_misses
+
+        new = np.ones(len(detections), bool)
+        new[matched_detections] = False
+        count = np.count_nonzero(new)
+        ids = np.arange(self._next_id, self._next_id + count)
+        self._next_id += count
+
+        state.boxes = np.concatenate([state.boxes[keep], boxes[new]])
+        state.cls = np.concatenate([state.cls[keep], detections.cls[new]])
+        state.conf = np.concatenate([state.conf[keep], detections.conf[new]])
+        state.ids = np.concatenate([state.ids[keep], ids])
+        state.misses = np.concatenate([misses[keep], np.zeros(count, np.int64)])
+
+    def _find_points(self, state, scale):
+        gray = state.gray
+        h, w = gray.shape
+        all_points, all_owners = [], []
+        for track, box in enumerate(state.boxes):
+            x1, y1, x2, y2 = np.clip(np.round(box * scale).astype(int), 0, (w, h, w, h))
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                continue
+            corners = cv2.goodFeaturesToTrack(gray[y1:y2, x1:x2], self.max_points, 0.01, 3)
+            # Бокс без текстуры не проверяется потоком и стоит на месте до следующего детектора
+            if corners is None or len(corners) < self.min_points:
+                continue
+            all_points.append(corners + np.float32((x1, y1)))
+            all_owners.append(np.full(len(corners), track))
+        if all_points:
+            state.points = np.concatenate(all_points).astype(np.float32)
+            state.owners = np.concatenate(all_owners)
+        else:
+            state.points = np.empty((0, 1, 2), np.float32)
+            state.owners = np.empty(0, np.int64)
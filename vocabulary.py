@@ -0,0 +1,113 @@
+"""Версии словаря модели и их подготовка в фоне.
+
+Vocabulary - кортеж промптов в порядке индексов классов модели с номером
+версии. Детектор отдаёт его вместе с каждым результатом (поле classes
+у Detections), поэтому индексы боксов всегда разбираются по тому
+словарю, с которым модель их получила.
+
+VocabularySwitcher готовит словари в своём потоке (текстовый энкодер,
+загрузка экспортированной модели, см. backends.py), пока детектор
+работает со старым словарём, и передаёт готовый словарь в on_ready.
+Запросы вытесняют друг друга, как кадры в FrameSlot: если список
+объектов меняется несколько раз подряд, готовится только последний.
+Подготовленные словари хранятся в небольшом LRU-кэше, а prefetch
+готовит словарь заранее, например для сохранённого профиля, так что
+переключение на него сводится к присваиванию между кадрами.
+"""
+import itertools
+import sys
+import threading
+from collections import OrderedDict
+
+
+class Vocabulary(tuple):
+    """Промпты в порядке индексов классов модели и номер версии словаря"""
+    def __new__(cls, classes=(), version=0):
+        vocabulary = super().__new__(cls, classes)
+        vocabulary.version = version
+        return vocabulary
+
+
+class VocabularySwitcher:
+    def __init__(self, backend, on_ready, cache_size=4):
+        self.backend = backend
+        self.on_ready = on_ready
+        self.cache_size = cache_size
+        # Последний запрошенный словарь (кортеж промптов)
+        self.target = None
+
+        self._prepared = OrderedDict()
+        self._versions = itertools.count(1)
+        self._request = None
+        self._prefetch = []
+        self._busy = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def prepare(self, classes):
+        """Подготовить словарь в вызывающем потоке (или взять из кэша)"""
+        key = tuple(classes)
+        with self._cond:
+            prepared = self._prepared.get(key)
+            if prepared is not None:
+                self._prepared.move_to_end(key)
+                return prepared
+        prepared = self.backend.prepare(Vocabulary(key, next(self._versions)))
+        with self._cond:
+            self._prepared[key] = prepared
+            while len(self._prepared) > self.cache_size:
+                self._prepared.popitem(last=False)
+        return prepared
+
+    def request(self, classes):
+        """Переключиться на словарь, как только он будет готов"""
+        with self._cond:
+            self.target = tuple(classes)
+            self._request = self.target
+            self._cond.notify()
+
+    def prefetch(self, classes):
+        """Подготовить словарь заранее, не переключаясь на него"""
+        with self._cond:
+            key = tuple(classes)
+            if key not in self._prepared and key not in self._prefetch:
+                self._prefetch.append(key)
+                self._cond.notify()
+
+    def wait_idle(self, timeout=None):
+        """Ожидание, пока все запросы не будут подготовлены"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: self._closed or (self._request is None and not self._prefetch and not self._busy), timeout
+            )
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._request is not None or self._prefetch)
+                if self._closed:
+                    return
+                # Переключение важнее подготовки впрок
+                if self._request is not None:
+                    key, switch = self._request, True
+                    self._request = None
+                else:
+                    key, switch = self._prefetch.pop(0), False
+                self._busy = True
+            try:
+                prepared = self.prepare(key)
+                if switch:
+                    self.on_ready(prepared)
+            except Exception as e:
+                print(f"Не удалось подготовить словарь из {len(key)} объектов: {e}", file=sys.stderr)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()